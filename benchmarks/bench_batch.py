@@ -0,0 +1,74 @@
+"""
+Queries per second of search --batch against one process per query.
+
+    python benchmarks/bench_batch.py [num_videos] [cues_per_video] [num_queries]
+
+Builds a synthetic library with a large vocabulary, then runs num_queries
+searches for terms matching 2 to 1000 cues, like keyword monitoring would,
+through SearchHandler.batch_search with 1, 2 and 4 threads (first page of
+10 hits, cache off). A few `yt-fts search` processes against the same
+database give the process per query baseline.
+"""
+import io
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_index_profiles import with_vocabulary
+from bench_ingest import synthetic_videos
+from yt_fts.connection import get_read_connection, set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk
+from yt_fts.fts import deferred_fts
+from yt_fts.search import SearchHandler
+from yt_fts.terms import read_vocabulary
+
+PROCESS_RUNS = 5
+
+
+def make_queries(num_queries: int) -> list[str]:
+    terms = [term for term, docs in read_vocabulary(get_read_connection()) if 2 <= docs <= 1000]
+    return list(itertools.islice(itertools.cycle(terms), num_queries))
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    num_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # where yt-fts finds it with HOME=tmp_dir
+        os.makedirs(os.path.join(tmp_dir, ".config", "yt-fts"))
+        db_path = os.path.join(tmp_dir, ".config", "yt-fts", "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+        with deferred_fts():
+            add_videos_bulk(with_vocabulary(synthetic_videos(num_videos, cues_per_video)))
+
+        queries = make_queries(num_queries)
+        print(f"videos x cues: {num_videos} x {cues_per_video}, {num_queries} queries")
+
+        for threads in [1, 2, 4]:
+            handler = SearchHandler(scope="all", limit=10, cache=False)
+            start = time.perf_counter()
+            handler.batch_search(queries, threads, io.StringIO())
+            elapsed = time.perf_counter() - start
+            print(f"batch, {threads} threads: {num_queries / elapsed:>8.0f} queries/s")
+
+        env = dict(os.environ, HOME=tmp_dir)
+        start = time.perf_counter()
+        for query in queries[:PROCESS_RUNS]:
+            subprocess.run(["yt-fts", "search", query], env=env, stdout=subprocess.DEVNULL, check=False)
+        elapsed = time.perf_counter() - start
+        print(f"one process per query: {PROCESS_RUNS / elapsed:>8.1f} queries/s")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Per query overhead of connect-per-call versus the connection manager.
+
+    python benchmarks/bench_connections.py [num_lookups]
+
+Runs the two metadata lookups search does for every hit against a
+throwaway database, once opening a fresh connection per call the way
+db_utils used to and once through yt_fts.connection.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from yt_fts.connection import set_db_path
+from yt_fts.db_utils import (
+    make_db,
+    get_title_from_db,
+    get_channel_name_from_video_id,
+)
+
+
+def populate(db_path: str, num_videos: int) -> list[str]:
+    make_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench Channel', 'https://youtube.com/channel/UCbench')")
+    video_ids = [f"vid{i:08d}" for i in range(num_videos)]
+    conn.executemany(
+        "INSERT INTO Videos VALUES (?, ?, ?, 'UCbench', '2024-01-01')",
+        [(v, f"Video {v}", f"https://youtu.be/{v}") for v in video_ids]
+    )
+    conn.commit()
+    conn.close()
+    return video_ids
+
+
+def connect_per_call(db_path: str, video_ids: list[str]) -> None:
+    for video_id in video_ids:
+        # what every lookup used to pay: path resolution plus a new connection
+        os.path.exists(os.path.dirname(db_path))
+        os.path.exists(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute("SELECT video_title FROM Videos WHERE video_id = ?", [video_id]).fetchone()
+        conn.close()
+
+        os.path.exists(os.path.dirname(db_path))
+        os.path.exists(db_path)
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "SELECT channel_name FROM Channels WHERE channel_id = "
+            "(SELECT channel_id FROM Videos WHERE video_id = ?)", [video_id]).fetchone()
+        conn.close()
+
+
+def managed(video_ids: list[str]) -> None:
+    for video_id in video_ids:
+        get_title_from_db(video_id)
+        get_channel_name_from_video_id(video_id)
+
+
+def main() -> None:
+    num_lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        video_ids = populate(db_path, num_lookups)
+        set_db_path(db_path)
+
+        start = time.perf_counter()
+        connect_per_call(db_path, video_ids)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        managed(video_ids)
+        pooled = time.perf_counter() - start
+
+        set_db_path(None)
+
+    num_queries = num_lookups * 2
+    print(f"queries:          {num_queries}")
+    print(f"connect per call: {legacy * 1e6 / num_queries:8.1f} us/query")
+    print(f"managed:          {pooled * 1e6 / num_queries:8.1f} us/query")
+    print(f"speedup:          {legacy / pooled:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Throughput and memory of exporting search hits to csv.
+
+    python benchmarks/bench_export.py [num_videos] [cues_per_video]
+
+Builds a synthetic library and streams every hit of a few searches to a csv
+file the way search -e does, reporting hits per second and the peak of
+memory allocated by Python while exporting, which should not grow with the
+number of hits.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench_ingest import synthetic_videos
+from yt_fts.connection import set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk, search_all
+from yt_fts.export import ExportHandler
+
+QUERIES = ["nobody", "police", "the OR police"]
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+        add_videos_bulk(synthetic_videos(num_videos, cues_per_video))
+
+        os.chdir(tmp_dir)
+        print(f"videos x cues: {num_videos} x {cues_per_video}")
+        print(f"{'query':<16}{'hits':>10}{'seconds':>10}{'hits/s':>10}{'peak memory':>14}")
+
+        for query in QUERIES:
+            tracemalloc.start()
+            start = time.perf_counter()
+            _, count = ExportHandler().export_fts(search_all(query), "all")
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{query:<16}{count:>10}{elapsed:>10.2f}{count / elapsed:>10.0f}{peak / 1024 / 1024:>12.1f}MB")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
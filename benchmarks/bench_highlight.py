@@ -0,0 +1,71 @@
+"""
+Cost of highlight() on a page of search results as the number of matches grows.
+
+    cd benchmarks
+    python bench_highlight.py [cues] [limit]
+
+Ranks by bm25 alone, the default. For each query of the suite corpus, from
+a word in most cues to one in 0.01% of them, times:
+- rank only: the bm25 sort of every match, no lookups or highlight
+- search: search_all, the page joined to its videos and highlighted
+- inline: the same page with highlight() computed in the ranked scan, for
+  every match, as search did before highlighting moved to the returned page
+
+highlight, search less rank only, stays flat as the matches grow while
+inline grows with them. It grows with the limit instead, each returned hit
+repeats the match, about 0.3 ms a hit for prefix queries.
+"""
+import os
+import sys
+import tempfile
+
+from suite.corpus import CorpusSpec, queries
+from suite.scenarios import build, timings
+from yt_fts.connection import get_read_connection, set_db_path
+from yt_fts.db_utils import make_db, search_all
+
+# ordered like search ranks without signals, by the rank column of the index
+RANK_ONLY_SQL = """
+    SELECT fts.rowid FROM Subtitles_fts fts WHERE fts.text MATCH ?
+    ORDER BY fts.rank, fts.rowid LIMIT ?
+"""
+
+INLINE_SQL = """
+    SELECT hits.rowid, s.text, v.video_title, hits.highlighted
+    FROM (
+        SELECT fts.rowid, fts.rank AS rank, highlight(Subtitles_fts, 0, char(2), char(3)) AS highlighted
+        FROM Subtitles_fts fts WHERE fts.text MATCH ? ORDER BY fts.rank, fts.rowid LIMIT ?
+    ) hits
+    JOIN Subtitles s ON s.rowid = hits.rowid
+    JOIN Videos v ON v.video_id = s.video_id
+    ORDER BY hits.rank, hits.rowid
+"""
+
+
+def main() -> None:
+    cues = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    spec = CorpusSpec(cues=cues)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+        build(spec, tmp_dir, 1)
+        conn = get_read_connection()
+
+        print(f"cues: {cues}, limit {limit}, median of 5 runs")
+        print(f"{'query':<14}{'matches':>9}{'rank only':>12}{'search':>10}{'highlight':>11}{'inline':>10}")
+        for name, query in queries(spec).items():
+            matches = conn.execute("SELECT count(*) FROM Subtitles_fts WHERE text MATCH ?", [query]).fetchone()[0]
+            rank_only = timings(lambda: conn.execute(RANK_ONLY_SQL, [query, limit]).fetchall(), 5)["median_ms"]
+            search = timings(lambda: list(search_all(query, limit)), 5)["median_ms"]
+            inline = timings(lambda: conn.execute(INLINE_SQL, [query, limit]).fetchall(), 5)["median_ms"]
+            print(f"{name:<14}{matches:>9}{rank_only:>10.1f}ms{search:>8.1f}ms{search - rank_only:>9.1f}ms"
+                  f"{inline:>8.1f}ms")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
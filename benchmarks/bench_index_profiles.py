@@ -0,0 +1,78 @@
+"""
+Size, rebuild time and query latency of every index profile.
+
+    python benchmarks/bench_index_profiles.py [num_videos] [cues_per_video]
+
+Builds a synthetic library with a large vocabulary, every cue gets two words
+out of 100k made up ones, then rebuilds Subtitles_fts with each profile and
+times the first page (100 hits) of search_all for whole words and for short
+prefixes, which merge the doclists of every matching term unless the profile
+has prefix indexes. Ranking signals are off, so the timings are the index.
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from bench_ingest import synthetic_videos
+from bench_search import median_ms
+from yt_fts.connection import get_read_connection, set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk, search_all
+from yt_fts.fts import INDEX_PROFILES, deferred_fts, get_table_sizes, set_index_profile
+from yt_fts.maintenance import format_bytes
+
+QUERIES = ["police", "arriving", "po*", "ka*", "kab*"]
+LIMIT = 100
+VOCABULARY_SIZE = 100_000
+
+
+def with_vocabulary(videos):
+    rng = random.Random(1)
+    vocabulary = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+                  for _ in range(VOCABULARY_SIZE)]
+    for video, cues in videos:
+        for cue in cues:
+            cue["text"] += " " + " ".join(rng.choices(vocabulary, k=2))
+        yield video, cues
+
+
+def count_matches(query: str) -> int:
+    return get_read_connection().execute(
+        "SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH ?", [query]).fetchone()[0]
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+        with deferred_fts():
+            add_videos_bulk(with_vocabulary(synthetic_videos(num_videos, cues_per_video)))
+
+        print(f"videos x cues: {num_videos} x {cues_per_video}, first {LIMIT} hits, ms (matches)")
+        print(f"{'profile':<16}{'size':>10}{'rebuild':>10}" + "".join(f"{query:>17}" for query in QUERIES))
+        for profile in INDEX_PROFILES:
+            start = time.perf_counter()
+            set_index_profile(profile)
+            rebuild = time.perf_counter() - start
+
+            size = get_table_sizes(get_read_connection())["Subtitles_fts"]
+            row = f"{profile:<16}{format_bytes(size):>10}{rebuild:>9.1f}s"
+            for query in QUERIES:
+                latency = median_ms(lambda: list(search_all(query, LIMIT)))
+                row += f"{latency:>8.1f} ({count_matches(query):>6})"
+            print(row)
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
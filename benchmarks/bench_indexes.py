@@ -0,0 +1,102 @@
+"""
+EXPLAIN QUERY PLAN and timings for the hot video_id/channel_id lookups
+before and after the schema migrations.
+
+    python benchmarks/bench_indexes.py [num_channels] [videos_per_channel] [cues_per_video]
+
+Builds a synthetic database, strips it back to schema version 0 to look like
+a database made by an older yt-fts, then upgrades it with migrations.migrate.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from yt_fts.db_utils import make_db
+from yt_fts.migrations import migrate
+
+QUERIES = {
+    "search_channel": ("""
+        SELECT s.rowid, s.subtitle_id, s.video_id, s.start_time, s.stop_time, s.text
+        FROM Subtitles_fts fts
+        JOIN Subtitles s ON fts.rowid = s.rowid
+        JOIN Videos v ON s.video_id = v.video_id
+        WHERE fts.text MATCH 'police' AND v.channel_id = ?
+        ORDER BY rank LIMIT 100
+    """, "channel"),
+    "get_subs_by_video_id": (
+        "SELECT start_time, stop_time, text FROM Subtitles WHERE video_id = ?", "video"),
+    "get_num_vids": (
+        "SELECT COUNT(*) FROM Videos WHERE channel_id = ?", "channel"),
+    "delete_channel (subtitles)": (
+        "SELECT COUNT(*) FROM Subtitles WHERE video_id IN (SELECT video_id FROM Videos WHERE channel_id = ?)",
+        "channel"),
+    "show_video_transcript": (
+        "SELECT * FROM subtitles WHERE video_id=?", "video"),
+}
+
+WORDS = "the police arrived at house and nobody was there so we want to know what happened".split()
+
+
+def populate(db_path: str, num_channels: int, videos_per_channel: int, cues_per_video: int) -> None:
+    make_db(db_path)
+    rng = random.Random(0)
+    conn = sqlite3.connect(db_path)
+    for c in range(num_channels):
+        channel_id = f"UC{c:022d}"
+        conn.execute("INSERT INTO Channels VALUES (?, ?, ?)", (channel_id, f"channel {c}", ""))
+        for v in range(videos_per_channel):
+            video_id = f"v{c:04d}{v:06d}"
+            conn.execute("INSERT INTO Videos VALUES (?, ?, '', ?, '2024-01-01')", (video_id, video_id, channel_id))
+            conn.executemany(
+                "INSERT INTO Subtitles (video_id, start_time, stop_time, text) VALUES (?, '00:00:00.000', "
+                "'00:00:02.000', ?)",
+                [(video_id, " ".join(rng.choices(WORDS, k=8))) for _ in range(cues_per_video)])
+    conn.commit()
+
+    # look like a database from before migrations existed
+    for index in ("idx_subtitles_video_id", "idx_subtitles_video_start", "idx_videos_channel_id"):
+        conn.execute(f"DROP INDEX IF EXISTS {index}")
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+
+def report(conn: sqlite3.Connection, label: str, params: dict[str, str]) -> None:
+    print(f"== {label} (user_version {conn.execute('PRAGMA user_version').fetchone()[0]})")
+    for name, (sql, param) in QUERIES.items():
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", [params[param]])]
+
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            conn.execute(sql, [params[param]]).fetchall()
+        elapsed = (time.perf_counter() - start) / runs
+
+        print(f"{name:28s} {elapsed * 1000:9.3f} ms")
+        for step in plan:
+            print(f"    {step}")
+    print("")
+
+
+def main() -> None:
+    num_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    videos_per_channel = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    cues_per_video = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        populate(db_path, num_channels, videos_per_channel, cues_per_video)
+
+        conn = sqlite3.connect(db_path)
+        params = {"channel": f"UC{num_channels // 2:022d}", "video": f"v{num_channels // 2:04d}{0:06d}"}
+
+        report(conn, "before", params)
+        migrate(conn)
+        report(conn, "after", params)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Subtitle ingest throughput on a synthetic corpus.
+
+    python benchmarks/bench_ingest.py [num_videos] [cues_per_video]
+
+Loads the same synthetic videos into fresh databases with the old per-cue
+INSERT and per-video commit path, with db_utils.add_videos_bulk, and with
+add_videos_bulk inside fts.deferred_fts.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from yt_fts.connection import set_db_path
+from yt_fts.db_utils import make_db, add_videos_bulk
+from yt_fts.fts import deferred_fts
+
+WORDS = ("so the thing about this is that we really want to know what "
+         "happened when the police arrived at the house and nobody was there").split()
+
+
+def synthetic_videos(num_videos: int, cues_per_video: int):
+    rng = random.Random(0)
+    for v in range(num_videos):
+        video = {
+            "video_id": f"vid{v:08d}",
+            "video_title": f"Synthetic video {v}",
+            "video_url": f"https://youtu.be/vid{v:08d}",
+            "video_date": "2024-01-01",
+            "channel_id": "UCbench",
+        }
+        cues = []
+        for c in range(cues_per_video):
+            secs = c * 2
+            cues.append({
+                "start_time": f"{secs // 3600:02d}:{secs // 60 % 60:02d}:{secs % 60:02d}.000",
+                "stop_time": f"{(secs + 2) // 3600:02d}:{(secs + 2) // 60 % 60:02d}:{(secs + 2) % 60:02d}.000",
+                "text": " ".join(rng.choices(WORDS, k=8)),
+            })
+        yield video, cues
+
+
+def fresh_db(tmp_dir: str, name: str) -> str:
+    db_path = os.path.join(tmp_dir, name)
+    make_db(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def legacy_ingest(db_path: str, videos) -> int:
+    rows = 0
+    con = sqlite3.connect(db_path)
+    cur = con.cursor()
+    for video, cues in videos:
+        # add_video opened its own connection and did SELECT then INSERT
+        vid_conn = sqlite3.connect(db_path)
+        if vid_conn.execute("SELECT * FROM Videos WHERE video_id = ?", (video["video_id"],)).fetchone() is None:
+            vid_conn.execute("INSERT INTO Videos (video_id, video_title, video_url, video_date, channel_id) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (video["video_id"], video["video_title"], video["video_url"],
+                              video["video_date"], video["channel_id"]))
+            vid_conn.commit()
+        vid_conn.close()
+        rows += 1
+
+        for cue in cues:
+            cur.execute("INSERT INTO Subtitles (video_id, start_time, stop_time, text) VALUES (?, ?, ?, ?)",
+                        (video["video_id"], cue["start_time"], cue["stop_time"], cue["text"]))
+            rows += 1
+        con.commit()
+    con.close()
+    return rows
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = fresh_db(tmp_dir, "legacy.db")
+        start = time.perf_counter()
+        rows = legacy_ingest(legacy_path, synthetic_videos(num_videos, cues_per_video))
+        legacy = time.perf_counter() - start
+
+        set_db_path(fresh_db(tmp_dir, "bulk.db"))
+        stats = add_videos_bulk(synthetic_videos(num_videos, cues_per_video))
+
+        set_db_path(fresh_db(tmp_dir, "deferred.db"))
+        start = time.perf_counter()
+        with deferred_fts():
+            add_videos_bulk(synthetic_videos(num_videos, cues_per_video))
+        deferred = time.perf_counter() - start
+        set_db_path(None)
+
+    print(f"videos x cues: {num_videos} x {cues_per_video}")
+    print(f"per-row:       {rows / legacy:10.0f} rows/sec ({legacy:.2f}s)")
+    print(f"bulk:          {stats['rows_per_sec']:10.0f} rows/sec ({stats['seconds']:.2f}s)")
+    print(f"bulk + defer:  {rows / deferred:10.0f} rows/sec ({deferred:.2f}s, including index rebuild)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of the phrase index: size, build time, ingest overhead and latency.
+
+    python benchmarks/bench_phrases.py [num_videos] [cues_per_video]
+
+Ingests a synthetic library with and without the phrase index, then times the
+first page (100 hits) of search_phrase on Subtitles_fts, which only finds
+phrases inside one cue, and on windows of 2 and 3 cues.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_ingest import synthetic_videos
+from bench_search import median_ms
+from yt_fts.connection import get_read_connection, set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk, search_phrase
+from yt_fts.fts import build_window_index, drop_window_index, get_table_sizes
+from yt_fts.maintenance import format_bytes
+
+PHRASES = ["the police arrived", "nobody was there", "house and nobody"]
+LIMIT = 100
+
+
+def count_hits(phrase: str) -> int:
+    return sum(1 for _ in search_phrase(phrase))
+
+
+def ingest(tmp_dir: str, name: str, num_videos: int, cues_per_video: int, window: int | None) -> float:
+    db_path = os.path.join(tmp_dir, name)
+    make_db(db_path)
+    set_db_path(db_path)
+
+    with write_transaction() as conn:
+        conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+    if window is not None:
+        build_window_index(window)
+
+    start = time.perf_counter()
+    add_videos_bulk(synthetic_videos(num_videos, cues_per_video))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = ingest(tmp_dir, "plain.db", num_videos, cues_per_video, None)
+        windowed = ingest(tmp_dir, "windows.db", num_videos, cues_per_video, 2)
+        print(f"videos x cues: {num_videos} x {cues_per_video}")
+        print(f"ingest: {plain:.1f}s without the phrase index, {windowed:.1f}s with 2 cue windows")
+        print()
+
+        print(f"{'index':<16}{'size':>10}{'build':>8}" + "".join(f"{phrase:>26}" for phrase in PHRASES))
+        for window in [None, 2, 3]:
+            if window is None:
+                drop_window_index()
+                name, size, build = "per cue", get_table_sizes(get_read_connection())["Subtitles_fts"], 0.0
+            else:
+                start = time.perf_counter()
+                build_window_index(window)
+                build = time.perf_counter() - start
+                name, size = f"{window} cue windows", get_table_sizes(get_read_connection())["Subtitles_windows"]
+
+            row = f"{name:<16}{format_bytes(size):>10}{build:>7.1f}s"
+            for phrase in PHRASES:
+                latency = median_ms(lambda: list(search_phrase(phrase, limit=LIMIT)))
+                row += f"{latency:>12.1f}ms ({count_hits(phrase):>7})"
+            print(row)
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Render cost of large result sets, highlighting in Python against FTS5 highlight().
+
+    python benchmarks/bench_render.py [num_videos] [cues_per_video]
+
+For each query the 1000 best hits are marked up with utils.bold_query_matches
+(split the cue and compare words) and with search.highlight_markup on the
+text highlight() returned, then printed with SearchHandler.print_fts_res.
+"missed" counts hits whose match the Python markup did not find.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+
+from bench_ingest import synthetic_videos
+from bench_search import median_ms, spread_over_channels
+from yt_fts.connection import set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk, search_all
+from yt_fts.fts import deferred_fts
+from yt_fts.search import SearchHandler, highlight_markup
+from yt_fts.utils import bold_query_matches
+
+QUERIES = ["police", "house arrived", "arriv*", '"the police"']
+LIMIT = 1000
+
+
+def print_hits(hits) -> None:
+    handler = SearchHandler(scope="all", limit=LIMIT)
+    handler.res = hits
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        handler.print_fts_res()
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.executemany("INSERT INTO Channels VALUES (?, ?, ?)",
+                             [(f"UCbench{c}", f"Bench {c}", f"https://youtube.com/channel/UCbench{c}")
+                              for c in range(10)])
+        with deferred_fts():
+            add_videos_bulk(spread_over_channels(synthetic_videos(num_videos, cues_per_video), 10))
+
+        print(f"videos x cues: {num_videos} x {cues_per_video}, limit {LIMIT}")
+        print(f"{'query':<16}{'search sql':>12}{'python markup':>16}{'fts5 markup':>14}"
+              f"{'missed':>8}{'print':>10}")
+        for query in QUERIES:
+            hits = list(search_all(query, LIMIT))
+            sql = median_ms(lambda: list(search_all(query, LIMIT)))
+            python = median_ms(lambda: [bold_query_matches(hit.text, query) for hit in hits])
+            fts5 = median_ms(lambda: [highlight_markup(hit.highlighted) for hit in hits])
+            missed = sum("[bold]" not in bold_query_matches(hit.text, query) for hit in hits)
+            printed = median_ms(lambda: print_hits(hits), runs=3)
+            print(f"{query:<16}{sql:>10.1f}ms{python:>14.2f}ms{fts5:>12.2f}ms{missed:>8}{printed:>8.1f}ms")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
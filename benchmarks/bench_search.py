@@ -0,0 +1,89 @@
+"""
+Latency of `yt-fts search -l 1000` on a large synthetic library.
+
+    python benchmarks/bench_search.py [num_videos] [cues_per_video] [num_channels]
+
+Times the ranked search on its own (titles, dates and channel names are
+joined in), the two lookups per hit print_fts_res used to make on top of it,
+and the whole SearchHandler run with rendering.
+"""
+import contextlib
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_ingest import synthetic_videos
+from yt_fts.connection import set_db_path, write_transaction
+from yt_fts.db_utils import (
+    make_db,
+    add_videos_bulk,
+    search_all,
+    get_channel_name_from_video_id,
+    get_metadata_from_db
+)
+from yt_fts.fts import deferred_fts
+from yt_fts.search import SearchHandler
+
+QUERIES = ["police", "house arrived", "nobody"]
+LIMIT = 1000
+
+
+def spread_over_channels(videos, num_channels: int):
+    for i, (video, cues) in enumerate(videos):
+        video["channel_id"] = f"UCbench{i % num_channels}"
+        yield video, cues
+
+
+def median_ms(func, runs: int = 5) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def per_hit_lookups(hits) -> None:
+    for hit in hits:
+        get_channel_name_from_video_id(hit.video_id)
+        get_metadata_from_db(hit.video_id)
+
+
+def search_command(query: str) -> None:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        SearchHandler(scope="all", limit=LIMIT, cache=False).full_text_search(query)
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    num_channels = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.executemany("INSERT INTO Channels VALUES (?, ?, ?)",
+                             [(f"UCbench{c}", f"Bench {c}", f"https://youtube.com/channel/UCbench{c}")
+                              for c in range(num_channels)])
+        with deferred_fts():
+            add_videos_bulk(spread_over_channels(synthetic_videos(num_videos, cues_per_video), num_channels))
+
+        print(f"videos x cues: {num_videos} x {cues_per_video}, {num_channels} channels, limit {LIMIT}")
+        print(f"{'query':<16}{'search sql':>12}{'per hit lookups':>18}{'search command':>16}")
+        for query in QUERIES:
+            hits = list(search_all(query, LIMIT))
+            sql_only = median_ms(lambda: list(search_all(query, LIMIT)))
+            n_plus_one = median_ms(lambda: per_hit_lookups(hits))
+            command = median_ms(lambda: search_command(query))
+            print(f"{query:<16}{sql_only:>10.1f}ms{n_plus_one:>16.1f}ms{command:>14.1f}ms")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
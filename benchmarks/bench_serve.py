@@ -0,0 +1,94 @@
+"""
+Latency of searches answered by yt-fts serve against a process per search.
+
+    python benchmarks/bench_serve.py [num_videos] [cues_per_video] [num_queries]
+
+Builds a synthetic library with a large vocabulary and starts `yt-fts serve`
+on it, then times:
+
+- `yt-fts search` processes with YT_FTS_NO_SERVER=1 and forwarding to the
+  server, the saving of the server for CLI users
+- num_queries requests of a ServerClient from 1 and 8 threads, what a tool
+  talking to the server directly gets
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_batch import make_queries
+from bench_index_profiles import with_vocabulary
+from bench_ingest import synthetic_videos
+from yt_fts.client import ServerClient, find_server
+from yt_fts.connection import set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk
+from yt_fts.fts import deferred_fts
+
+PROCESS_RUNS = 5
+
+
+def time_processes(queries: list[str], env: dict[str, str]) -> list[float]:
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        subprocess.run(["yt-fts", "search", query], env=env, stdout=subprocess.DEVNULL, check=False)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    num_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # where yt-fts finds it with HOME=tmp_dir
+        os.makedirs(os.path.join(tmp_dir, ".config", "yt-fts"))
+        db_path = os.path.join(tmp_dir, ".config", "yt-fts", "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+        with deferred_fts():
+            add_videos_bulk(with_vocabulary(synthetic_videos(num_videos, cues_per_video)))
+
+        queries = make_queries(num_queries)
+        print(f"videos x cues: {num_videos} x {cues_per_video}, {num_queries} queries")
+
+        env = dict(os.environ, HOME=tmp_dir)
+        server = subprocess.Popen(["yt-fts", "serve"], env=env, stdout=subprocess.DEVNULL)
+        try:
+            while find_server() is None:
+                time.sleep(0.1)
+
+            times = time_processes(queries[:PROCESS_RUNS], dict(env, YT_FTS_NO_SERVER="1"))
+            print(f"yt-fts search, no server:  {statistics.median(times) * 1000:>8.1f} ms median")
+            times = time_processes(queries[:PROCESS_RUNS], env)
+            print(f"yt-fts search, forwarded:  {statistics.median(times) * 1000:>8.1f} ms median")
+
+            with open(os.path.join(tmp_dir, ".config", "yt-fts", "server.json")) as f:
+                client = ServerClient(json.load(f)["address"])
+            options = {"scope": "all", "channel": None, "video_id": None, "limit": 10, "start_ms": None,
+                       "stop_ms": None, "page": 1, "after": None, "cache": False, "substring": False,
+                       "phrase": False, "near": None, "videos": False}
+
+            for threads in [1, 8]:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(threads) as pool:
+                    list(pool.map(lambda query: list(client.search(query, options)), queries))
+                elapsed = time.perf_counter() - start
+                print(f"client, {threads} threads: {num_queries / elapsed:>8.0f} queries/s")
+        finally:
+            server.terminate()
+            server.wait()
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cold start of the CLI: import time and wall time per command.
+
+    python benchmarks/bench_startup.py [runs]
+
+Runs each command in a fresh interpreter with `python -X importtime`
+against an empty library in a temporary HOME, and prints the median wall
+time, the total import time and the packages taking longest to import.
+Commands load their handlers when they run, so `search` should not pay for
+yt_dlp, openai or chromadb; tests/test_startup.py holds it to a budget.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+COMMANDS = [
+    ["--help"],
+    ["search", "police"],
+    ["list"],
+    ["terms", "po"],
+    ["vsearch", "--help"],
+    ["download", "--help"],
+]
+TOP_PACKAGES = 5
+
+
+def run_cli(args: list[str], env: dict[str, str]) -> tuple[float, str]:
+    """
+    Wall time of a cold run of yt-fts args and its -X importtime report
+    """
+    code = f"import sys; sys.argv = ['yt-fts'] + {args!r}; from yt_fts.yt_fts import cli; cli()"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, proc.stderr
+
+
+def import_times(report: str) -> Counter:
+    """
+    Microseconds spent importing each top level package, from the self times
+    of its modules
+    """
+    times = Counter()
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        times[name.strip().split(".")[0]] += int(self_us)
+    return times
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # where yt-fts finds its database with HOME=tmp_dir
+        os.makedirs(os.path.join(tmp_dir, ".config", "yt-fts"))
+        env = dict(os.environ, HOME=tmp_dir, YT_FTS_NO_SERVER="1")
+        # the first run creates the database
+        run_cli(["list"], env)
+
+        for args in COMMANDS:
+            results = [run_cli(args, env) for _ in range(runs)]
+            wall = statistics.median(elapsed for elapsed, _ in results)
+            times = import_times(results[-1][1])
+
+            top = ", ".join(f"{name} {us / 1000:.0f}" for name, us in times.most_common(TOP_PACKAGES))
+            print(f"yt-fts {' '.join(args):<18} {wall * 1000:>6.0f} ms wall, "
+                  f"{sum(times.values()) / 1000:>6.0f} ms imports ({top})")
+
+
+if __name__ == "__main__":
+    main()
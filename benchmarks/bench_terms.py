@@ -0,0 +1,85 @@
+"""
+Autocomplete from the Terms table against scanning fts5vocab.
+
+    python benchmarks/bench_terms.py [num_videos] [cues_per_video]
+
+Ingests a synthetic library with a large vocabulary with and without Terms
+counted, then times prefix lookups in Terms and the same lookup on an
+fts5vocab table, which reads the doclist of every matching term, as well as
+counting Terms from scratch and a "did you mean" suggestion.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_index_profiles import with_vocabulary
+from bench_ingest import synthetic_videos
+from bench_search import median_ms
+from yt_fts.connection import get_read_connection, set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk
+from yt_fts.terms import complete_terms, refresh_terms, suggest_query
+
+PREFIXES = ["p", "po", "pol", "kab"]
+LIMIT = 10
+
+
+def vocab_lookup(prefix: str) -> list[tuple[str, int]]:
+    conn = get_read_connection()
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.bench_vocab USING fts5vocab(main, 'Subtitles_fts', 'row')")
+    return conn.execute("""
+        SELECT term, doc FROM temp.bench_vocab
+        WHERE term >= ? AND term < ?
+        ORDER BY doc DESC, term
+        LIMIT ?
+    """, [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1), LIMIT]).fetchall()
+
+
+def ingest(tmp_dir: str, name: str, num_videos: int, cues_per_video: int, terms: bool) -> float:
+    db_path = os.path.join(tmp_dir, name)
+    make_db(db_path)
+    set_db_path(db_path)
+
+    with write_transaction() as conn:
+        conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+    if terms:
+        refresh_terms()
+
+    start = time.perf_counter()
+    add_videos_bulk(with_vocabulary(synthetic_videos(num_videos, cues_per_video)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = ingest(tmp_dir, "plain.db", num_videos, cues_per_video, False)
+        counted = ingest(tmp_dir, "terms.db", num_videos, cues_per_video, True)
+
+        start = time.perf_counter()
+        refresh_terms()
+        refresh = time.perf_counter() - start
+
+        terms = get_read_connection().execute("SELECT COUNT(*) FROM Terms").fetchone()[0]
+        print(f"videos x cues: {num_videos} x {cues_per_video}, {terms} terms")
+        print(f"ingest: {plain:.1f}s without Terms, {counted:.1f}s counting them")
+        print(f"counting Terms from scratch: {refresh:.2f}s")
+        print()
+
+        print(f"{'prefix':<10}{'fts5vocab':>12}{'Terms':>12}")
+        for prefix in PREFIXES:
+            assert vocab_lookup(prefix) == complete_terms(prefix, LIMIT)
+            scanned = median_ms(lambda: vocab_lookup(prefix), runs=3)
+            looked_up = median_ms(lambda: complete_terms(prefix, LIMIT))
+            print(f"{prefix:<10}{scanned:>10.1f}ms{looked_up:>10.2f}ms")
+
+        print()
+        print(f"did you mean: {median_ms(lambda: suggest_query('polcie arived')):.1f}ms")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Size and latency of the trigram index next to the unicode61 search index.
+
+    python benchmarks/bench_trigram.py [num_videos] [cues_per_video]
+
+Builds a synthetic library, then times the first page (100 hits) of
+search_all for whole words and of search_substring for fragments, with
+search_substring scanning Subtitles before the trigram index is built and
+reading the index after.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_ingest import synthetic_videos
+from bench_search import median_ms
+from yt_fts.connection import get_read_connection, set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk, search_all, search_substring
+from yt_fts.fts import build_trigram_index, deferred_fts, get_table_sizes
+from yt_fts.maintenance import format_bytes
+
+WORDS = ["police", "nobody"]
+FRAGMENTS = ["olic", "ice arr", "obod", "xyz"]
+LIMIT = 100
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        with write_transaction() as conn:
+            conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+        with deferred_fts():
+            add_videos_bulk(synthetic_videos(num_videos, cues_per_video))
+
+        scans = {fragment: median_ms(lambda: list(search_substring(fragment, limit=LIMIT)))
+                 for fragment in FRAGMENTS}
+
+        start = time.perf_counter()
+        build_trigram_index()
+        build_time = time.perf_counter() - start
+
+        sizes = get_table_sizes(get_read_connection())
+        print(f"videos x cues: {num_videos} x {cues_per_video}, first {LIMIT} hits")
+        print(f"Subtitles:         {format_bytes(sizes['Subtitles'])}")
+        print(f"Subtitles_fts:     {format_bytes(sizes['Subtitles_fts'])}")
+        print(f"Subtitles_trigram: {format_bytes(sizes['Subtitles_trigram'])} (built in {build_time:.1f}s)")
+        print()
+
+        print(f"{'query':<12}{'unicode61':>12}{'scan':>12}{'trigram':>12}")
+        for word in WORDS:
+            unicode61 = median_ms(lambda: list(search_all(word, LIMIT)))
+            trigram = median_ms(lambda: list(search_substring(word, limit=LIMIT)))
+            print(f"{word:<12}{unicode61:>10.1f}ms{'':>12}{trigram:>10.1f}ms")
+        for fragment in FRAGMENTS:
+            trigram = median_ms(lambda: list(search_substring(fragment, limit=LIMIT)))
+            print(f"{fragment:<12}{'':>12}{scans[fragment]:>10.1f}ms{trigram:>10.1f}ms")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
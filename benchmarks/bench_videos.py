@@ -0,0 +1,79 @@
+"""
+Ranking whole videos: Videos_fts against counting cue hits in Python.
+
+    python benchmarks/bench_videos.py [num_videos] [cues_per_video]
+
+Builds a synthetic library with the video index, then compares the first
+page (10 videos) of search_videos with reading every cue hit of search_all
+and counting hits per video, the only way to rank videos without the index.
+Also reports the size of the index and what it adds to ingest.
+"""
+import collections
+import os
+import sys
+import tempfile
+import time
+
+from bench_ingest import synthetic_videos
+from bench_search import median_ms
+from yt_fts.connection import get_read_connection, set_db_path, write_transaction
+from yt_fts.db_utils import make_db, add_videos_bulk, search_all, search_videos
+from yt_fts.fts import build_video_index, drop_video_index, get_table_sizes
+from yt_fts.maintenance import format_bytes
+
+QUERIES = ["police", "house arrived", "nobody AND police"]
+LIMIT = 10
+
+
+def count_cue_hits(query: str) -> list[str]:
+    counts = collections.Counter(hit.video_id for hit in search_all(query))
+    return [video_id for video_id, _ in counts.most_common(LIMIT)]
+
+
+def ingest(tmp_dir: str, name: str, num_videos: int, cues_per_video: int, video_index: bool) -> float:
+    db_path = os.path.join(tmp_dir, name)
+    make_db(db_path)
+    set_db_path(db_path)
+
+    with write_transaction() as conn:
+        conn.execute("INSERT INTO Channels VALUES ('UCbench', 'Bench', 'https://youtube.com/channel/UCbench')")
+    if video_index:
+        build_video_index()
+
+    start = time.perf_counter()
+    add_videos_bulk(synthetic_videos(num_videos, cues_per_video))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    num_videos = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    cues_per_video = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plain = ingest(tmp_dir, "plain.db", num_videos, cues_per_video, False)
+        indexed = ingest(tmp_dir, "videos.db", num_videos, cues_per_video, True)
+
+        drop_video_index()
+        start = time.perf_counter()
+        build_video_index()
+        build = time.perf_counter() - start
+
+        sizes = get_table_sizes(get_read_connection())
+        print(f"videos x cues: {num_videos} x {cues_per_video}")
+        print(f"Subtitles_fts: {format_bytes(sizes['Subtitles_fts'])}, "
+              f"Videos_fts: {format_bytes(sizes['Videos_fts'])} (built in {build:.1f}s)")
+        print(f"ingest: {plain:.1f}s without the video index, {indexed:.1f}s with it")
+        print()
+
+        print(f"{'query':<20}{'cue hits':>10}{'count in python':>18}{'search_videos':>16}")
+        for query in QUERIES:
+            hits = sum(1 for _ in search_all(query))
+            counted = median_ms(lambda: count_cue_hits(query), runs=3)
+            ranked = median_ms(lambda: list(search_videos(query, limit=LIMIT)))
+            print(f"{query:<20}{hits:>10}{counted:>16.1f}ms{ranked:>14.1f}ms")
+
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    main()
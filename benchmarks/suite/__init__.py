@@ -0,0 +1,17 @@
+"""
+Reproducible benchmark suite on a synthetic library.
+
+corpus.py generates channels, videos and caption streams of a configurable
+number of cues (10k to 10M) without downloading anything, scenarios.py
+times ingest through DownloadHandler.vtt_to_db, searches of different
+selectivity, export, list, split_subtitles and delete against it, and
+`python -m suite` writes the results as JSON to compare across commits:
+
+    cd benchmarks
+    python -m suite --cues 1000000 -o after.json
+    python -m suite.compare before.json after.json
+
+Generating is streamed channel by channel, memory stays flat with scale.
+At 1M cues a full run takes about two minutes, most of it ingest and the
+searches for the most common word.
+"""
@@ -0,0 +1,115 @@
+"""
+Runs the benchmark suite and writes its results as JSON.
+
+    cd benchmarks
+    python -m suite [--cues 100000] [--scenarios search,export] [-o results.json]
+
+Results carry the commit, versions and corpus spec next to the metrics, so
+runs of two commits can be compared with `python -m suite.compare`.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from yt_fts import __version__
+from yt_fts.connection import set_db_path
+from yt_fts.db_utils import make_db
+
+from .corpus import CorpusSpec
+from .scenarios import SCENARIOS, build, quiet
+
+
+DEFAULT_SPEC = CorpusSpec()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m suite", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cues", type=int, default=DEFAULT_SPEC.cues, help="Cues in the library, 10k to 10M")
+    parser.add_argument("--cues-per-video", type=int, default=DEFAULT_SPEC.cues_per_video)
+    parser.add_argument("--videos-per-channel", type=int, default=DEFAULT_SPEC.videos_per_channel)
+    parser.add_argument("--vocabulary", type=int, default=DEFAULT_SPEC.vocabulary, help="Distinct words")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SPEC.seed)
+    parser.add_argument("--layout", choices=("single", "sharded"), default="single")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per timed operation, the median is reported")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma separated, of {', '.join(SCENARIOS)}")
+    parser.add_argument("-o", "--output", default=None, help="JSON file to write, stdout by default")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    spec = CorpusSpec(args.cues, args.cues_per_video, args.videos_per_channel, args.vocabulary, args.seed)
+
+    selected = args.scenarios.split(",")
+    unknown = set(selected) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {
+        "commit": git_commit(),
+        "version": __version__,
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "layout": args.layout,
+        "runs": args.runs,
+        "corpus": {**spec._asdict(), "videos": spec.num_videos, "channels": spec.num_channels},
+        "scenarios": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "subtitles.db")
+        make_db(db_path)
+        set_db_path(db_path)
+
+        if args.layout == "sharded":
+            from yt_fts.maintenance import change_layout
+            with quiet():
+                change_layout("sharded")
+
+        if "ingest" not in selected:
+            print(f"building {spec.cues} cues...", file=sys.stderr)
+            results["scenarios"]["build"] = build(spec, tmp_dir, args.runs)
+
+        for name, scenario in SCENARIOS.items():
+            if name not in selected:
+                continue
+            print(f"{name}...", file=sys.stderr)
+            start = time.perf_counter()
+            results["scenarios"][name] = scenario(spec, tmp_dir, args.runs)
+            print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+        set_db_path(None)
+
+    # kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["max_rss_bytes"] = max_rss if sys.platform == "darwin" else max_rss * 1024
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
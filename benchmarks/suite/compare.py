@@ -0,0 +1,57 @@
+"""
+Compares two result files of the benchmark suite.
+
+    python -m suite.compare before.json after.json [--threshold 1.1]
+
+Prints every timing both runs have with its change, marking the ones that
+got slower or faster by more than the threshold. Runs over different corpus
+specs are compared with a warning, their numbers mean little side by side.
+"""
+import argparse
+import json
+import sys
+from typing import Iterator
+
+# metrics where lower is better, throughput metrics end in _per_sec
+TIME_METRICS = ("median_ms", "seconds")
+
+
+def timings(results: dict, prefix: str = "") -> Iterator[tuple[str, float]]:
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from timings(value, path)
+        elif key in TIME_METRICS or key.endswith("_per_sec"):
+            yield path, value
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m suite.compare", description=__doc__.split("\n\n")[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=1.1,
+                        help="Ratio from which a change is marked, 1.1 is 10%%")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    if before["corpus"] != after["corpus"] or before["layout"] != after["layout"]:
+        print("warning: the runs used different corpora or layouts", file=sys.stderr)
+
+    print(f"{before['commit']} -> {after['commit']}")
+    old = dict(timings(before["scenarios"]))
+    for path, new_value in timings(after["scenarios"]):
+        if path not in old or old[path] == 0 or new_value == 0:
+            continue
+
+        # > 1 means slower, whichever way the metric goes
+        ratio = new_value / old[path] if not path.endswith("_per_sec") else old[path] / new_value
+        mark = "slower" if ratio >= args.threshold else "faster" if ratio <= 1 / args.threshold else ""
+        print(f"{path:<45} {old[path]:>12.3f} {new_value:>12.3f} {ratio:>7.2f}x {mark}")
+
+
+if __name__ == "__main__":
+    main()
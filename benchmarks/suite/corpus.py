@@ -0,0 +1,208 @@
+"""
+Synthetic channels, videos and caption streams at a given number of cues.
+
+Word frequencies follow Zipf's law over a vocabulary of common English words
+followed by made up ones, like real transcripts do: a few words are in
+almost every cue, most are rare. Every video also has a few topic words it
+repeats. Cues are 4 to 12 words long with timestamps advancing at speaking
+pace, and are written in the word level format of YouTube's automatic
+captions, the one DownloadHandler reads most.
+
+Everything is drawn from random.Random seeded per video, the same spec
+gives the same corpus on every machine and any channel can be regenerated
+on its own.
+"""
+import datetime
+import itertools
+import json
+import os
+import random
+from typing import Iterator, NamedTuple
+
+from yt_fts.db_utils import VideoRecord
+
+COMMON_WORDS = ("the and to of a that is in it you i this so we what was for on be with are they "
+                "have not but just like can do at know all there about one if as going our people "
+                "think get your from really thing now would when then out these right time because "
+                "very more here see make some how which want them actually other also where work "
+                "back well first into way even police house arrived nobody happened").split()
+
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+
+ZIPF_EXPONENT = 1.07
+TOPIC_WORDS = 3
+TOPIC_RATE = 0.3
+SECONDS_PER_WORD = 0.35
+
+
+class CorpusSpec(NamedTuple):
+    cues: int = 10_000
+    cues_per_video: int = 500
+    videos_per_channel: int = 50
+    vocabulary: int = 50_000
+    seed: int = 0
+
+    @property
+    def num_videos(self) -> int:
+        return -(-self.cues // self.cues_per_video)
+
+    @property
+    def num_channels(self) -> int:
+        return -(-self.num_videos // self.videos_per_channel)
+
+
+class Vocabulary:
+    """
+    Words in frequency order and their cumulative Zipf weights for sampling
+    """
+
+    def __init__(self, size: int, seed: int) -> None:
+        rng = random.Random(seed)
+        words = list(dict.fromkeys(COMMON_WORDS))
+        seen = set(words)
+        while len(words) < size:
+            word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+
+        self.words = words
+        self.cum_weights = list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, size + 1)))
+
+    def sample(self, rng: random.Random, k: int) -> list[str]:
+        return rng.choices(self.words, cum_weights=self.cum_weights, k=k)
+
+    def rank_with_share(self, share: float) -> int:
+        """
+        Rank, counting from 0, of the first word drawn less often than share
+        """
+        # the word of rank r is drawn with weight 1 / (r + 1)^s
+        rank = int((share * self.cum_weights[-1]) ** (-1 / ZIPF_EXPONENT))
+        return min(rank, len(self.words) - 1)
+
+
+def format_timestamp(seconds: float) -> str:
+    ms = round(seconds * 1000)
+    return f"{ms // 3_600_000:02d}:{ms // 60_000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def channel_id(channel: int) -> str:
+    return f"UCbench{channel:017d}"
+
+
+def video_id(video: int) -> str:
+    return f"v{video:010d}"
+
+
+def channels(spec: CorpusSpec) -> list[tuple[str, str, str]]:
+    """
+    (channel_id, channel_name, channel_url) of every channel
+    """
+    return [(channel_id(c), f"Bench channel {c}", f"https://youtube.com/channel/{channel_id(c)}")
+            for c in range(spec.num_channels)]
+
+
+def topic_words(vocabulary: Vocabulary, rng: random.Random) -> list[str]:
+    # from the long tail, a topic word is common in its video and rare elsewhere
+    start = len(vocabulary.words) // 10
+    return rng.sample(vocabulary.words[start:], TOPIC_WORDS)
+
+
+def video_cues(vocabulary: Vocabulary, rng: random.Random, topics: list[str],
+               num_cues: int) -> list[dict[str, str]]:
+    cues = []
+    seconds = rng.uniform(0, 2)
+    for _ in range(num_cues):
+        words = vocabulary.sample(rng, rng.randint(4, 12))
+        if rng.random() < TOPIC_RATE:
+            words[rng.randrange(len(words))] = rng.choice(topics)
+
+        duration = len(words) * SECONDS_PER_WORD * rng.uniform(0.8, 1.25)
+        cues.append({
+            "start_time": format_timestamp(seconds),
+            "stop_time": format_timestamp(seconds + duration),
+            "text": " ".join(words),
+        })
+        seconds += duration + rng.uniform(0, 0.5)
+
+    return cues
+
+
+def channel_videos(spec: CorpusSpec, channel: int,
+                   vocabulary: Vocabulary | None = None) -> Iterator[tuple[VideoRecord, list[dict[str, str]]]]:
+    """
+    Videos of one channel with their cues, generated lazily
+    """
+    vocabulary = vocabulary or Vocabulary(spec.vocabulary, spec.seed)
+    first_date = datetime.date(2015, 1, 1)
+
+    first = channel * spec.videos_per_channel
+    last = min(first + spec.videos_per_channel, spec.num_videos)
+    for video in range(first, last):
+        rng = random.Random(f"{spec.seed}:{video}")
+        topics = topic_words(vocabulary, rng)
+        num_cues = min(spec.cues_per_video, spec.cues - video * spec.cues_per_video)
+        title = " ".join(vocabulary.sample(rng, rng.randint(3, 8))).capitalize()
+
+        record: VideoRecord = {
+            "video_id": video_id(video),
+            "video_title": title,
+            "video_url": f"https://youtu.be/{video_id(video)}",
+            "video_date": str(first_date + datetime.timedelta(days=rng.randrange(3650))),
+            "channel_id": channel_id(channel),
+        }
+        yield record, video_cues(vocabulary, rng, topics, num_cues)
+
+
+def library(spec: CorpusSpec) -> Iterator[tuple[VideoRecord, list[dict[str, str]]]]:
+    vocabulary = Vocabulary(spec.vocabulary, spec.seed)
+    for channel in range(spec.num_channels):
+        yield from channel_videos(spec, channel, vocabulary)
+
+
+def write_vtt(path: str, cues: list[dict[str, str]]) -> None:
+    with open(path, "w") as f:
+        f.write("WEBVTT\nKind: captions\nLanguage: en\n\n")
+        for cue in cues:
+            f.write(f"{cue['start_time']} --> {cue['stop_time']} align:start position:0%\n{cue['text']}\n\n")
+
+
+def write_download(tmp_dir: str, videos: Iterator[tuple[VideoRecord, list[dict[str, str]]]]) -> int:
+    """
+    Writes videos as yt-dlp leaves them for DownloadHandler.vtt_to_db, a vtt
+    and an info.json per video, returns the number of cues written
+    """
+    written = 0
+    for video, cues in videos:
+        write_vtt(os.path.join(tmp_dir, f"{video['video_id']}.en.vtt"), cues)
+        with open(os.path.join(tmp_dir, f"{video['video_id']}.info.json"), "w") as f:
+            json.dump({
+                "title": video["video_title"],
+                "upload_date": video["video_date"].replace("-", ""),
+                "channel_id": video["channel_id"],
+            }, f)
+        written += len(cues)
+    return written
+
+
+def queries(spec: CorpusSpec) -> dict[str, str]:
+    """
+    Queries by how many cues they match: a word in most cues, one in about
+    1%, 0.1% and 0.01% of them, a topic word, an AND of two common words, a
+    phrase and a prefix
+    """
+    vocabulary = Vocabulary(spec.vocabulary, spec.seed)
+    words = vocabulary.words
+    # a cue has 8 words on average
+    by_share = {name: words[vocabulary.rank_with_share(cues_share / 8)]
+                for name, cues_share in [("word_1pct", 0.01), ("word_0.1pct", 0.001), ("word_0.01pct", 0.0001)]}
+
+    return {
+        "word_common": words[0],
+        **by_share,
+        # a topic of the first video
+        "topic": topic_words(vocabulary, random.Random(f"{spec.seed}:0"))[0],
+        "and": f"{words[5]} {words[20]}",
+        "phrase": f"\"{words[1]} {words[0]}\"",
+        "prefix": f"{by_share['word_1pct'][:3]}*",
+    }
@@ -0,0 +1,233 @@
+"""
+Timed scenarios against a synthetic library, each returns a dict of metrics.
+
+Scenarios run in the order of SCENARIOS on the database set with
+set_db_path: ingest builds it, the others read it, delete goes last as it
+removes a channel.
+"""
+import contextlib
+import os
+import shutil
+import statistics
+import time
+from typing import Callable, Iterator
+
+from yt_fts.connection import get_subtitle_databases, is_sharded, write_transaction
+from yt_fts.db_utils import add_videos_bulk, delete_channel, search_all, search_channel, search_video
+from yt_fts.fts import deferred_fts
+from yt_fts.maintenance import get_total_size
+
+from .corpus import CorpusSpec, channel_id, channel_videos, channels, library, queries, video_id, write_download
+
+SEARCH_LIMITS = [10, 1000]
+
+
+@contextlib.contextmanager
+def quiet() -> Iterator[None]:
+    """
+    Sends what the handlers print to /dev/null, rendering is still timed
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def timings(func: Callable[[], object], runs: int) -> dict[str, float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3)}
+
+
+def database_bytes() -> int:
+    # rows still in the WAL only count once checkpointed into the database files
+    for channel_id in [None] + [key for key in get_subtitle_databases() if key is not None]:
+        with write_transaction(channel_id) as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return get_total_size()
+
+
+def add_channels(spec: CorpusSpec) -> None:
+    with write_transaction() as conn:
+        conn.executemany("INSERT INTO Channels (channel_id, channel_name, channel_url) VALUES (?, ?, ?)",
+                         channels(spec))
+
+
+def build(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    Fills the database without timing the way there, for runs skipping ingest
+    """
+    add_channels(spec)
+    with deferred_fts():
+        add_videos_bulk(library(spec))
+    return {"database_bytes": database_bytes()}
+
+
+def ingest(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    DownloadHandler.vtt_to_db channel by channel, as `yt-fts download` adds
+    each channel after fetching its subtitles. Writing the files is not timed.
+    """
+    from yt_fts.download.download_handler import DownloadHandler
+
+    add_channels(spec)
+    handler = DownloadHandler()
+    download_dir = os.path.join(tmp_dir, "download")
+
+    seconds = 0.0
+    cues = 0
+    for channel in range(spec.num_channels):
+        os.makedirs(download_dir)
+        cues += write_download(download_dir, channel_videos(spec, channel))
+
+        handler.tmp_dir = download_dir
+        start = time.perf_counter()
+        with quiet():
+            handler.vtt_to_db()
+        seconds += time.perf_counter() - start
+
+        shutil.rmtree(download_dir)
+
+    return {
+        "seconds": round(seconds, 3),
+        "cues": cues,
+        "videos": spec.num_videos,
+        "cues_per_sec": round(cues / seconds),
+        "database_bytes": database_bytes(),
+    }
+
+
+def search(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    Ranked searches of every query in the library, one channel and one
+    video, plus the whole search command with rendering
+    """
+    from yt_fts.search import SearchHandler
+
+    results = {}
+    for name, query in queries(spec).items():
+        scopes = {
+            "all": lambda limit: list(search_all(query, limit)),
+            "channel": lambda limit: list(search_channel(channel_id(0), query, limit)),
+            "video": lambda limit: list(search_video(video_id(0), query, limit)),
+        }
+        result = {"query": query}
+        for scope, func in scopes.items():
+            for limit in SEARCH_LIMITS:
+                result[f"{scope}_{limit}"] = {"hits": len(func(limit)), **timings(lambda: func(limit), runs)}
+
+        def command() -> None:
+            with quiet(), contextlib.suppress(SystemExit):
+                SearchHandler(scope="all", limit=10, cache=False).full_text_search(query)
+
+        result["command_10"] = timings(command, runs)
+        results[name] = result
+
+    return results
+
+
+def export(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    `yt-fts export` of the first channel in both formats, and every hit of
+    a query matching about 1% of cues streamed to CSV as `search -e` does
+    """
+    from yt_fts.export import ExportHandler
+
+    export_dir = os.path.join(tmp_dir, "export")
+    os.makedirs(export_dir)
+    cwd = os.getcwd()
+    os.chdir(export_dir)
+    try:
+        results = {}
+        for format in ["txt", "vtt"]:
+            # the CLI takes the channel name, like users do
+            handler = ExportHandler(scope="channel", format=format, channel=channels(spec)[0][1])
+
+            def export_channel() -> None:
+                with quiet():
+                    handler.export()
+                shutil.rmtree(f"{channel_id(0)}_{format}")
+
+            results[f"channel_{format}"] = timings(export_channel, runs)
+
+        query = queries(spec)["word_1pct"]
+        hits = 0
+
+        def export_hits() -> None:
+            nonlocal hits
+            file_name, hits = ExportHandler(scope="all").export_fts(search_all(query), "all")
+            os.remove(file_name)
+
+        results["search_csv"] = {"query": query, **timings(export_hits, runs)}
+        results["search_csv"]["hits"] = hits
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(export_dir)
+
+
+def list_library(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    The three views of `yt-fts list`
+    """
+    from yt_fts.list import list_channels, show_video_list, show_video_transcript
+
+    views = {
+        "library": list_channels,
+        "channel": lambda: show_video_list(channel_id(0)),
+        "transcript": lambda: show_video_transcript(video_id(0)),
+    }
+    results = {}
+    for name, view in views.items():
+        def render() -> None:
+            with quiet():
+                view()
+
+        results[name] = timings(render, runs)
+    return results
+
+
+def split_subtitles(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    EmbeddingsHandler.split_subtitles over the videos of the first channel,
+    the part of `yt-fts embeddings` that runs before any API call
+    """
+    from yt_fts.llm.get_embeddings import EmbeddingsHandler
+
+    handler = EmbeddingsHandler(interval=30)
+    videos = [video_id(video) for video in range(min(spec.videos_per_channel, spec.num_videos))]
+
+    segments = 0
+
+    def split() -> None:
+        nonlocal segments
+        with quiet():
+            segments = sum(len(handler.split_subtitles(video) or []) for video in videos)
+
+    results = timings(split, runs)
+    return {"videos": len(videos), "segments": segments, **results}
+
+
+def delete(spec: CorpusSpec, tmp_dir: str, runs: int) -> dict:
+    """
+    `yt-fts delete` of the last channel, once since it is gone afterwards
+    """
+    channel = channel_id(spec.num_channels - 1)
+    start = time.perf_counter()
+    delete_channel(channel)
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "sharded": is_sharded(),
+        "database_bytes": database_bytes(),
+    }
+
+
+SCENARIOS: dict[str, Callable[[CorpusSpec, str, int], dict]] = {
+    "ingest": ingest,
+    "search": search,
+    "export": export,
+    "list": list_library,
+    "split_subtitles": split_subtitles,
+    "delete": delete,
+}
@@ -0,0 +1,107 @@
+"""
+On disk cache of search result pages.
+
+Pages are stored in search_cache.db next to the database, keyed on the parsed
+FTS5 query, the scope and the page (limit, offset or cursor). Every entry
+records the data_version of the database it was read from, an entry from an
+older version is a miss and gets dropped. The least recently used entries are
+evicted once the cache grows past YT_FTS_CACHE_SIZE megabytes.
+
+The cache is best effort, failing to read or write it never fails a search.
+"""
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from .config import get_busy_timeout, get_cache_size
+from .connection import get_db_path
+
+CACHE_FILE = "search_cache.db"
+
+
+def get_cache_path(db_path: str | None = None) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or get_db_path())), CACHE_FILE)
+
+
+def cache_enabled() -> bool:
+    return get_cache_size() > 0
+
+
+def make_cache_key(*parts) -> str:
+    return json.dumps(parts)
+
+
+def _connect_cache() -> sqlite3.Connection:
+    busy_timeout = get_busy_timeout()
+    conn = sqlite3.connect(get_cache_path(), timeout=busy_timeout / 1000)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS SearchCache (
+            key TEXT PRIMARY KEY,
+            data_version INTEGER NOT NULL,
+            hits TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """)
+    return conn
+
+
+def get_cached_hits(key: str, data_version: int) -> list[list] | None:
+    """
+    Rows of a cached page, None on a miss
+    """
+    try:
+        with closing(_connect_cache()) as conn:
+            res = conn.execute("SELECT hits FROM SearchCache WHERE key = ? AND data_version = ?",
+                               [key, data_version]).fetchone()
+            if res is None:
+                return None
+
+            with conn:
+                conn.execute("UPDATE SearchCache SET last_used = ? WHERE key = ?", [time.time(), key])
+
+            return json.loads(res[0])
+    except (sqlite3.Error, OSError, ValueError):
+        return None
+
+
+def cache_hits(key: str, data_version: int, hits: list[tuple]) -> None:
+    """
+    Stores a page, drops entries of older data versions and evicts the least
+    recently used entries above the size cap
+    """
+    data = json.dumps(hits)
+    cap = get_cache_size() * 1024 ** 2
+    if len(data) > cap:
+        return
+
+    try:
+        with closing(_connect_cache()) as conn, conn:
+            conn.execute("DELETE FROM SearchCache WHERE data_version != ?", [data_version])
+            conn.execute("INSERT OR REPLACE INTO SearchCache (key, data_version, hits, size, last_used) "
+                         "VALUES (?, ?, ?, ?, ?)", [key, data_version, data, len(data), time.time()])
+            conn.execute("""
+                DELETE FROM SearchCache WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS total
+                        FROM SearchCache
+                    )
+                    WHERE total > ?
+                )
+            """, [cap])
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def clear_cache(db_path: str | None = None) -> None:
+    """
+    Deletes the cache of a database, used when a new database replaces an old one
+    """
+    cache_path = get_cache_path(db_path)
+    for path in [cache_path, f"{cache_path}-wal", f"{cache_path}-shm"]:
+        if os.path.exists(path):
+            os.remove(path)
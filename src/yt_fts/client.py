@@ -0,0 +1,151 @@
+"""
+Client of a running `yt-fts serve`.
+
+The server writes its address to server.json next to the database while it
+runs. Commands that can be answered by it look for that file, check the
+server is alive and forward the request, so they skip opening the database
+and loading Chroma and get the warm caches of the server. Without a server,
+or with YT_FTS_NO_SERVER set, commands run in their own process as usual.
+
+Only the standard library is imported here, forwarding stays cheap.
+"""
+import http.client
+import json
+import os
+import socket
+import urllib.parse
+from typing import TYPE_CHECKING, Any, Iterator
+
+if TYPE_CHECKING:
+    from .db_utils import SearchHit
+
+# seconds to wait for the health check of a server that may have died
+CONNECT_TIMEOUT = 0.5
+
+
+class ServerError(Exception):
+    """
+    The server answered with an error, the message is meant for the user
+    """
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def get_server_file(db_path: str | None = None) -> str:
+    from .connection import get_db_path
+
+    return os.path.join(os.path.dirname(os.path.abspath(db_path or get_db_path())), "server.json")
+
+
+def encode_params(params: dict[str, Any]) -> str:
+    """
+    Query string of params, None values are left out and booleans become 1 and 0
+    """
+    encoded = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = int(value)
+        encoded[key] = value
+    return urllib.parse.urlencode(encoded)
+
+
+class ServerClient:
+    def __init__(self, address: str) -> None:
+        # unix:/path/to/socket or http://127.0.0.1:port
+        self.address = address
+
+    def connect(self, timeout: float | None = None) -> http.client.HTTPConnection:
+        if self.address.startswith("unix:"):
+            return UnixHTTPConnection(self.address[len("unix:"):], timeout)
+
+        url = urllib.parse.urlsplit(self.address)
+        return http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+
+    def request(self, path: str, params: dict[str, Any] | None = None,
+                timeout: float | None = None) -> http.client.HTTPResponse:
+        conn = self.connect(timeout)
+        conn.request("GET", f"{path}?{encode_params(params or {})}")
+        response = conn.getresponse()
+
+        if response.status >= 400 and response.status != 501:
+            raise ServerError(json.loads(response.read())["error"])
+
+        return response
+
+    def get_json(self, path: str, params: dict[str, Any] | None = None) -> Any:
+        with self.request(path, params) as response:
+            return json.loads(response.read())
+
+    def alive(self) -> bool:
+        try:
+            with self.request("/health", timeout=CONNECT_TIMEOUT) as response:
+                response.read()
+                return response.status == 200
+        except (OSError, ServerError, ValueError):
+            return False
+
+    def search(self, query: str, options: dict[str, Any]) -> Iterator["SearchHit"]:
+        """
+        Hits of a search with SearchHandler options, streamed as the server finds them
+        """
+        from .db_utils import SearchHit, format_search_cursor
+
+        params = dict(options, q=query, limit=options["limit"] or 0)
+        if options["after"] is not None:
+            params["after"] = format_search_cursor(options["after"])
+
+        response = self.request("/search", params)
+        with response:
+            for line in response:
+                yield SearchHit(**json.loads(line))
+
+    def vector_search(self, query: str, scope: str, channel: str | None, video_id: str | None,
+                      limit: int | None) -> list[dict] | None:
+        """
+        Semantic search matches, None if the server has no embedding model configured
+        """
+        params = {"q": query, "scope": scope, "channel": channel, "video_id": video_id, "limit": limit}
+        with self.request("/vsearch", params) as response:
+            if response.status == 501:
+                return None
+            return json.loads(response.read())["matches"]
+
+    def transcript(self, video_id: str) -> tuple[str, list[tuple[str, int, str]]]:
+        res = self.get_json("/transcript", {"video_id": video_id})
+        return res["title"], [tuple(cue) for cue in res["cues"]]
+
+    def channels(self) -> list[tuple[int, str, int, str]]:
+        return [tuple(row) for row in self.get_json("/list")["channels"]]
+
+    def videos(self, channel: str) -> list[tuple[str, str]]:
+        return [tuple(row) for row in self.get_json("/list", {"channel": channel})["videos"]]
+
+
+def find_server(db_path: str | None = None) -> ServerClient | None:
+    """
+    Client of the server running on the database, None if there is none
+    """
+    if os.environ.get("YT_FTS_NO_SERVER"):
+        return None
+
+    try:
+        with open(get_server_file(db_path)) as f:
+            address = json.load(f)["address"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    client = ServerClient(address)
+    if not client.alive():
+        return None
+    return client
@@ -1,9 +1,10 @@
 import sys 
 import os
+from typing import TYPE_CHECKING
 
-import chromadb
-from chromadb.config import Settings
-from chromadb.api import ClientAPI
+# chromadb takes most of a second to import, only commands using embeddings load it
+if TYPE_CHECKING:
+    from chromadb.api import ClientAPI
 
 def get_config_path() -> str | None:
 
@@ -91,6 +92,44 @@ def get_db_path() -> str:
     return "subtitles.db" 
 
 
+def get_busy_timeout() -> int:
+    """
+    Milliseconds a connection waits on a locked database before giving up,
+    set with the YT_FTS_BUSY_TIMEOUT environment variable
+    """
+    try:
+        return int(os.environ.get("YT_FTS_BUSY_TIMEOUT", 30000))
+    except ValueError:
+        print("YT_FTS_BUSY_TIMEOUT must be a number of milliseconds, using 30000")
+        return 30000
+
+
+def get_cache_size() -> int:
+    """
+    Megabytes the search result cache may use, set with the YT_FTS_CACHE_SIZE
+    environment variable, 0 turns the cache off
+    """
+    try:
+        return max(0, int(os.environ.get("YT_FTS_CACHE_SIZE", 64)))
+    except ValueError:
+        print("YT_FTS_CACHE_SIZE must be a number of megabytes, using 64")
+        return 64
+
+
+def get_trace_setting() -> tuple[bool, str | None]:
+    """
+    Whether commands print a phase breakdown, and the directory profiles are
+    written to, set with the YT_FTS_TRACE environment variable: 1 for the
+    breakdown, a directory for the breakdown and the profile files
+    """
+    value = os.environ.get("YT_FTS_TRACE", "")
+    if value in ("", "0"):
+        return False, None
+    if value == "1":
+        return True, None
+    return True, value
+
+
 def get_or_make_chroma_path() -> str:
 
     config_path = get_config_path()
@@ -111,7 +150,10 @@ def get_or_make_chroma_path() -> str:
         return chroma_path
 
 
-def get_chroma_client() -> ClientAPI:
+def get_chroma_client() -> "ClientAPI":
+    import chromadb
+    from chromadb.config import Settings
+
     chroma_path = get_or_make_chroma_path()
     return chromadb.PersistentClient(path=chroma_path, 
                                      settings=Settings(anonymized_telemetry=False))
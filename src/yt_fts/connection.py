@@ -0,0 +1,400 @@
+"""
+Process wide SQLite connection manager.
+
+Every thread gets its own lazily opened read connection, writes go through
+a single writer connection guarded by a lock. The database path is resolved
+once per process instead of on every query.
+
+Concurrency model: the database runs in WAL mode, so any number of reader
+processes (search, list, export...) can run while one process writes.
+Commands that write in bulk (download, update) take an advisory lock file
+next to the database with writer_lock() so two of them never interleave.
+Short writes from other processes wait up to the busy timeout
+(YT_FTS_BUSY_TIMEOUT, milliseconds) instead of failing with
+"database is locked".
+
+Sharded layout: when the Settings table has layout = sharded the main
+database is only a catalog of Channels and Videos, the subtitles and search
+index of each channel live in shards/<channel_id>.db next to it. Shard
+connections attach the catalog, so queries joining Subtitles with Videos run
+unchanged against a shard. Functions taking a channel_id route to the shard
+of that channel and to the main database otherwise.
+
+Every write that changes search results bumps data_version in Settings inside
+its transaction, caches of query results compare against it.
+"""
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Iterator
+
+# sqlite_utils imports numpy when available, searches do without it
+if TYPE_CHECKING:
+    from sqlite_utils import Database
+
+_db_path: str | None = None
+_prepared = False
+
+# bumped by close_connections() so threads drop their cached connection
+_generation = 0
+
+_local = threading.local()
+_open_conns: list[sqlite3.Connection] = []
+_open_conns_lock = threading.Lock()
+
+_write_lock = threading.RLock()
+_write_conns: dict[str | None, sqlite3.Connection] = {}
+_write_depths: dict[str | None, int] = {}
+
+_sharded: bool | None = None
+_prepared_shards: set[str] = set()
+_shards_lock = threading.RLock()
+
+
+def get_db_path() -> str:
+    """
+    Returns the resolved database path, creating the db on first use
+    """
+    global _db_path, _prepared
+
+    if _db_path is None:
+        from .config import get_db_path as resolve_db_path
+        _db_path = resolve_db_path()
+
+    if not _prepared:
+        _prepared = True
+        _prepare_database()
+
+    return _db_path
+
+
+def _prepare_database() -> None:
+    from .fts import recover_fts, fts_triggers_missing
+    from .migrations import needs_migration, migrate, SCHEMA_VERSION
+
+    conn = get_read_connection()
+
+    if conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        with _write_lock:
+            get_write_connection().execute("PRAGMA journal_mode = WAL")
+
+    if needs_migration(conn):
+        with _write_lock:
+            # stderr, the first command after an upgrade may be writing csv or JSON to stdout
+            if migrate(get_write_connection()) > 0:
+                print(f"upgraded database schema to version {SCHEMA_VERSION}", file=sys.stderr)
+
+    # missing triggers while another process holds the writer lock is a bulk
+    # import in progress, not an interrupted one
+    if fts_triggers_missing(conn):
+        with writer_lock() as locked:
+            if locked and recover_fts():
+                print("rebuilt full text index after an interrupted import", file=sys.stderr)
+
+
+def _prepare_shard(channel_id: str, conn: sqlite3.Connection) -> None:
+    from .db_utils import create_subtitle_tables
+    from .fts import recover_fts, fts_triggers_missing, get_index_profile, get_storage_profile
+
+    with _shards_lock:
+        if channel_id in _prepared_shards:
+            return
+        _prepared_shards.add(channel_id)
+
+        if conn.execute("PRAGMA main.journal_mode").fetchone()[0] != "wal":
+            conn.execute("PRAGMA main.journal_mode = WAL")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'Subtitles'").fetchone() is None:
+                create_subtitle_tables(conn, get_storage_profile(conn), get_index_profile(conn))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+        if fts_triggers_missing(conn):
+            with writer_lock() as locked:
+                if locked:
+                    recover_fts(channel_id)
+
+
+def set_db_path(db_path: str | None) -> None:
+    """
+    Points the manager at a different database, None resolves it again
+    """
+    global _db_path, _prepared
+
+    close_connections()
+    _db_path = db_path
+    _prepared = False
+    _prepared_shards.clear()
+
+
+def _connect(db_path: str | None = None) -> sqlite3.Connection:
+    from .config import get_busy_timeout
+
+    busy_timeout = get_busy_timeout()
+    conn = sqlite3.connect(db_path or get_db_path(), check_same_thread=False, timeout=busy_timeout / 1000)
+    conn.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+    with _open_conns_lock:
+        _open_conns.append(conn)
+
+    return conn
+
+
+def connect_shard(channel_id: str) -> sqlite3.Connection:
+    """
+    Opens a new connection to the shard of a channel with the catalog
+    attached, creating the shard if needed. Works in either layout.
+    """
+    shard_path = get_shard_path(channel_id)
+    os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+
+    conn = _connect(shard_path)
+    conn.execute("ATTACH DATABASE ? AS catalog", [get_db_path()])
+    _prepare_shard(channel_id, conn)
+
+    return conn
+
+
+def is_sharded() -> bool:
+    global _sharded
+
+    if _sharded is None:
+        res = get_read_connection().execute("SELECT value FROM Settings WHERE key = 'layout'").fetchone()
+        _sharded = res is not None and res[0] == "sharded"
+
+    return _sharded
+
+
+def get_shard_path(channel_id: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(get_db_path())), "shards", f"{channel_id}.db")
+
+
+def get_shard_ids() -> list[str]:
+    """
+    Channels that have a shard on disk, empty unless the layout is sharded
+    """
+    if not is_sharded():
+        return []
+
+    channel_ids = [row[0] for row in get_read_connection().execute("SELECT channel_id FROM Channels")]
+    return [channel_id for channel_id in channel_ids if os.path.exists(get_shard_path(channel_id))]
+
+
+def get_subtitle_databases() -> list[str | None]:
+    """
+    channel_id arguments covering every database that holds subtitles
+    """
+    if is_sharded():
+        return get_shard_ids()
+    return [None]
+
+
+def _shard_key(channel_id: str | None) -> str | None:
+    if channel_id is None or not is_sharded():
+        return None
+    return channel_id
+
+
+def get_read_connection() -> sqlite3.Connection:
+    """
+    Returns the read connection for the calling thread
+    """
+    if getattr(_local, "generation", None) != _generation:
+        # reset_connections leaves the connections of this thread to it
+        for conn in [getattr(_local, "conn", None), *getattr(_local, "shards", {}).values()]:
+            if conn is not None:
+                _close(conn)
+
+        _local.conn = _connect()
+        _local.db = None
+        _local.shards = {}
+        _local.generation = _generation
+
+    return _local.conn
+
+
+def get_subtitle_connection(channel_id: str | None = None) -> sqlite3.Connection:
+    """
+    Read connection for the database holding the subtitles of channel_id
+    """
+    conn = get_read_connection()
+
+    key = _shard_key(channel_id)
+    if key is None:
+        return conn
+
+    if key not in _local.shards:
+        _local.shards[key] = connect_shard(key)
+
+    return _local.shards[key]
+
+
+def get_database() -> "Database":
+    """
+    sqlite_utils wrapper around the read connection for the calling thread
+    """
+    from sqlite_utils import Database
+
+    conn = get_read_connection()
+
+    if _local.db is None:
+        _local.db = Database(conn)
+
+    return _local.db
+
+
+def get_write_connection(channel_id: str | None = None) -> sqlite3.Connection:
+    """
+    Returns the shared writer connection, callers should use write_transaction
+    """
+    with _write_lock:
+        key = _shard_key(channel_id)
+
+        if key not in _write_conns:
+            if key is None:
+                _write_conns[key] = _connect()
+            else:
+                _write_conns[key] = connect_shard(key)
+
+        return _write_conns[key]
+
+
+@contextmanager
+def write_transaction(channel_id: str | None = None) -> Iterator[sqlite3.Connection]:
+    """
+    Holds the writer lock for the duration of the block and commits on exit.
+    Nested blocks on the same database join the outermost transaction.
+    """
+    with _write_lock:
+        key = _shard_key(channel_id)
+        conn = get_write_connection(key)
+        _write_depths[key] = _write_depths.get(key, 0) + 1
+        try:
+            yield conn
+        except BaseException:
+            if _write_depths[key] == 1:
+                conn.rollback()
+            raise
+        else:
+            if _write_depths[key] == 1:
+                conn.commit()
+        finally:
+            _write_depths[key] -= 1
+
+
+def close_connections() -> None:
+    """
+    Closes every connection opened by the manager
+    """
+    global _generation, _sharded
+
+    with _write_lock:
+        with _open_conns_lock:
+            for conn in _open_conns:
+                conn.close()
+            _open_conns.clear()
+
+        _write_conns.clear()
+        _sharded = None
+        _generation += 1
+
+
+def reset_connections() -> None:
+    """
+    Makes every thread open new connections on next use, for long running
+    processes after another process changed the layout or removed shards.
+    Unlike close_connections it leaves connections in use by other threads
+    open until those threads come back for a connection.
+    """
+    global _generation, _sharded
+
+    with _write_lock:
+        for conn in _write_conns.values():
+            _close(conn)
+        _write_conns.clear()
+        _prepared_shards.clear()
+        _sharded = None
+        _generation += 1
+
+
+def _close(conn: sqlite3.Connection) -> None:
+    with _open_conns_lock:
+        if conn in _open_conns:
+            _open_conns.remove(conn)
+    conn.close()
+
+
+def remove_shard(channel_id: str) -> None:
+    """
+    Deletes the shard of a channel from disk
+    """
+    with _write_lock:
+        close_connections()
+
+        shard_path = get_shard_path(channel_id)
+        for path in [shard_path, f"{shard_path}-wal", f"{shard_path}-shm"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+        _prepared_shards.discard(channel_id)
+
+
+def get_data_version() -> int:
+    """
+    Counter bumped by every write that changes search results
+    """
+    res = get_read_connection().execute("SELECT value FROM Settings WHERE key = 'data_version'").fetchone()
+    return 0 if res is None else int(res[0])
+
+
+def bump_data_version(conn: sqlite3.Connection) -> None:
+    """
+    Marks cached search results stale, call inside the write transaction.
+    Shard connections reach the catalog Settings through the attachment.
+    """
+    conn.execute("""
+        INSERT INTO Settings (key, value) VALUES ('data_version', 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1
+    """)
+
+
+@contextmanager
+def writer_lock() -> Iterator[bool]:
+    """
+    Advisory lock shared by every process writing to the database.
+    Yields False without waiting if another process holds it.
+    """
+    lock_file = open(f"{get_db_path()}.lock", "a+")
+
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        yield False
+        return
+
+    try:
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        yield True
+    finally:
+        if sys.platform == "win32":
+            import msvcrt
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        lock_file.close()
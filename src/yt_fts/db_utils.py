@@ -1,16 +1,42 @@
-import sqlite3
 import sys
 import re
+import json
+import time
+import heapq
+import itertools
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, NamedTuple, TypedDict
 
-from sqlite_utils import Database
 from rich.console import Console
 from rich.table import Table
 
-from .utils import show_message, get_date
-from .config import get_db_path, get_chroma_client
+from .utils import show_message, get_date, time_to_ms
+from .cache import clear_cache
+from .config import get_chroma_client
+from .connection import (
+    bump_data_version,
+    get_database,
+    get_read_connection,
+    get_subtitle_connection,
+    get_shard_ids,
+    is_sharded,
+    remove_shard,
+    write_transaction
+)
+from .migrations import migrate
+from .profiling import traced
+from .fts import get_window_size, index_videos, index_windows, table_exists, unindex_videos
+from .terms import add_terms, count_terms, read_vocabulary, subtract_terms, terms_counted
+from .ranking import BM25_SQL, get_channel_boosts, get_ranking, get_score_sql, video_score_sql
 
 
 def make_db(db_path: str) -> None:
+    from sqlite_utils import Database
+
+    # pages cached for a database this one replaces carry matching data versions
+    clear_cache(db_path)
+
     db = Database(db_path)
 
     db["Channels"].create({
@@ -69,47 +95,221 @@ def make_db(db_path: str) -> None:
 
     )
 
+    migrate(db.conn)
 
-def add_channel_info(channel_id: str, channel_name: str, channel_url: str) -> None:
-    db = Database(get_db_path())
 
-    db["Channels"].insert({
-        "channel_id": channel_id,
-        "channel_name": channel_name,
-        "channel_url": channel_url
-    })
+def create_subtitle_tables(conn: sqlite3.Connection, profile: str = "standard", index_profile: str = "default") -> None:
+    """
+    Subtitles with its indexes and search indexes, the schema of a shard
+    """
+    from .fts import (
+        create_fts_table,
+        create_fts_triggers,
+        create_trigram_table,
+        create_video_table,
+        create_window_table,
+        trigram_enabled,
+        video_index_enabled
+    )
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS [Subtitles] (
+            [subtitle_id] INTEGER PRIMARY KEY,
+            [video_id] TEXT,
+            [start_time] TEXT NOT NULL,
+            [stop_time] TEXT,
+            [text] TEXT NOT NULL,
+            [start_ms] INTEGER,
+            [stop_ms] INTEGER
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_subtitles_video_start ON Subtitles(video_id, start_ms)")
+
+    if conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = 'Subtitles_fts'").fetchone() is None:
+        create_fts_table(conn, "Subtitles_fts", profile, index_profile)
+    if trigram_enabled(conn):
+        create_trigram_table(conn)
+    if get_window_size(conn) is not None:
+        create_window_table(conn, index_profile)
+    if video_index_enabled(conn):
+        create_video_table(conn, index_profile)
+    create_fts_triggers(conn)
+
+
+def add_channel_info(channel_id: str, channel_name: str, channel_url: str) -> None:
+    with write_transaction() as conn:
+        conn.execute("""
+                     INSERT INTO Channels (channel_id, channel_name, channel_url)
+                     VALUES (?, ?, ?)
+                     """, (channel_id, channel_name, channel_url))
+        bump_data_version(conn)
 
 
 def add_video(channel_id: str, video_id: str, video_title: str, video_url: str, video_date: str) -> None:
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
-    existing_video = cur.execute("SELECT * FROM Videos WHERE video_id = ?",
-                                 (video_id,)).fetchone()
-
-    if existing_video is None:
-        cur.execute("""
-                    INSERT INTO Videos (video_id, video_title, video_url, video_date, channel_id)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,(video_id, video_title, video_url, video_date, channel_id))
-        conn.commit()
+    with write_transaction() as conn:
+        cur = conn.cursor()
+        existing_video = cur.execute("SELECT * FROM Videos WHERE video_id = ?",
+                                     (video_id,)).fetchone()
+
+        if existing_video is None:
+            cur.execute("""
+                        INSERT INTO Videos (video_id, video_title, video_url, video_date, channel_id)
+                        VALUES (?, ?, ?, ?, ?)
+                        """,(video_id, video_title, video_url, video_date, channel_id))
+            bump_data_version(conn)
 
-    else:
-        print(f"{video_id} Video already exists in the database.")
-    conn.close()
+        else:
+            print(f"{video_id} Video already exists in the database.")
 
 
 def add_subtitle(video_id: str, start_time: str, text: str) -> None:
-    db = Database(get_db_path())
+    with write_transaction() as conn:
+        conn.execute("""
+                     INSERT INTO Subtitles (video_id, timestamp, text)
+                     VALUES (?, ?, ?)
+                     """, (video_id, start_time, text))
+        bump_data_version(conn)
+
+
+class VideoRecord(TypedDict):
+    video_id: str
+    video_title: str
+    video_url: str
+    video_date: str
+    channel_id: str
+
+
+class IngestStats(TypedDict):
+    videos: int
+    skipped_videos: int
+    subtitles: int
+    seconds: float
+    rows_per_sec: float
+    # videos written and seconds of each transaction
+    batches: list[tuple[int, float]]
+
+
+def add_videos_bulk(videos: Iterable[tuple[VideoRecord, list[dict[str, str]]]],
+                    batch_size: int = 500) -> IngestStats:
+    """
+    Inserts (video, subtitles) pairs with one transaction per batch_size videos.
+    Videos already in the database are skipped along with their subtitles.
+    """
+    stats: IngestStats = {
+        "videos": 0,
+        "skipped_videos": 0,
+        "subtitles": 0,
+        "seconds": 0.0,
+        "rows_per_sec": 0.0,
+        "batches": [],
+    }
+    start = time.perf_counter()
+
+    batch = []
+    for video in videos:
+        batch.append(video)
+        if len(batch) >= batch_size:
+            _write_video_batch(batch, stats)
+            batch = []
+
+    if batch:
+        _write_video_batch(batch, stats)
+
+    stats["seconds"] = time.perf_counter() - start
+    if stats["seconds"] > 0:
+        stats["rows_per_sec"] = (stats["videos"] + stats["subtitles"]) / stats["seconds"]
+
+    return stats
+
+
+def _write_video_batch(batch: list[tuple[VideoRecord, list[dict[str, str]]]], stats: IngestStats) -> None:
+    if not is_sharded():
+        _write_channel_batch(None, batch, stats)
+        return
+
+    # each shard commits separately, Videos rows go to the attached catalog
+    by_channel: dict[str, list[tuple[VideoRecord, list[dict[str, str]]]]] = {}
+    for video, subs in batch:
+        by_channel.setdefault(video["channel_id"], []).append((video, subs))
+
+    for channel_id, channel_batch in by_channel.items():
+        _write_channel_batch(channel_id, channel_batch, stats)
+
+
+@traced("db.insert")
+def _write_channel_batch(channel_id: str | None, batch: list[tuple[VideoRecord, list[dict[str, str]]]],
+                         stats: IngestStats) -> None:
+    start = time.perf_counter()
+    with write_transaction(channel_id) as conn:
+        video_ids = [video["video_id"] for video, _ in batch]
+        placeholders = ", ".join("?" for _ in video_ids)
+        existing = {row[0] for row in conn.execute(
+            f"SELECT video_id FROM Videos WHERE video_id IN ({placeholders})", video_ids)}
+
+        fresh = []
+        for video, subs in batch:
+            if video["video_id"] in existing:
+                stats["skipped_videos"] += 1
+                continue
+            existing.add(video["video_id"])
+            fresh.append((video, subs))
+
+        conn.executemany("""
+                         INSERT OR IGNORE INTO Videos (video_id, video_title, video_url, video_date, channel_id)
+                         VALUES (:video_id, :video_title, :video_url, :video_date, :channel_id)
+                         """, [video for video, _ in fresh])
+
+        sub_rows = [(video["video_id"], sub["start_time"], sub["stop_time"], sub["text"],
+                     time_to_ms(sub["start_time"]), time_to_ms(sub["stop_time"]))
+                    for video, subs in fresh for sub in subs]
+        conn.executemany("""
+                         INSERT INTO Subtitles (video_id, start_time, stop_time, text, start_ms, stop_ms)
+                         VALUES (?, ?, ?, ?, ?, ?)
+                         """, sub_rows)
+
+        # without the triggers a deferred load is running, it rebuilds these indexes at the end
+        fresh_ids = [video["video_id"] for video, _ in fresh]
+        if len(fresh) > 0 and table_exists(conn, "Subtitles_windows_ad"):
+            index_windows(conn, get_window_size(conn), fresh_ids)
+        if len(fresh) > 0 and table_exists(conn, "Videos_fts") and table_exists(conn, "Subtitles_ai"):
+            index_videos(conn, fresh_ids)
+        if len(fresh) > 0 and table_exists(conn, "Subtitles_ai") and terms_counted(conn):
+            add_terms(conn, count_terms(conn, (row[3] for row in sub_rows)))
+
+        if len(fresh) > 0:
+            bump_data_version(conn)
+
+    stats["videos"] += len(fresh)
+    stats["subtitles"] += len(sub_rows)
+    stats["batches"].append((len(fresh), time.perf_counter() - start))
+
+
+def get_setting(key: str, default: str | None = None) -> str | None:
+    db = get_database()
+
+    res = db.execute("SELECT value FROM Settings WHERE key = ?", [key]).fetchone()
+    if res is None:
+        return default
+    return res[0]
 
-    db["Subtitles"].insert({
-        "video_id": video_id,
-        "timestamp": start_time,
-        "text": text
-    })
+
+def add_run(summary: dict) -> None:
+    """
+    Appends the metrics summary of a download or update run to the Runs table
+    """
+    with write_transaction() as conn:
+        conn.execute("""
+                     INSERT INTO Runs (command, started, seconds, attempted, succeeded, no_subtitles, failed,
+                                       http_403, http_429, retries, bytes_fetched, videos_added,
+                                       subtitles_added, metrics)
+                     VALUES (:command, :started, :seconds, :attempted, :succeeded, :no_subtitles, :failed,
+                             :http_403, :http_429, :retries, :bytes_fetched, :videos_added,
+                             :subtitles_added, :metrics)
+                     """, {**summary, "metrics": json.dumps(summary)})
 
 
 def get_channels() -> list[tuple[int, str, str, str]]:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute("SELECT ROWID, channel_id, channel_name, channel_url FROM Channels").fetchall()
 
@@ -139,187 +339,704 @@ def parse_query(query: str) -> str:
     return ' '.join(parsed_query)
 
 
-def search_channel(channel_id: str, text: str, limit: int | None = None) -> list[dict[str, int | str]]:
-    conn = sqlite3.connect(get_db_path())
-    curr = conn.cursor()
-    
+class SearchHit(NamedTuple):
+    rowid: int
+    video_id: str
+    start_time: str
+    start_ms: int
+    text: str
+    rank: float
+    video_title: str
+    video_date: str
+    channel_name: str
+    # text with every match wrapped in HIGHLIGHT_START and HIGHLIGHT_END
+    highlighted: str
+
+
+# fts5 highlight() markers, control characters never appear in subtitles so
+# the text can be escaped for rich before they are turned into markup
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+HIGHLIGHT_SQL = "highlight({table}, 0, char(2), char(3))"
+
+# a phrase matches every window holding it, only the window starting with the
+# cue the first match starts in is kept. s is the first cue of the window fts.
+WINDOW_TABLE = "Subtitles_windows"
+WINDOW_FIRST_MATCH_SQL = f"instr({HIGHLIGHT_SQL.format(table=WINDOW_TABLE)}, char(2)) <= length(s.text)"
+
+
+# keyset pagination position, (rank, rowid) of the last hit seen or
+# (start_ms, rowid) when searching a single video. Every shard numbers its
+# rowids on its own, hits merged from shards add the channel_id of theirs.
+SearchCursor = tuple[float, int] | tuple[float, int, str]
+
+
+def format_search_cursor(cursor: SearchCursor) -> str:
+    return ":".join([repr(cursor[0])] + [str(part) for part in cursor[1:]])
+
+
+def parse_search_cursor(token: str) -> SearchCursor:
+    parts = token.split(":")
+    if len(parts) == 3:
+        return float(parts[0]), int(parts[1]), parts[2]
+    key, rowid = parts
+    return float(key), int(rowid)
+
+
+def shard_cursor(after: SearchCursor | None, channel_id: str) -> SearchCursor | None:
+    """
+    The cursor of a search merged from shards as seen by the shard of
+    channel_id, hits are merged by (rank, channel_id, rowid)
+    """
+    if after is None or len(after) == 2:
+        return after
+    rank, rowid, after_channel_id = after
+    if channel_id == after_channel_id:
+        return rank, rowid
+    # shards before it continue after the rank, the ones after it at the rank
+    return (rank, 2 ** 63 - 1) if channel_id < after_channel_id else (rank, -1)
+
+
+def search_channel(channel_id: str, text: str, limit: int | None = None,
+                   after: SearchCursor | None = None, offset: int = 0) -> Iterator[SearchHit]:
+    """
+    Hits in one channel ordered by (rank, rowid), read lazily from the cursor
+    """
     fts5_query = parse_query(text)
+    score = get_score_sql()
+
+    # a shard only holds the channel, no need to filter through Videos
+    if is_sharded():
+        yield from _search_database(channel_id, fts5_query, score, None, limit, after, offset)
+    else:
+        yield from _search_database(None, fts5_query, score, channel_id, limit, after, offset)
+
+
+def search_video(video_id: str, text: str, limit: int | None = None,
+                 start_ms: int | None = None, stop_ms: int | None = None,
+                 after: SearchCursor | None = None, offset: int = 0) -> Iterator[SearchHit]:
+    """
+    Searches one video, optionally only cues starting inside [start_ms, stop_ms).
+    Hits are ordered by (start_ms, rowid).
+    """
+    try:
+        yield from _search_video(video_id, parse_query(text), "Subtitles_fts", limit, start_ms, stop_ms, after, offset)
+
+    except Exception as e:
+        print(e)
+        sys.exit(1)
+
+
+def _search_video(video_id: str, fts5_query: str, table: str, limit: int | None,
+                  start_ms: int | None, stop_ms: int | None,
+                  after: SearchCursor | None, offset: int) -> Iterator[SearchHit]:
+    curr = get_video_connection(video_id).cursor()
+
+    # drive the window from the (video_id, start_ms) index, then probe the fts table per cue
+    sql = f"""
+    SELECT 
+        s.rowid,
+        s.video_id,
+        s.start_time,
+        s.start_ms,
+        {"fts.text" if table == WINDOW_TABLE else "s.text"},
+        fts.rank,
+        v.video_title,
+        v.video_date,
+        c.channel_name,
+        {HIGHLIGHT_SQL.format(table=table)}
+    FROM
+        Subtitles s
+    CROSS JOIN
+        {table} fts ON fts.rowid = s.rowid 
+    JOIN
+        Videos v ON v.video_id = s.video_id
+    JOIN
+        Channels c ON c.channel_id = v.channel_id
+    WHERE
+        s.video_id = ?
+    AND
+        s.start_ms >= ?
+    AND
+        s.start_ms < ?
+    AND
+        fts.text MATCH ?
+    """
+    params = [video_id,
+              start_ms if start_ms is not None else 0,
+              stop_ms if stop_ms is not None else 2 ** 62,
+              fts5_query]
+
+    if table == WINDOW_TABLE:
+        sql += f" AND {WINDOW_FIRST_MATCH_SQL}"
+
+    if after is not None:
+        sql += " AND (s.start_ms, s.rowid) > (?, ?)"
+        params += after[:2]
+
+    sql += " ORDER BY s.start_ms, s.rowid LIMIT ? OFFSET ?"
+    params += [limit if limit is not None else -1, offset]
+
+    curr.execute(sql, params)
 
-    query = """
+    return map(SearchHit._make, curr)
+
+
+_search_pool: ThreadPoolExecutor | None = None
+
+
+def search_all(text: str, limit: int | None = None,
+               after: SearchCursor | None = None, offset: int = 0) -> Iterator[SearchHit]:
+    """
+    Hits across the library ordered by (rank, rowid), read lazily from the cursor
+    """
+    try:
+        fts5_query = parse_query(text)
+        score = get_score_sql()
+
+        if not is_sharded():
+            yield from _search_database(None, fts5_query, score, None, limit, after, offset)
+        else:
+            yield from _search_shards(
+                get_shard_ids(),
+                lambda channel_id, limit, after, offset:
+                    _search_database(channel_id, fts5_query, score, None, limit, after, offset),
+                limit, after, offset)
+
+    except Exception as e:
+        print(e)
+        sys.exit(1)
+
+
+def _search_shards(channel_ids: list[str],
+                   search_database: Callable[[str, int | None, SearchCursor | None, int], Iterator[SearchHit]],
+                   limit: int | None, after: SearchCursor | None, offset: int) -> Iterator[SearchHit]:
+    """
+    Merges the hits search_database(channel_id, limit, after, offset) finds
+    in every shard by (rank, channel_id, rowid). A bounded page is fetched from all shards
+    at once on the search pool, unbounded searches stream from one cursor per
+    shard instead.
+    """
+    global _search_pool
+
+    def shard_hits(channel_id: str, limit: int | None) -> Iterator[tuple[tuple, SearchHit]]:
+        for hit in search_database(channel_id, limit, shard_cursor(after, channel_id), 0):
+            yield (hit.rank, channel_id, hit.rowid), hit
+
+    if limit is None:
+        results = [shard_hits(channel_id, None) for channel_id in channel_ids]
+    else:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(8, thread_name_prefix="yt-fts-search")
+
+        # every shard may hold the whole page, offset included
+        results = _search_pool.map(lambda channel_id: list(shard_hits(channel_id, limit + offset)), channel_ids)
+
+    # rowids of different shards may tie on the same rank, the channel_id breaks the tie
+    merged = heapq.merge(*results, key=lambda keyed: keyed[0])
+    stop = offset + limit if limit is not None else None
+
+    yield from (hit for _, hit in itertools.islice(merged, offset, stop))
+
+
+def _search_database(channel_id: str | None, fts5_query: str, score: str, channel_filter: str | None,
+                     limit: int | None, after: SearchCursor | None, offset: int,
+                     table: str = "Subtitles_fts") -> Iterator[SearchHit]:
+    curr = get_subtitle_connection(channel_id).cursor()
+    windows = table == WINDOW_TABLE
+
+    # rank and page in the subquery, so subtitles, videos and channels are
+    # only looked up for the hits that are returned. highlight() tokenizes
+    # its cue, for a page it runs in the outer query with the match repeated
+    # per returned rowid, so its cost grows with the page and not with the
+    # number of matches. Unlimited searches return every match, the scan
+    # highlights them on the way.
+    highlight = HIGHLIGHT_SQL.format(table=table)
+    sql = f"""
+        SELECT
+            fts.rowid,
+            {score} AS rank
+            {f", {highlight} AS highlighted" if limit is None else ""}
+            {", fts.text AS text" if windows else ""}
+        FROM
+            {table} fts
+    """
+    params: list = []
+
+    # the ranking signals need the cue and its video for every match, windows their first cue
+    if channel_filter is not None or score != BM25_SQL:
+        sql += " JOIN Subtitles s ON fts.rowid = s.rowid JOIN Videos v ON s.video_id = v.video_id"
+    elif windows:
+        sql += " JOIN Subtitles s ON fts.rowid = s.rowid"
+    if score != BM25_SQL:
+        sql += " LEFT JOIN ChannelBoosts b ON b.channel_id = v.channel_id"
+
+    sql += " WHERE fts.text MATCH ?"
+    params.append(fts5_query)
+
+    if windows:
+        sql += f" AND {WINDOW_FIRST_MATCH_SQL}"
+
+    if channel_filter is not None:
+        sql += " AND v.channel_id = ?"
+        params.append(channel_filter)
+
+    if after is not None:
+        sql += f" AND ({score}, fts.rowid) > (?, ?)"
+        params += after[:2]
+
+    sql += f" ORDER BY {score}, fts.rowid LIMIT ? OFFSET ?"
+    params += [limit if limit is not None else -1, offset]
+
+    highlighted = "hits.highlighted"
+    if limit is not None:
+        highlighted = f"(SELECT {highlight} FROM {table} WHERE {table}.text MATCH ? AND {table}.rowid = hits.rowid)"
+
+    sql = f"""
         SELECT 
             s.rowid,
-            s.subtitle_id,
             s.video_id,
             s.start_time,
-            s.stop_time,
-            s.text
-        FROM 
-            Subtitles_fts fts
-        JOIN 
-            Subtitles s ON fts.rowid = s.rowid
-        JOIN 
-            Videos v ON s.video_id = v.video_id
-        WHERE 
-            fts.text MATCH ?
-            AND v.channel_id = ? 
-        ORDER BY 
-            rank
+            s.start_ms,
+            {"hits.text" if windows else "s.text"},
+            hits.rank,
+            v.video_title,
+            v.video_date,
+            c.channel_name,
+            {highlighted}
+        FROM
+            ({sql}) hits
+        JOIN
+            Subtitles s ON s.rowid = hits.rowid
+        JOIN
+            Videos v ON v.video_id = s.video_id
+        JOIN
+            Channels c ON c.channel_id = v.channel_id
+        ORDER BY
+            hits.rank, hits.rowid
     """
-    
-    if limit is not None:
-        query += " LIMIT ?"
-        curr.execute(query, (fts5_query, channel_id, limit))
-    else:
-        curr.execute(query, (fts5_query, channel_id))
 
-    res = curr.fetchall()
-    formatted_res = []
-    for row in res:
-        formatted_res.append({
-            "rowid": row[0],
-            "subtitle_id": row[1],
-            "video_id": row[2],
-            "start_time": row[3],
-            "stop_time": row[4],
-            "text": row[5]
-        })
-    conn.close()
+    # the highlight lookup's match comes first in the statement
+    curr.execute(sql, params if limit is None else [fts5_query] + params)
 
-    return formatted_res
+    return map(SearchHit._make, curr)
 
 
-def search_video(video_id: str, text: str, limit: int | None = None) -> list[dict[str, int | str]]:
+def search_videos(text: str, channel_id: str | None = None, limit: int | None = None,
+                  after: SearchCursor | None = None, offset: int = 0) -> Iterator[SearchHit]:
+    """
+    Videos ordered by the bm25 of their title and transcript, read from
+    Videos_fts. rowid is the first cue of the video, the cue fields are those
+    of its best matching cue or None when no single cue matches, for example
+    when only the title does.
+    """
     try:
-        conn = sqlite3.connect(get_db_path())
-        curr = conn.cursor()
-
         fts5_query = parse_query(text)
-        sql = """
-        SELECT 
-            s.rowid,
-            s.subtitle_id,
+        ranking = get_ranking()
+        boosts = get_channel_boosts()
+        score = video_score_sql(ranking, boosts)
+        ranked = ranking["recency"] != 0 or len(boosts) > 0
+
+        if not is_sharded():
+            videos = _search_video_documents(None, fts5_query, score, ranked, channel_id, limit, after, offset)
+        elif channel_id is not None:
+            videos = _search_video_documents(channel_id, fts5_query, score, ranked, None, limit, after, offset)
+        else:
+            videos = _search_shards(
+                get_shard_ids(),
+                lambda shard_id, limit, after, offset:
+                    _search_video_documents(shard_id, fts5_query, score, ranked, None, limit, after, offset),
+                limit, after, offset)
+
+        # one lookup per returned video, however many cues match
+        for video in videos:
+            cue = _best_cue(get_video_connection(video.video_id), fts5_query, video.rowid, video.video_id)
+            if cue is not None:
+                video = video._replace(start_time=cue[0], start_ms=cue[1], text=cue[2], highlighted=cue[3])
+            yield video
+
+    except Exception as e:
+        print(e)
+        sys.exit(1)
+
+
+def _search_video_documents(channel_id: str | None, fts5_query: str, score: str, ranked: bool,
+                            channel_filter: str | None, limit: int | None, after: SearchCursor | None,
+                            offset: int) -> Iterator[SearchHit]:
+    conn = get_subtitle_connection(channel_id)
+
+    sql = f"""
+        SELECT
+            d.rowid,
+            {score} AS rank
+        FROM
+            Videos_fts d
+    """
+    params: list = []
+
+    if channel_filter is not None or ranked:
+        sql += " JOIN Subtitles s ON s.rowid = d.rowid JOIN Videos v ON v.video_id = s.video_id"
+    if ranked:
+        sql += " LEFT JOIN ChannelBoosts b ON b.channel_id = v.channel_id"
+
+    sql += " WHERE d.Videos_fts MATCH ?"
+    params.append(fts5_query)
+
+    if channel_filter is not None:
+        sql += " AND v.channel_id = ?"
+        params.append(channel_filter)
+
+    if after is not None:
+        sql += f" AND ({score}, d.rowid) > (?, ?)"
+        params += after[:2]
+
+    sql += f" ORDER BY {score}, d.rowid LIMIT ? OFFSET ?"
+    params += [limit if limit is not None else -1, offset]
+
+    sql = f"""
+        SELECT
+            hits.rowid,
             s.video_id,
+            NULL,
+            NULL,
+            NULL,
+            hits.rank,
+            v.video_title,
+            v.video_date,
+            c.channel_name,
+            NULL
+        FROM
+            ({sql}) hits
+        JOIN
+            Subtitles s ON s.rowid = hits.rowid
+        JOIN
+            Videos v ON v.video_id = s.video_id
+        JOIN
+            Channels c ON c.channel_id = v.channel_id
+        ORDER BY
+            hits.rank, hits.rowid
+    """
+
+    return map(SearchHit._make, conn.execute(sql, params))
+
+
+def _best_cue(conn: sqlite3.Connection, fts5_query: str, first_rowid: int,
+              video_id: str) -> tuple[str, int, str, str] | None:
+    """
+    (start_time, start_ms, text, highlighted) of the best matching cue of a video
+    """
+    # the cues of a video were inserted together, bounding the rowid lets fts5
+    # skip to them instead of ranking every match in the library
+    return conn.execute(f"""
+        SELECT
             s.start_time,
-            s.stop_time,
-            s.text 
+            s.start_ms,
+            s.text,
+            {HIGHLIGHT_SQL.format(table="Subtitles_fts")}
         FROM
             Subtitles_fts fts
         JOIN
-            Subtitles s ON fts.rowid = s.rowid 
+            Subtitles s ON s.rowid = fts.rowid
         WHERE
-            s.video_id = ?
-        AND
             fts.text MATCH ?
-        """
+        AND
+            fts.rowid BETWEEN ? AND (SELECT max(rowid) FROM Subtitles WHERE video_id = ?)
+        AND
+            s.video_id = ?
+        ORDER BY
+            fts.rank
+        LIMIT 1
+    """, [fts5_query, first_rowid, video_id, video_id]).fetchone()
 
-        if limit is not None:
-            sql += " LIMIT ?"
-            curr.execute(sql, (video_id, fts5_query, limit))
+
+def phrase_query(text: str, near: int | None = None) -> str:
+    """
+    FTS5 query for the words of text in this order, or with near or fewer
+    words between any two of them in any order
+    """
+    if near is None:
+        return '"' + text.replace('"', '""') + '"'
+
+    terms = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    return f"NEAR({' '.join(terms)}, {near})"
+
+
+def search_phrase(text: str, near: int | None = None, channel_id: str | None = None,
+                  video_id: str | None = None, start_ms: int | None = None, stop_ms: int | None = None,
+                  limit: int | None = None, after: SearchCursor | None = None,
+                  offset: int = 0) -> Iterator[SearchHit]:
+    """
+    Hits of text as a phrase, or its words near each other, ordered like the
+    other searches of the scope. With the phrase index built the match may
+    run over several cues, the hit is the cue it starts in and its text that
+    of the whole window. Otherwise only phrases inside a single cue match.
+    """
+    try:
+        fts5_query = phrase_query(text, near)
+        table = WINDOW_TABLE if get_window_size(get_read_connection()) is not None else "Subtitles_fts"
+
+        if video_id is not None:
+            yield from _search_video(video_id, fts5_query, table, limit, start_ms, stop_ms, after, offset)
+            return
+
+        score = get_score_sql()
+
+        if not is_sharded():
+            yield from _search_database(None, fts5_query, score, channel_id, limit, after, offset, table)
+        elif channel_id is not None:
+            yield from _search_database(channel_id, fts5_query, score, None, limit, after, offset, table)
         else:
-            curr.execute(sql, (video_id, fts5_query))
-        
-        res = curr.fetchall()
-
-        formatted_res = []
-
-        for row in res:
-            formatted_res.append({
-                "rowid": row[0],
-                "subtitle_id": row[1],
-                "video_id": row[2],
-                "start_time": row[3],
-                "stop_time": row[4],
-                "text": row[5]
-            })
-        
-        conn.close()
-        return formatted_res 
+            yield from _search_shards(
+                get_shard_ids(),
+                lambda channel_id, limit, after, offset:
+                    _search_database(channel_id, fts5_query, score, None, limit, after, offset, table),
+                limit, after, offset)
 
     except Exception as e:
         print(e)
         sys.exit(1)
-    finally:
-        conn.close()
 
 
-def search_all(text: str, limit: int | None = None) -> list[dict[str, int | str]]:
-    try:
-        conn = sqlite3.connect(get_db_path())
-        curr = conn.cursor()
-        fts5_query = parse_query(text)
+def substring_pattern(text: str) -> str:
+    """
+    LIKE pattern, with backslash as the escape character, for cues containing
+    text. * and ? match any run of characters and any single character, %
+    and _ only themselves.
+    """
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "%" + escaped.replace("*", "%").replace("?", "_") + "%"
 
-        sql = """
-            SELECT 
-                s.rowid,
-                s.subtitle_id,
-                s.video_id,
-                s.start_time,
-                s.stop_time,
-                s.text
-            FROM
-                Subtitles_fts fts
-            JOIN
-                Subtitles s ON fts.rowid = s.rowid
-            WHERE
-                fts.text MATCH ?
-            ORDER BY
-                rank
-        """
-
-        if limit is not None:
-            sql += " LIMIT ?"
-            curr.execute(sql, (fts5_query, limit))
-        else:
-            curr.execute(sql, (fts5_query,))
 
+def trigram_pattern(pattern: str) -> str:
+    """
+    The trigram index ignores LIKE with an ESCAPE clause, it is read with
+    every escaped character of pattern as _ and the hits checked with pattern
+    """
+    return re.sub(r"\\(.)", "_", pattern)
 
-        res = curr.fetchall()
 
-        formatted_res = []
+def highlight_substring(text: str, pattern: str) -> str:
+    """
+    Wraps the parts of text matching a substring_pattern in highlight markers
+    """
+    tokens = re.findall(r"\\.|.", pattern, flags=re.DOTALL)
+    while tokens and tokens[0] == "%":
+        tokens.pop(0)
+    while tokens and tokens[-1] == "%":
+        tokens.pop()
+    regex = "".join(".*?" if token == "%" else "." if token == "_" else re.escape(token[-1]) for token in tokens)
+    if regex == "":
+        return text
+    return re.sub(f"({regex})", f"{HIGHLIGHT_START}\\1{HIGHLIGHT_END}", text, flags=re.IGNORECASE)
+
+
+def search_substring(text: str, channel_id: str | None = None, video_id: str | None = None,
+                     start_ms: int | None = None, stop_ms: int | None = None, limit: int | None = None,
+                     after: SearchCursor | None = None, offset: int = 0) -> Iterator[SearchHit]:
+    """
+    Cues containing text, using Subtitles_trigram when it was built and a
+    scan of Subtitles otherwise. Hits are in library order, rank is the
+    position of the shard so (rank, rowid) stays unique, or in time order
+    within a video.
+    """
+    try:
+        pattern = substring_pattern(text)
 
-        for row in res:
-            formatted_res.append({
-                "rowid": row[0],
-                "subtitle_id": row[1],
-                "video_id": row[2],
-                "start_time": row[3],
-                "stop_time": row[4],
-                "text": row[5]
-            })
+        if video_id is not None:
+            hits = _search_video_substring(video_id, pattern, start_ms, stop_ms, limit, after, offset)
+        elif not is_sharded():
+            hits = _search_substring_database(None, 0, pattern, channel_id, limit, after, offset)
+        else:
+            channel_ids = [channel_id] if channel_id is not None else get_shard_ids()
+            hits = itertools.islice(itertools.chain.from_iterable(
+                _search_substring_database(key, position, pattern, None,
+                                           limit + offset if limit is not None else None, after, 0)
+                for position, key in enumerate(channel_ids)
+            ), offset, offset + limit if limit is not None else None)
 
-        conn.close()
-        return formatted_res
+        for hit in hits:
+            yield SearchHit(*hit, highlight_substring(hit[4], pattern))
 
     except Exception as e:
         print(e)
         sys.exit(1)
-    
-    finally:
-        conn.close()
+
+
+def _search_substring_database(channel_id: str | None, position: int, pattern: str, channel_filter: str | None,
+                               limit: int | None, after: SearchCursor | None, offset: int) -> Iterator[tuple]:
+    if after is not None and after[0] > position:
+        return iter(())
+
+    conn = get_subtitle_connection(channel_id)
+
+    # read matches from the trigram index in rowid order, without it scan Subtitles
+    if table_exists(conn, "Subtitles_trigram"):
+        source = "Subtitles_trigram t CROSS JOIN Subtitles s ON s.rowid = t.rowid"
+        match = "t"
+        where = "t.text LIKE ?"
+        params: list = [trigram_pattern(pattern)]
+        if params[0] != pattern:
+            where += " AND s.text LIKE ? ESCAPE '\\'"
+            params.append(pattern)
+    else:
+        source = "Subtitles s"
+        match = "s"
+        where = "s.text LIKE ? ESCAPE '\\'"
+        params = [pattern]
+
+    sql = f"""
+        SELECT
+            s.rowid,
+            s.video_id,
+            s.start_time,
+            s.start_ms,
+            s.text,
+            {position},
+            v.video_title,
+            v.video_date,
+            c.channel_name
+        FROM
+            {source}
+        JOIN
+            Videos v ON v.video_id = s.video_id
+        JOIN
+            Channels c ON c.channel_id = v.channel_id
+        WHERE
+            {where}
+    """
+
+    if channel_filter is not None:
+        sql += " AND v.channel_id = ?"
+        params.append(channel_filter)
+
+    if after is not None and after[0] == position:
+        sql += f" AND {match}.rowid > ?"
+        params.append(after[1])
+
+    sql += f" ORDER BY {match}.rowid LIMIT ? OFFSET ?"
+    params += [limit if limit is not None else -1, offset]
+
+    return conn.execute(sql, params)
+
+
+def _search_video_substring(video_id: str, pattern: str, start_ms: int | None, stop_ms: int | None,
+                            limit: int | None, after: SearchCursor | None, offset: int) -> Iterator[tuple]:
+    # the (video_id, start_ms) index narrows a video down further than the trigram index
+    sql = """
+        SELECT
+            s.rowid,
+            s.video_id,
+            s.start_time,
+            s.start_ms,
+            s.text,
+            0,
+            v.video_title,
+            v.video_date,
+            c.channel_name
+        FROM
+            Subtitles s
+        JOIN
+            Videos v ON v.video_id = s.video_id
+        JOIN
+            Channels c ON c.channel_id = v.channel_id
+        WHERE
+            s.video_id = ?
+        AND
+            s.start_ms >= ?
+        AND
+            s.start_ms < ?
+        AND
+            s.text LIKE ? ESCAPE '\\'
+    """
+    params = [video_id,
+              start_ms if start_ms is not None else 0,
+              stop_ms if stop_ms is not None else 2 ** 62,
+              pattern]
+
+    if after is not None:
+        sql += " AND (s.start_ms, s.rowid) > (?, ?)"
+        params += after[:2]
+
+    sql += " ORDER BY s.start_ms, s.rowid LIMIT ? OFFSET ?"
+    params += [limit if limit is not None else -1, offset]
+
+    return get_video_connection(video_id).execute(sql, params)
 
 
 def get_title_from_db(video_id: str) -> str:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute(f"SELECT video_title FROM Videos WHERE video_id = ?", [video_id]).fetchone()[0]
 
 
 def get_metadata_from_db(video_id: str) -> dict[str, any]:
-    db = Database(get_db_path())
+    db = get_database()
 
     metadata = db.execute_returning_dicts(f"SELECT * FROM Videos WHERE video_id = ?", [video_id])[0]
     metadata["video_date"] = get_date(metadata["video_date"])
     return metadata
 
 
+class VideoDetails(TypedDict):
+    video_title: str
+    video_date: str
+    channel_id: str
+    channel_name: str
+
+
+def get_video_details(video_ids: Iterable[str]) -> dict[str, VideoDetails]:
+    """
+    Title, date and channel of many videos with a single query
+    """
+    video_ids = list(set(video_ids))
+    if len(video_ids) == 0:
+        return {}
+
+    db = get_database()
+    placeholders = ", ".join("?" for _ in video_ids)
+
+    rows = db.execute(f"""
+        SELECT v.video_id, v.video_title, v.video_date, v.channel_id, c.channel_name
+        FROM Videos v
+        JOIN Channels c ON c.channel_id = v.channel_id
+        WHERE v.video_id IN ({placeholders})
+        """, video_ids).fetchall()
+
+    return {row[0]: {
+        "video_title": row[1],
+        "video_date": row[2],
+        "channel_id": row[3],
+        "channel_name": row[4],
+    } for row in rows}
+
+
 def get_channel_name_from_id(channel_id: str) -> str:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute(f"SELECT channel_name FROM Channels WHERE channel_id = ?", [channel_id]).fetchone()[0]
 
 
+def get_channel_id_from_video_id(video_id: str) -> str | None:
+    db = get_database()
+
+    res = db.execute("SELECT channel_id FROM Videos WHERE video_id = ?", [video_id]).fetchone()
+    if res is None:
+        return None
+    return res[0]
+
+
+def get_video_connection(video_id: str) -> sqlite3.Connection:
+    """
+    Read connection for the database holding the subtitles of a video
+    """
+    if not is_sharded():
+        return get_read_connection()
+
+    return get_subtitle_connection(get_channel_id_from_video_id(video_id))
+
+
 def get_channel_name_from_video_id(video_id: str) -> str:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute(
         f"SELECT channel_name FROM Channels WHERE channel_id = (SELECT channel_id FROM Videos WHERE video_id = ?)",
@@ -333,21 +1050,42 @@ def delete_channel(channel_id: str) -> None:
     if check_ss_enabled(channel_id):
         delete_channel_from_chroma(channel_id)
 
-    conn = sqlite3.connect(get_db_path())
-    cur = conn.cursor()
+    # read before the catalog is locked, opening a shard for the first time
+    # prepares it in a transaction that needs the attached catalog
+    shard_vocabulary = None
+    if is_sharded() and terms_counted(get_read_connection()):
+        shard_vocabulary = read_vocabulary(get_subtitle_connection(channel_id))
+
+    with write_transaction() as conn:
+        cur = conn.cursor()
+
+        cur.execute("DELETE FROM Channels WHERE channel_id = ?", (channel_id,))
+
+        if shard_vocabulary is not None:
+            subtract_terms(conn, shard_vocabulary)
+        elif terms_counted(conn):
+            subtract_terms(conn, count_terms(conn, [row[0] for row in cur.execute("""
+                SELECT s.text FROM Subtitles s JOIN Videos v ON v.video_id = s.video_id
+                WHERE v.channel_id = ?
+            """, (channel_id,))]))
 
-    cur.execute("DELETE FROM Channels WHERE channel_id = ?", (channel_id,))
+        # make sure to delete all subtitles and embeddings before videos  
+        if not is_sharded():
+            if table_exists(conn, "Videos_fts"):
+                unindex_videos(conn, [row[0] for row in cur.execute(
+                    "SELECT video_id FROM Videos WHERE channel_id = ?", (channel_id,))])
+            cur.execute("DELETE FROM Subtitles WHERE video_id IN (SELECT video_id FROM Videos WHERE channel_id = ?)",
+                        (channel_id,))
 
-    # make sure to delete all subtitles and embeddings before videos  
-    cur.execute("DELETE FROM Subtitles WHERE video_id IN (SELECT video_id FROM Videos WHERE channel_id = ?)",
-                (channel_id,))
+        cur.execute("DELETE FROM Videos WHERE channel_id = ?", (channel_id,))
 
-    cur.execute("DELETE FROM Videos WHERE channel_id = ?", (channel_id,))
+        cur.execute("DELETE FROM SemanticSearchEnabled WHERE channel_id = ?", (channel_id,))
+        cur.execute("DELETE FROM ChannelBoosts WHERE channel_id = ?", (channel_id,))
 
-    cur.execute("DELETE FROM SemanticSearchEnabled WHERE channel_id = ?", (channel_id,))
+        bump_data_version(conn)
 
-    conn.commit()
-    conn.close()
+    if is_sharded():
+        remove_shard(channel_id)
 
 
 def delete_channel_from_chroma(channel_id: str) -> None:
@@ -361,7 +1099,7 @@ def delete_channel_from_chroma(channel_id: str) -> None:
 
 
 def get_channel_id_from_rowid(rowid: str | int) -> str | None:
-    db = Database(get_db_path())
+    db = get_database()
 
     res = db.execute(f"SELECT channel_id FROM Channels WHERE ROWID = ?", [rowid]).fetchone()
 
@@ -372,7 +1110,7 @@ def get_channel_id_from_rowid(rowid: str | int) -> str | None:
 
 
 def get_channel_id_from_name(channel_name: str) -> str | None:
-    db = Database(get_db_path())
+    db = get_database()
 
     res = db.execute(f"SELECT channel_id FROM Channels WHERE channel_name = ?", [channel_name]).fetchall()
 
@@ -398,7 +1136,7 @@ def get_channel_id_from_name(channel_name: str) -> str | None:
 
 # for listing specific channel 
 def get_channel_list_by_id(channel_id: str) -> list[tuple[int, str, str]]:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute(f"SELECT ROWID, channel_name, channel_url FROM Channels WHERE channel_id = ?",
                       [channel_id]).fetchall()
@@ -409,7 +1147,7 @@ def check_if_channel_exists(channel_id: str) -> bool:
     Check if channel exists in the database
     """
 
-    db = Database(get_db_path())
+    db = get_database()
 
     res = db.execute(f"SELECT channel_id FROM Channels WHERE channel_id = ?", [channel_id]).fetchall()
     if len(res) > 0:
@@ -419,19 +1157,19 @@ def check_if_channel_exists(channel_id: str) -> bool:
 
 
 def get_num_vids(channel_id: str) -> int:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute(f"SELECT COUNT(*) FROM Videos WHERE channel_id = ?", [channel_id]).fetchone()[0]
 
 
 def get_vid_ids_by_channel_id(channel_id: str) -> list[tuple[str]]:
-    db = Database(get_db_path())
+    db = get_database()
 
     return db.execute(f"SELECT video_id FROM Videos WHERE channel_id = ?", [channel_id]).fetchall()
 
 
 def get_all_subs_by_channel_id(channel_id: str) -> list[tuple[int, str, str, str, str, str]]:
-    db = Database(get_db_path())
+    db = get_subtitle_connection(channel_id)
 
     parsed_subs = []
     subs = db.execute("""
@@ -451,7 +1189,7 @@ def get_all_subs_by_channel_id(channel_id: str) -> list[tuple[int, str, str, str
 
 # get all subs where semantic search is enabled
 def get_all_subs_by_channel_id_ss(channel_id: str) -> list[tuple[int, str, str, str]]:
-    db = Database(get_db_path())
+    db = get_subtitle_connection(channel_id)
 
     parsed_subs = []
     subs = db.execute("""
@@ -468,18 +1206,38 @@ def get_all_subs_by_channel_id_ss(channel_id: str) -> list[tuple[int, str, str,
 
 
 def get_transcript_by_video_id(video_id: str) -> list[tuple[str]]:
-    db = Database(get_db_path())
+    db = get_video_connection(video_id)
 
     return db.execute(f"SELECT text FROM Subtitles WHERE video_id = ?", [video_id]).fetchall()
 
 
 def get_subs_by_video_id(video_id: str) -> list[tuple[str, str, str]]:
-    db = Database(get_db_path())
+    db = get_video_connection(video_id)
 
     return db.execute(f"SELECT start_time, stop_time, text FROM Subtitles WHERE video_id = ?",
                       [video_id]).fetchall()
 
 
+def get_subs_by_time_range(video_id: str,
+                           start_ms: int = 0,
+                           stop_ms: int | None = None) -> list[tuple[str, int, int, str]]:
+    """
+    Cues of a video starting inside [start_ms, stop_ms) ordered by time,
+    served by the (video_id, start_ms) index
+    """
+    db = get_video_connection(video_id)
+
+    if stop_ms is None:
+        stop_ms = 2 ** 62
+
+    return db.execute("""
+        SELECT start_time, start_ms, stop_ms, text
+        FROM Subtitles
+        WHERE video_id = ? AND start_ms >= ? AND start_ms < ?
+        ORDER BY start_ms
+        """, [video_id, start_ms, stop_ms]).fetchall()
+
+
 def get_channel_id_from_input(channel_input: str | int) -> str:  # yt_fts, export, search, vector_search ... broken
     """
     Checks if the input is a rowid or a channel name and returns channel id
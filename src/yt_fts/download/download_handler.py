@@ -3,21 +3,23 @@ import os
 import sys
 import json
 import random
-import sqlite3
 import tempfile
+import time
 
 import requests
 import yt_dlp
 
 from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterable, Iterator
 from concurrent.futures import ThreadPoolExecutor
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 from xml.etree import ElementTree
 
-from ..config import get_db_path
 from ..db_utils import (
-    add_video,
+    VideoRecord,
+    add_videos_bulk,
     add_channel_info,
     check_if_channel_exists,
     get_channel_id_from_input,
@@ -26,20 +28,30 @@ from ..db_utils import (
     get_channels
 )
 
+from ..fts import deferred_fts
+from ..profiling import phase, traced
 from ..utils import parse_vtt, get_date, handle_reject_consent_cookie
+from .metrics import RunMetrics
 
 from rich.progress import track
 from rich.console import Console
 
 
 class DownloadHandler:
-    def __init__(self, number_of_jobs: int = 8, language: str = 'en', cookies_from_browser: str | None = None) -> None:
+    def __init__(self,
+                 number_of_jobs: int = 8,
+                 language: str = 'en',
+                 cookies_from_browser: str | None = None,
+                 bulk: bool = False) -> None:
 
         self.console = Console()
 
         self.cookies_from_browser = cookies_from_browser
         self.number_of_jobs = number_of_jobs
         self.language = language
+        self.bulk = bulk
+        self.fts_deferred = False
+        self.metrics = RunMetrics()
 
         self.session: requests.Session | None = None
         self.channel_id: str | None = None
@@ -53,6 +65,7 @@ class DownloadHandler:
         self.session = self.init_session(url)
         self.channel_id = self.get_channel_id(url)
         self.channel_name = self.get_channel_name(self.channel_id)
+        self.metrics.add_channel(self.channel_id)
 
         if check_if_channel_exists(self.channel_id):
             self.console.print(f"[yellow]Channel '{self.channel_name}' already exists in database. Updating instead...[/yellow]")
@@ -87,6 +100,7 @@ class DownloadHandler:
             channel_url = video["channel_url"]
             if not check_if_channel_exists(channel_id):
                 add_channel_info(channel_id, channel_name, channel_url)
+            self.metrics.add_channel(channel_id)
 
         self.video_ids = list(set(video["video_id"] for video in playlist_data))
 
@@ -95,7 +109,7 @@ class DownloadHandler:
                                "vtt files[/bold][/green]\n")
             self.tmp_dir = tmp_dir
             self.download_vtts()
-            self.vtt_to_db()
+            self.vtt_to_db(list(set(video["channel_id"] for video in playlist_data)))
 
     def update_channel(self, target_channel: str | int) -> None:
 
@@ -111,6 +125,7 @@ class DownloadHandler:
             channel_url = f"https://www.youtube.com/channel/{self.channel_id}/videos"
             self.session = self.init_session(channel_url)
             self.channel_name = self.get_channel_name(self.channel_id)
+            self.metrics.add_channel(self.channel_id)
             self.console.print(f"Updating channel: {self.channel_name}")
             public_video_ids = self.get_videos_list(channel_url)
             num_public_vids = len(public_video_ids)
@@ -148,8 +163,9 @@ class DownloadHandler:
         all_channels = get_channels()
         all_channel_row_ids = [i[0] for i in all_channels]
 
-        for channel_row_id in all_channel_row_ids:
-            self.update_channel(channel_row_id)
+        with self.defer_fts_updates():
+            for channel_row_id in all_channel_row_ids:
+                self.update_channel(channel_row_id)
 
         self.console.print("[green]Finished updating all channels[/green]")
 
@@ -158,6 +174,7 @@ class DownloadHandler:
         handle_reject_consent_cookie(url, s)
         return s
 
+    @traced("download.channel_info")
     def get_channel_id(self, url: str) -> str | None:
 
         try:
@@ -180,6 +197,7 @@ class DownloadHandler:
             self.console.print(f'Error: {e}')
             sys.exit(1)
 
+    @traced("download.channel_info")
     def get_channel_name(self, channel_id: str) -> str:
 
         session = self.session
@@ -195,6 +213,7 @@ class DownloadHandler:
                                "couldn't get the channel name or channel doesn't exist")
             sys.exit(1)
 
+    @traced("download.list_videos")
     def get_videos_list(self, channel_url: str) -> list[str]:
         with self.console.status("[bold green]Scraping video urls ...") as status:
             ydl_opts = {
@@ -247,6 +266,7 @@ class DownloadHandler:
 
         return list_of_videos_urls
 
+    @traced("download.list_videos")
     def get_playlist_data(self, playlist_url: str) -> list[dict[str, str]]:
         with self.console.status("[bold green]Scraping video urls...") as status:
             ydl_opts = {
@@ -287,12 +307,16 @@ class DownloadHandler:
     def quiet_progress_hook(self, d: dict) -> None:
         console = self.console
         if d['status'] == 'finished':
+            self.metrics.count("bytes_fetched", d.get('downloaded_bytes') or d.get('total_bytes') or 0)
             file_name = Path(d['filename']).name
             console.print(f" -> \"{file_name}\"")
 
+    @traced("download.fetch")
     def get_vtt(self, tmp_dir: str, video_url: str, language: str) -> None:
         max_retries = 3
         retry_delay = 2  # seconds
+        start = time.perf_counter()
+        self.metrics.count("attempted")
         
         for attempt in range(max_retries):
             try:
@@ -324,25 +348,34 @@ class DownloadHandler:
 
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     # First, let's check what subtitles are available
-                    info = ydl.extract_info(video_url, download=False)
+                    with phase("download.extract"):
+                        info = ydl.extract_info(video_url, download=False)
                     if info:
                         available_subs = info.get('subtitles', {}).keys()
                         auto_subs = info.get('automatic_captions', {}).keys()
                         if not available_subs and not auto_subs:
                             self.console.print(f"[yellow]No subtitles available for {video_url}[/yellow]")
+                            self.metrics.count("no_subtitles")
+                            self.metrics.add_latency("fetch", time.perf_counter() - start)
                             return
                    
-                    ydl.download([video_url])
+                    with phase("download.subtitles"):
+                        ydl.download([video_url])
                 
+                self.metrics.count("succeeded")
+                self.metrics.add_latency("fetch", time.perf_counter() - start)
                 return
 
             except Exception as e:
                 error_msg = str(e)
                 self.console.print(f"[yellow]Attempt {attempt + 1}/{max_retries} failed for: {video_url}[/yellow]")
                 self.console.print(f"[red]Warning: {error_msg}[/red]")
+                if attempt < max_retries - 1:
+                    self.metrics.count("retries")
                 
                 # Check if it's a 403 error specifically
                 if "403" in error_msg or "Forbidden" in error_msg:
+                    self.metrics.count("http_403")
                     self.console.print(f"[red]403 Forbidden error detected - YouTube is blocking the request[/red]")
                     self.console.print(f"[yellow]Possible causes:[/yellow]")
                     self.console.print(f"  - Rate limiting (too many requests too quickly)")
@@ -352,7 +385,6 @@ class DownloadHandler:
                     
                     if attempt < max_retries - 1:
                         self.console.print(f"[yellow]Waiting {retry_delay} seconds before retry...[/yellow]")
-                        import time
                         time.sleep(retry_delay)
                         retry_delay *= 2  # Exponential backoff
                     else:
@@ -364,11 +396,11 @@ class DownloadHandler:
                         self.console.print(f"  - Check if the video is available in your region")
                 
                 elif "429" in error_msg or "Too Many Requests" in error_msg:
+                    self.metrics.count("http_429")
                     self.console.print(f"[red]429 Too Many Requests - Rate limit exceeded[/red]")
                     if attempt < max_retries - 1:
                         wait_time = retry_delay * 5  # Longer wait for rate limits
                         self.console.print(f"[yellow]Waiting {wait_time} seconds before retry...[/yellow]")
-                        import time
                         time.sleep(wait_time)
                         retry_delay *= 2
                     else:
@@ -376,57 +408,92 @@ class DownloadHandler:
                         self.console.print(f"[yellow]Try reducing parallel jobs or wait longer[/yellow]")
                 
                 else:
+                    self.metrics.count("other_errors")
                     # For other errors, just retry with normal delay
                     if attempt < max_retries - 1:
                         self.console.print(f"[yellow]Waiting {retry_delay} seconds before retry...[/yellow]")
-                        import time
                         time.sleep(retry_delay)
                         retry_delay *= 2
                     else:
                         self.console.print(f"[red]Failed to get: {video_url}[/red]")
                         self.console.print(f"[red]Error: {error_msg}[/red]")
 
-    def vtt_to_db(self) -> None:
+        self.metrics.count("failed")
+        self.metrics.add_latency("fetch", time.perf_counter() - start)
 
+    @traced("download.vtt_to_db")
+    def vtt_to_db(self, channel_ids: list[str] | None = None) -> None:
+        """
+        Adds the downloaded subtitles of channel_ids, the current channel by default
+        """
         tmp_dir = self.tmp_dir
+        if channel_ids is None and self.channel_id is not None:
+            channel_ids = [self.channel_id]
 
         items = os.listdir(tmp_dir)
         file_paths = [os.path.join(tmp_dir, item) for item in items if item.endswith('.vtt')]
 
-        con = sqlite3.connect(get_db_path())
-        cur = con.cursor()
-
-        for vtt in track(file_paths, description="Adding subtitles to database..."):
-            base_name = os.path.basename(vtt)
+        with self.defer_fts_updates(channel_ids):
+            stats = add_videos_bulk(
+                self.read_vtts(track(file_paths, description="Adding subtitles to database..."))
+            )
 
-            vid_id = base_name.split('.')[0]
-            vid_url = f"https://youtu.be/{vid_id}"
+        self.metrics.count("videos_added", stats["videos"])
+        self.metrics.count("videos_skipped", stats["skipped_videos"])
+        self.metrics.count("subtitles_added", stats["subtitles"])
+        # a transaction inserts many videos, each of them is counted with its share
+        for videos, seconds in stats["batches"]:
+            if videos > 0:
+                self.metrics.add_latency("insert", seconds / videos, videos)
 
-            vid_json_path = os.path.join(os.path.dirname(vtt), f'{vid_id}.info.json')
+        if stats["skipped_videos"] > 0:
+            self.console.print(f"Skipped {stats['skipped_videos']} videos already in the database")
 
-            with open(vid_json_path, 'r', encoding='utf-8', errors='ignore') as f:
-                vid_json = json.load(f)
+        self.console.print(f"Inserted {stats['subtitles']} subtitles from {stats['videos']} videos "
+                           f"({stats['rows_per_sec']:.0f} rows/sec)")
 
-            vid_title = vid_json['title']
-            vid_date = get_date(vid_json['upload_date'])
-            channel_id = vid_json['channel_id']
+    @contextmanager
+    def defer_fts_updates(self, channel_ids: list[str] | None = None) -> Iterator[None]:
+        """
+        In bulk mode the full text index is rebuilt once when the outermost block
+        exits, of the shards of channel_ids or of every one without them
+        """
+        if not self.bulk or self.fts_deferred:
+            yield
+            return
 
-            add_video(channel_id, vid_id, vid_title, vid_url, vid_date)
+        self.fts_deferred = True
+        try:
+            with deferred_fts(channel_ids):
+                yield
+                self.console.print("[green]Rebuilding full text index...[/green]")
+        finally:
+            self.fts_deferred = False
+
+    def read_vtts(self, file_paths: Iterable[str]) -> Iterator[tuple[VideoRecord, list[dict[str, str]]]]:
+        for vtt in file_paths:
+            base_name = os.path.basename(vtt)
 
-            vtt_json = parse_vtt(vtt)
+            vid_id = base_name.split('.')[0]
+            vid_url = f"https://youtu.be/{vid_id}"
 
-            for sub in vtt_json:
-                start_time = sub['start_time']
-                stop_time = sub['stop_time']
-                text = sub['text']
-                cur.execute("""
-                            INSERT INTO Subtitles (video_id, start_time, stop_time, text) 
-                            VALUES (?, ?, ?, ?)
-                            """, (vid_id, start_time, stop_time, text))
+            vid_json_path = os.path.join(os.path.dirname(vtt), f'{vid_id}.info.json')
 
-            con.commit()
+            # timed apart from the yield, the consumer's inserts are db.insert
+            with phase("download.parse"), self.metrics.timer("parse"):
+                with open(vid_json_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    vid_json = json.load(f)
+
+                video: VideoRecord = {
+                    "video_id": vid_id,
+                    "video_title": vid_json['title'],
+                    "video_url": vid_url,
+                    "video_date": get_date(vid_json['upload_date']),
+                    "channel_id": vid_json['channel_id'],
+                }
+                cues = parse_vtt(vtt)
 
-        con.close()
+            yield video, cues
 
     def diagnose_403_errors(self, test_url: str = "https://www.youtube.com/watch?v=dQw4w9WgXcQ") -> None:
         """
@@ -0,0 +1,96 @@
+"""
+Counters and latencies of a download or update run.
+
+DownloadHandler.get_vtt runs on a thread pool, every update goes through a
+lock. summary() is the JSON written by `--metrics` and stored in the Runs
+table by `--log-run`.
+"""
+import bisect
+import datetime
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# upper bounds in milliseconds of the latency histogram buckets, slower ones count as +Inf
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+COUNTERS = ("attempted", "succeeded", "no_subtitles", "failed", "http_403", "http_429", "other_errors",
+            "retries", "bytes_fetched", "videos_added", "videos_skipped", "subtitles_added")
+
+LATENCIES = ("fetch", "parse", "insert")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """
+    Nearest rank percentile of sorted values
+    """
+    index = max(0, min(len(values) - 1, math.ceil(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def histogram(seconds: list[float]) -> dict:
+    values = sorted(s * 1000 for s in seconds)
+    buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for value in values:
+        buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+
+    result = {
+        "count": len(values),
+        "buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS_MS] + ["+Inf"], buckets)),
+    }
+    if values:
+        result.update({
+            "mean": round(sum(values) / len(values), 3),
+            "p50": round(percentile(values, 50), 3),
+            "p90": round(percentile(values, 90), 3),
+            "p99": round(percentile(values, 99), 3),
+            "max": round(values[-1], 3),
+        })
+    return result
+
+
+class RunMetrics:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.started = datetime.datetime.now(datetime.timezone.utc)
+        self.start = time.perf_counter()
+        self.channels: list[str] = []
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.latencies: dict[str, list[float]] = {kind: [] for kind in LATENCIES}
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += n
+
+    def add_latency(self, kind: str, seconds: float, n: int = 1) -> None:
+        """
+        Records seconds for n videos, n > 1 for work done for a batch of them
+        """
+        with self.lock:
+            self.latencies[kind].extend([seconds] * n)
+
+    @contextmanager
+    def timer(self, kind: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_latency(kind, time.perf_counter() - start)
+
+    def add_channel(self, channel_id: str) -> None:
+        with self.lock:
+            if channel_id not in self.channels:
+                self.channels.append(channel_id)
+
+    def summary(self, command: str) -> dict:
+        with self.lock:
+            return {
+                "command": command,
+                "started": self.started.isoformat(timespec="seconds"),
+                "seconds": round(time.perf_counter() - self.start, 3),
+                "channels": list(self.channels),
+                **self.counters,
+                "latency_ms": {kind: histogram(seconds) for kind, seconds in self.latencies.items()},
+            }
@@ -1,22 +1,25 @@
 import csv
 import datetime
+import itertools
+import json
 import os
+from typing import IO, Iterator
 
 from rich.console import Console
 
-from .utils import time_to_secs, show_message
+from .profiling import phase, traced
+from .utils import ms_to_secs, get_date
 from .db_utils import (
-    search_channel,
-    search_video,
-    search_all,
-    get_channel_name_from_video_id,
-    get_metadata_from_db,
+    SearchHit,
     get_channel_id_from_input,
     get_vid_ids_by_channel_id,
     get_subs_by_video_id,
     get_channel_name_from_id
 )
 
+# search exports are written to disk in blocks of this many bytes
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
 
 class ExportHandler:
     def __init__(self, scope: str ="channel", format: str ="txt", channel: str | None = None) -> None:
@@ -25,8 +28,9 @@ class ExportHandler:
         self.scope = scope
 
         if channel is not None:
-            self.channel_id = get_channel_id_from_input(channel)
-            self.channel_name = get_channel_name_from_id(self.channel_id)
+            with phase("export.metadata"):
+                self.channel_id = get_channel_id_from_input(channel)
+                self.channel_name = get_channel_name_from_id(self.channel_id)
         else:
             self.channel_id = None
             self.channel_name = None
@@ -48,53 +52,83 @@ class ExportHandler:
 
 
 
-    def export_fts(self, text: str, scope: str, channel_id: str | None = None, video_id: str | None = None) -> None:
+    @traced("export.csv")
+    def export_fts(self, hits: Iterator[SearchHit], scope: str, channel_id: str | None = None,
+                   video_id: str | None = None) -> tuple[str, int] | None:
         """
-        Calls search functions and exports the results to a csv file
+        Streams search hits to a csv file named after the scope, returns the
+        file name and the number of hits, None and no file without hits
         """
-        console = self.console
-
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
         if scope == "all":
             file_name = f"all_{timestamp}.csv"
-            res = search_all(text)
         if scope == "video":
             file_name = f"video_{video_id}_{timestamp}.csv"
-            res = search_video(video_id, text)
         if scope == "channel":
-            channel_id = get_channel_id_from_input(channel_id)
             file_name = f"channel_{channel_id}_{timestamp}.csv"
-            res = search_channel(channel_id, text)
 
-        if len(res) == 0:
-            show_message("no_matches_found")
+        first = next(hits, None)
+        if first is None:
             return None
 
-        with open(file_name, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['Channel Name', 'Video Title', 'Date', 'Quote', 'Time Stamp', 'Link'])
+        with open(file_name, 'w', newline='', buffering=EXPORT_BUFFER_SIZE) as csvfile:
+            count = self.write_fts_csv(itertools.chain([first], hits), csvfile)
 
-            for quote in res:
-                video_id = quote["video_id"]
-                channel_name = get_channel_name_from_video_id(video_id)
-                metadata = get_metadata_from_db(video_id)
-                time_stamp = quote["start_time"]
-                subs = quote["text"]
-                time = time_to_secs(time_stamp)
+        return file_name, count
 
-                writer.writerow([
-                    channel_name,
-                    metadata['video_title'],
-                    metadata['video_date'],
-                    subs.strip(),
-                    time_stamp,
-                    f"https://youtu.be/{video_id}?t={time}"
-                ])
 
+    def fts_rows(self, hits: Iterator[SearchHit]) -> Iterator[dict[str, str]]:
+        for hit in hits:
+            video_id = hit.video_id
 
-        console.print(f"[bold]{len(res)}[/bold] matches found for text: \"[italic]{text}[/italic]\"")
-        console.print(f"Exported to [green][bold]{file_name}[/bold][/green]")
+            # search --videos hits without a single matching cue
+            if hit.start_ms is None:
+                yield {
+                    "channel_name": hit.channel_name,
+                    "video_title": hit.video_title,
+                    "video_date": str(get_date(hit.video_date)),
+                    "quote": "",
+                    "time_stamp": "",
+                    "link": f"https://youtu.be/{video_id}",
+                }
+                continue
+
+            yield {
+                "channel_name": hit.channel_name,
+                "video_title": hit.video_title,
+                "video_date": str(get_date(hit.video_date)),
+                "quote": hit.text.strip(),
+                "time_stamp": hit.start_time,
+                "link": f"https://youtu.be/{video_id}?t={ms_to_secs(hit.start_ms)}",
+            }
+
+
+    def write_fts_csv(self, hits: Iterator[SearchHit], file: IO[str]) -> int:
+        """
+        Streams search hits to file as csv rows, returns the number written
+        """
+        writer = csv.writer(file)
+        writer.writerow(['Channel Name', 'Video Title', 'Date', 'Quote', 'Time Stamp', 'Link'])
+
+        count = 0
+        for row in self.fts_rows(hits):
+            writer.writerow(row.values())
+            count += 1
+
+        return count
+
+
+    def write_fts_json(self, hits: Iterator[SearchHit], file: IO[str]) -> int:
+        """
+        Streams search hits to file as one JSON object per line, returns the number written
+        """
+        count = 0
+        for row in self.fts_rows(hits):
+            file.write(json.dumps(row) + "\n")
+            count += 1
+
+        return count
 
 
     def export_vector_search(self, res: list, search: str, scope: str) -> None:
@@ -143,12 +177,14 @@ class ExportHandler:
 
         for vid_id in vid_ids:
             vid_id = vid_id[0]
-            subs = get_subs_by_video_id(vid_id)
-            str_subs = ""
-            for sub in subs:
-                str_subs += sub[2] + "\n"
-            with open(f"{output_dir}/{vid_id}.txt", "w") as f:
-                f.write(str_subs)
+            with phase("export.read"):
+                subs = get_subs_by_video_id(vid_id)
+            with phase("export.write"):
+                str_subs = ""
+                for sub in subs:
+                    str_subs += sub[2] + "\n"
+                with open(f"{output_dir}/{vid_id}.txt", "w") as f:
+                    f.write(str_subs)
 
         return output_dir
 
@@ -167,17 +203,19 @@ class ExportHandler:
 
         for vid_id in vid_ids:
             vid_id = vid_id[0]
-            subs = get_subs_by_video_id(vid_id)
+            with phase("export.read"):
+                subs = get_subs_by_video_id(vid_id)
 
-            with open(f"{output_dir}/{vid_id}.vtt", "w") as f:
-                f.write("WEBVTT\n\n")
+            with phase("export.write"):
+                with open(f"{output_dir}/{vid_id}.vtt", "w") as f:
+                    f.write("WEBVTT\n\n")
 
-            for sub in subs:
-                start_time = sub[0]
-                end_time = sub[1]
-                text = sub[2]
+                for sub in subs:
+                    start_time = sub[0]
+                    end_time = sub[1]
+                    text = sub[2]
 
-                with open(f"{output_dir}/{vid_id}.vtt", "a") as f:
-                    f.write(f"{start_time} --> {end_time}\n{text}\n\n")
+                    with open(f"{output_dir}/{vid_id}.vtt", "a") as f:
+                        f.write(f"{start_time} --> {end_time}\n{text}\n\n")
 
         return output_dir
@@ -0,0 +1,619 @@
+"""
+Maintenance of the Subtitles_fts full text index.
+
+The index is an external content FTS5 table over Subtitles kept in sync by
+triggers. Large imports can drop the triggers, load Subtitles and rebuild the
+index once at the end. A missing trigger means such an import was interrupted,
+recover_fts() notices that on startup and rebuilds the index.
+
+Storage profiles trade index size for ranking speed and query features:
+
+- standard: per row token counts stored, positions for every token
+- compact:  no per row token counts (columnsize=0), bm25 re-tokenizes each hit
+- minimal:  compact plus column level detail only, multi word "phrases" and
+            NEAR queries stop working
+
+Index profiles decide how cues are split into terms:
+
+- default:  unicode61 as sqlite-utils created it, "running" only matches running
+            and letters with more than one diacritic are kept (Nguyễn)
+- prefix:   every diacritic folded (nguyen matches Nguyễn) and extra indexes of
+            the first 2 and 3 characters of every term, so short prefix queries
+            like ru* read one doclist instead of merging those of every term
+            starting with ru, at about twice the index size
+- stemmed:  porter stemming on top of the folding unicode61 tokenizer, running,
+            runs and run all match each other
+- stemmed_prefix: stemmed with the prefix indexes
+
+Both kinds of profile are changed by building a new index next to the old one
+and swapping it in, searches keep reading the old index until the swap.
+
+The optional Subtitles_trigram index splits cues into every three character
+sequence, so LIKE '%text%' finds substrings without scanning Subtitles. It is
+built on demand, kept in sync by triggers of its own and rebuilt alongside
+Subtitles_fts. It keeps no positions (detail=none), which is all LIKE needs.
+
+The optional Subtitles_windows index holds the text of every run of N
+consecutive cues of a video, keyed on the subtitle_id of the first cue, so
+phrases split over cues by auto generated captions still match. A phrase is
+found in every window that contains it, searches keep the window it starts
+in the first cue of. Windows need the whole video, so they are indexed per
+ingest batch rather than by an insert trigger, a delete trigger drops the
+window of every deleted cue.
+
+The optional Videos_fts index ranks whole videos, one document per video with
+its title and transcript. It is contentless, keyed on the subtitle_id of the
+first cue of the video, and only serves bm25, the best cue of a video is then
+looked up in Subtitles_fts. Documents are added per ingest batch like the
+windows. Removing one needs the exact text it was indexed with, so cues are
+removed from it before they are deleted, by delete_channel or by a rebuild.
+"""
+import itertools
+import sqlite3
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from .connection import bump_data_version, get_subtitle_connection, get_subtitle_databases, write_transaction
+
+STORAGE_PROFILES = {
+    "standard": {"columnsize": 1, "detail": "full"},
+    "compact": {"columnsize": 0, "detail": "full"},
+    "minimal": {"columnsize": 0, "detail": "column"},
+}
+
+INDEX_PROFILES = {
+    "default": {"tokenize": "unicode61", "prefix": None},
+    "prefix": {"tokenize": "unicode61 remove_diacritics 2", "prefix": "2 3"},
+    "stemmed": {"tokenize": "porter unicode61 remove_diacritics 2", "prefix": None},
+    "stemmed_prefix": {"tokenize": "porter unicode61 remove_diacritics 2", "prefix": "2 3"},
+}
+
+FTS_TRIGGERS = {
+    "Subtitles_ai": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_ai] AFTER INSERT ON [Subtitles] BEGIN
+          INSERT INTO [Subtitles_fts] (rowid, [text]) VALUES (new.rowid, new.[text]);
+        END
+    """,
+    "Subtitles_ad": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_ad] AFTER DELETE ON [Subtitles] BEGIN
+          INSERT INTO [Subtitles_fts] ([Subtitles_fts], rowid, [text]) VALUES('delete', old.rowid, old.[text]);
+        END
+    """,
+    "Subtitles_au": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_au] AFTER UPDATE OF [text] ON [Subtitles] BEGIN
+          INSERT INTO [Subtitles_fts] ([Subtitles_fts], rowid, [text]) VALUES('delete', old.rowid, old.[text]);
+          INSERT INTO [Subtitles_fts] (rowid, [text]) VALUES (new.rowid, new.[text]);
+        END
+    """,
+}
+
+
+TRIGRAM_TRIGGERS = {
+    "Subtitles_trigram_ai": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_trigram_ai] AFTER INSERT ON [Subtitles] BEGIN
+          INSERT INTO [Subtitles_trigram] (rowid, [text]) VALUES (new.rowid, new.[text]);
+        END
+    """,
+    "Subtitles_trigram_ad": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_trigram_ad] AFTER DELETE ON [Subtitles] BEGIN
+          INSERT INTO [Subtitles_trigram] ([Subtitles_trigram], rowid, [text]) VALUES('delete', old.rowid, old.[text]);
+        END
+    """,
+    "Subtitles_trigram_au": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_trigram_au] AFTER UPDATE OF [text] ON [Subtitles] BEGIN
+          INSERT INTO [Subtitles_trigram] ([Subtitles_trigram], rowid, [text]) VALUES('delete', old.rowid, old.[text]);
+          INSERT INTO [Subtitles_trigram] (rowid, [text]) VALUES (new.rowid, new.[text]);
+        END
+    """,
+}
+
+
+WINDOW_TRIGGERS = {
+    "Subtitles_windows_ad": """
+        CREATE TRIGGER IF NOT EXISTS [Subtitles_windows_ad] AFTER DELETE ON [Subtitles] BEGIN
+          DELETE FROM [Subtitles_windows] WHERE rowid = old.rowid;
+        END
+    """,
+}
+
+# text of the window starting at every cue, the cue and the next ones of its video
+WINDOW_SQL = """
+    SELECT rowid, text FROM (
+        SELECT
+            s.rowid,
+            group_concat(s.text, ' ') OVER (
+                PARTITION BY s.video_id ORDER BY s.start_ms, s.rowid
+                ROWS BETWEEN CURRENT ROW AND {following} FOLLOWING
+            ) AS text
+        FROM
+            Subtitles s
+        {where}
+    )
+"""
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM main.sqlite_master WHERE name = ?", [name]).fetchone() is not None
+
+
+def create_fts_triggers(conn: sqlite3.Connection) -> None:
+    for sql in FTS_TRIGGERS.values():
+        conn.execute(sql)
+
+    if table_exists(conn, "Subtitles_trigram"):
+        for sql in TRIGRAM_TRIGGERS.values():
+            conn.execute(sql)
+
+    if table_exists(conn, "Subtitles_windows"):
+        for sql in WINDOW_TRIGGERS.values():
+            conn.execute(sql)
+
+
+def drop_fts_triggers(conn: sqlite3.Connection) -> None:
+    for name in [*FTS_TRIGGERS, *TRIGRAM_TRIGGERS, *WINDOW_TRIGGERS]:
+        conn.execute(f"DROP TRIGGER IF EXISTS main.[{name}]")
+
+
+def fts_triggers_missing(conn: sqlite3.Connection) -> bool:
+    names = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type IN ('table', 'trigger')")}
+
+    if "Subtitles_fts" not in names:
+        return False
+
+    expected = set(FTS_TRIGGERS)
+    if "Subtitles_trigram" in names:
+        expected |= set(TRIGRAM_TRIGGERS)
+    if "Subtitles_windows" in names:
+        expected |= set(WINDOW_TRIGGERS)
+
+    return not expected <= names
+
+
+def rebuild_fts(conn: sqlite3.Connection) -> None:
+    """
+    Rebuilds Subtitles_fts, and Subtitles_trigram, Subtitles_windows and
+    Videos_fts if there are, from the Subtitles table and merges their segments
+    """
+    conn.execute("INSERT INTO Subtitles_fts(Subtitles_fts) VALUES('rebuild')")
+    conn.execute("INSERT INTO Subtitles_fts(Subtitles_fts) VALUES('optimize')")
+
+    if table_exists(conn, "Subtitles_trigram"):
+        conn.execute("INSERT INTO Subtitles_trigram(Subtitles_trigram) VALUES('rebuild')")
+        conn.execute("INSERT INTO Subtitles_trigram(Subtitles_trigram) VALUES('optimize')")
+
+    if table_exists(conn, "Subtitles_windows"):
+        build_window_table(conn, get_index_profile(conn), get_window_size(conn))
+
+    if table_exists(conn, "Videos_fts"):
+        build_video_table(conn, get_index_profile(conn))
+
+
+def rebuild_fts_and_terms(conn: sqlite3.Connection) -> None:
+    """
+    rebuild_fts after a load without triggers, replacing what the database
+    counted towards Terms. The index still holds what it did before the load.
+    """
+    from .terms import add_terms, read_vocabulary, subtract_terms, terms_counted
+
+    counted = terms_counted(conn)
+    if counted:
+        subtract_terms(conn, read_vocabulary(conn))
+    rebuild_fts(conn)
+    if counted:
+        add_terms(conn, read_vocabulary(conn))
+
+
+@contextmanager
+def deferred_fts(channel_ids: Iterable[str] | None = None) -> Iterator[None]:
+    """
+    Suspends the FTS triggers while the block loads Subtitles, then rebuilds
+    the index and restores the triggers, one transaction per database. In the
+    sharded layout only the shards of channel_ids are suspended when given,
+    the rest of the library is not rebuilt.
+    """
+    databases = get_subtitle_databases()
+    if channel_ids is not None:
+        channel_ids = set(channel_ids)
+        databases = [channel_id for channel_id in databases if channel_id is None or channel_id in channel_ids]
+
+    for channel_id in databases:
+        with write_transaction(channel_id) as conn:
+            drop_fts_triggers(conn)
+
+    try:
+        yield
+    finally:
+        # shards created inside the block have their triggers and are left alone
+        for channel_id in databases:
+            with write_transaction(channel_id) as conn:
+                rebuild_fts_and_terms(conn)
+                create_fts_triggers(conn)
+                bump_data_version(conn)
+
+
+def recover_fts(channel_id: str | None = None) -> bool:
+    """
+    Finishes an interrupted deferred load, returns True if the index was rebuilt
+    """
+    if not fts_triggers_missing(get_subtitle_connection(channel_id)):
+        return False
+
+    with write_transaction(channel_id) as conn:
+        if not fts_triggers_missing(conn):
+            return False
+        rebuild_fts_and_terms(conn)
+        create_fts_triggers(conn)
+        bump_data_version(conn)
+
+    return True
+
+
+def create_fts_table(conn: sqlite3.Connection, name: str, profile: str, index_profile: str = "default") -> None:
+    options = STORAGE_PROFILES[profile]
+    tokenizer = INDEX_PROFILES[index_profile]
+
+    prefix = ""
+    if tokenizer["prefix"] is not None:
+        prefix = f"prefix='{tokenizer['prefix']}',"
+
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE [{name}] USING FTS5 (
+            [text],
+            content=[Subtitles],
+            tokenize='{tokenizer["tokenize"]}',
+            {prefix}
+            columnsize={options["columnsize"]},
+            detail={options["detail"]}
+        )
+    """)
+
+
+def build_fts_table(conn: sqlite3.Connection, profile: str, index_profile: str = "default") -> None:
+    """
+    Builds a new Subtitles_fts with the given storage and index profiles next
+    to the old one and swaps it in. Run inside a write transaction, readers
+    keep using the old index until it commits.
+    """
+    conn.execute("DROP TABLE IF EXISTS [Subtitles_fts_new]")
+    create_fts_table(conn, "Subtitles_fts_new", profile, index_profile)
+    conn.execute("INSERT INTO [Subtitles_fts_new]([Subtitles_fts_new]) VALUES('rebuild')")
+    conn.execute("INSERT INTO [Subtitles_fts_new]([Subtitles_fts_new]) VALUES('optimize')")
+
+    # the triggers reference Subtitles_fts and would break the rename
+    drop_fts_triggers(conn)
+    conn.execute("DROP TABLE IF EXISTS [Subtitles_fts]")
+    conn.execute("ALTER TABLE [Subtitles_fts_new] RENAME TO [Subtitles_fts]")
+    create_fts_triggers(conn)
+
+
+def set_storage_profile(profile: str) -> None:
+    """
+    Rebuilds the index of every database with profile and records it for new shards
+    """
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            build_fts_table(conn, profile, get_index_profile(conn))
+
+    with write_transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('storage_profile', ?)", (profile,))
+        bump_data_version(conn)
+
+
+def get_storage_profile(conn: sqlite3.Connection) -> str:
+    res = conn.execute("SELECT value FROM Settings WHERE key = 'storage_profile'").fetchone()
+    if res is None:
+        return "standard"
+    return res[0]
+
+
+def phrases_supported(conn: sqlite3.Connection) -> bool:
+    """
+    False when Subtitles_fts keeps no token positions, phrase and NEAR
+    queries then fail with an fts5 error
+    """
+    return STORAGE_PROFILES[get_storage_profile(conn)]["detail"] == "full"
+
+
+def needs_positions(fts5_query: str, index_profile: str) -> bool:
+    """
+    True when fts5_query holds a phrase or NEAR group. Words split by the
+    tokenizer, like don't, are phrases too, so the query is tried against an
+    empty index without positions rather than parsed here.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        create_fts_table(conn, "Probe_fts", "minimal", index_profile)
+        conn.execute("SELECT rowid FROM Probe_fts WHERE text MATCH ?", [fts5_query]).fetchall()
+        return False
+    except sqlite3.OperationalError as e:
+        return "detail!=full" in str(e)
+    finally:
+        conn.close()
+
+
+def set_index_profile(profile: str) -> None:
+    """
+    Rebuilds the index of every database with the tokenizer and prefix indexes
+    of profile and records it for new shards
+    """
+    from .terms import recount_terms
+
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            build_fts_table(conn, get_storage_profile(conn), profile)
+            if table_exists(conn, "Subtitles_windows"):
+                build_window_table(conn, profile, get_window_size(conn))
+            if table_exists(conn, "Videos_fts"):
+                build_video_table(conn, profile)
+
+    with write_transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('index_profile', ?)", (profile,))
+        bump_data_version(conn)
+
+    recount_terms()
+
+
+def get_index_profile(conn: sqlite3.Connection) -> str:
+    res = conn.execute("SELECT value FROM Settings WHERE key = 'index_profile'").fetchone()
+    if res is None:
+        return "default"
+    return res[0]
+
+
+def create_trigram_table(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS [Subtitles_trigram] USING FTS5 (
+            [text],
+            content=[Subtitles],
+            tokenize='trigram',
+            detail=none
+        )
+    """)
+
+
+def trigram_enabled(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM Settings WHERE key = 'trigram_index' AND value = '1'").fetchone() is not None
+
+
+def build_trigram_index() -> None:
+    """
+    Builds Subtitles_trigram in every database and records it for new shards
+    """
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            create_trigram_table(conn)
+            conn.execute("INSERT INTO Subtitles_trigram(Subtitles_trigram) VALUES('rebuild')")
+            conn.execute("INSERT INTO Subtitles_trigram(Subtitles_trigram) VALUES('optimize')")
+            create_fts_triggers(conn)
+
+    with write_transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('trigram_index', '1')")
+        bump_data_version(conn)
+
+
+def drop_trigram_index() -> None:
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            for name in TRIGRAM_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS main.[{name}]")
+            conn.execute("DROP TABLE IF EXISTS main.[Subtitles_trigram]")
+
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM Settings WHERE key = 'trigram_index'")
+        bump_data_version(conn)
+
+
+def create_window_table(conn: sqlite3.Connection, index_profile: str) -> None:
+    # the text of a window is its own content, deleting a cue cannot re-read
+    # the windows of the cues before it from Subtitles
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS [Subtitles_windows] USING FTS5 (
+            [text],
+            tokenize='{INDEX_PROFILES[index_profile]["tokenize"]}'
+        )
+    """)
+
+
+def get_window_size(conn: sqlite3.Connection) -> int | None:
+    """
+    Cues per window of the phrase index, None when it is not built
+    """
+    res = conn.execute("SELECT value FROM Settings WHERE key = 'phrase_window'").fetchone()
+    if res is None:
+        return None
+    return int(res[0])
+
+
+def index_windows(conn: sqlite3.Connection, size: int, video_ids: list[str] | None = None) -> None:
+    """
+    Adds the windows of video_ids, or of every video, to Subtitles_windows
+    """
+    where = ""
+    params: list[str] = []
+    if video_ids is not None:
+        where = f"WHERE s.video_id IN ({', '.join('?' for _ in video_ids)})"
+        params = video_ids
+
+    conn.execute(f"INSERT INTO Subtitles_windows (rowid, text) {WINDOW_SQL.format(following=size - 1, where=where)}",
+                 params)
+
+
+def build_window_table(conn: sqlite3.Connection, index_profile: str, size: int) -> None:
+    conn.execute("DROP TABLE IF EXISTS main.[Subtitles_windows]")
+    create_window_table(conn, index_profile)
+    index_windows(conn, size)
+    conn.execute("INSERT INTO Subtitles_windows(Subtitles_windows) VALUES('optimize')")
+
+
+def build_window_index(size: int) -> None:
+    """
+    Builds Subtitles_windows with size cues per window in every database
+    """
+    # recorded first, new shards and rebuilds read the size from Settings
+    with write_transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('phrase_window', ?)", (size,))
+
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            build_window_table(conn, get_index_profile(conn), size)
+            create_fts_triggers(conn)
+
+    with write_transaction() as conn:
+        bump_data_version(conn)
+
+
+def drop_window_index() -> None:
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            for name in WINDOW_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS main.[{name}]")
+            conn.execute("DROP TABLE IF EXISTS main.[Subtitles_windows]")
+
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM Settings WHERE key = 'phrase_window'")
+        bump_data_version(conn)
+
+
+def create_video_table(conn: sqlite3.Connection, index_profile: str) -> None:
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS [Videos_fts] USING FTS5 (
+            [video_title],
+            [transcript],
+            content='',
+            tokenize='{INDEX_PROFILES[index_profile]["tokenize"]}'
+        )
+    """)
+
+
+def video_index_enabled(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM Settings WHERE key = 'video_index' AND value = '1'").fetchone() is not None
+
+
+def get_video_documents(conn: sqlite3.Connection,
+                        video_ids: list[str] | None = None) -> Iterator[tuple[int, str, str]]:
+    """
+    (rowid, video_title, transcript) of video_ids or of every video with
+    subtitles, cues are joined in insertion order so a document reads the
+    same when it is removed as when it was added
+    """
+    where = ""
+    params: list[str] = []
+    if video_ids is not None:
+        where = f"WHERE video_id IN ({', '.join('?' for _ in video_ids)})"
+        params = video_ids
+
+    titles = dict(conn.execute(f"SELECT video_id, video_title FROM Videos {where}", params))
+    cues = conn.execute(f"SELECT video_id, rowid, text FROM Subtitles {where} ORDER BY video_id, rowid", params)
+
+    for video_id, rows in itertools.groupby(cues, key=lambda row: row[0]):
+        rows = list(rows)
+        yield rows[0][1], titles.get(video_id) or "", " ".join(row[2] for row in rows)
+
+
+def index_videos(conn: sqlite3.Connection, video_ids: list[str] | None = None) -> None:
+    conn.executemany("INSERT INTO Videos_fts (rowid, video_title, transcript) VALUES (?, ?, ?)",
+                     get_video_documents(conn, video_ids))
+
+
+def unindex_videos(conn: sqlite3.Connection, video_ids: list[str]) -> None:
+    """
+    Removes the documents of video_ids, run while their cues still exist
+    """
+    conn.executemany("INSERT INTO Videos_fts (Videos_fts, rowid, video_title, transcript) VALUES ('delete', ?, ?, ?)",
+                     get_video_documents(conn, video_ids))
+
+
+def build_video_table(conn: sqlite3.Connection, index_profile: str) -> None:
+    conn.execute("DROP TABLE IF EXISTS main.[Videos_fts]")
+    create_video_table(conn, index_profile)
+    index_videos(conn)
+    conn.execute("INSERT INTO Videos_fts(Videos_fts) VALUES('optimize')")
+
+
+def build_video_index() -> None:
+    """
+    Builds Videos_fts in every database and records it for new shards
+    """
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            build_video_table(conn, get_index_profile(conn))
+
+    with write_transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('video_index', '1')")
+        bump_data_version(conn)
+
+
+def drop_video_index() -> None:
+    for channel_id in get_subtitle_databases():
+        with write_transaction(channel_id) as conn:
+            conn.execute("DROP TABLE IF EXISTS main.[Videos_fts]")
+
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM Settings WHERE key = 'video_index'")
+        bump_data_version(conn)
+
+
+def get_table_sizes(conn: sqlite3.Connection) -> dict[str, int]:
+    """
+    Bytes used per table, indexes of a table and fts shadow tables are
+    counted towards the table they belong to
+    """
+    owners = {row[0]: row[1] for row in conn.execute(
+        "SELECT name, tbl_name FROM sqlite_master WHERE type IN ('table', 'index')")}
+
+    sizes: dict[str, int] = {}
+    for name, size in conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"):
+        owner = owners.get(name, name)
+        if owner.startswith("Subtitles_fts_"):
+            owner = "Subtitles_fts"
+        if owner.startswith("Subtitles_trigram_"):
+            owner = "Subtitles_trigram"
+        if owner.startswith("Subtitles_windows_"):
+            owner = "Subtitles_windows"
+        if owner.startswith("Videos_fts_"):
+            owner = "Videos_fts"
+        sizes[owner] = sizes.get(owner, 0) + size
+
+    return sizes
+
+
+def get_sample_terms(conn: sqlite3.Connection) -> list[str]:
+    """
+    A frequent, a middling and a rare term from the index
+    """
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.Subtitles_fts_sample "
+                 "USING fts5vocab(main, 'Subtitles_fts', 'row')")
+    terms = [row[0] for row in conn.execute(
+        "SELECT term FROM temp.Subtitles_fts_sample WHERE doc > 1 ORDER BY doc DESC")]
+    conn.execute("DROP TABLE temp.Subtitles_fts_sample")
+
+    if len(terms) == 0:
+        return []
+
+    return list(dict.fromkeys([terms[0], terms[len(terms) // 2], terms[-1]]))
+
+
+def time_fts_query(conn: sqlite3.Connection, term: str, limit: int = 100, runs: int = 5) -> tuple[int, float]:
+    """
+    Runs a ranked search for term and returns (matches, median milliseconds)
+    """
+    sql = """
+        SELECT s.subtitle_id, s.video_id, s.start_time, s.text
+        FROM Subtitles_fts fts
+        JOIN Subtitles s ON fts.rowid = s.rowid
+        WHERE fts.text MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    """
+    query = '"' + term.replace('"', '""') + '"'
+    matches = conn.execute("SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH ?", [query]).fetchone()[0]
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        conn.execute(sql, [query, limit]).fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return matches, statistics.median(timings)
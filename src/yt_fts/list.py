@@ -1,31 +1,35 @@
-import sqlite3
+import datetime
 
 from rich.console import Console
 from rich.table import Table
 
-from .db_utils import get_title_from_db
-from .utils import time_to_secs, get_time_delta
-from .config import get_db_path
+from .db_utils import get_title_from_db, get_video_connection
+from .utils import ms_to_secs
+from .connection import get_read_connection
+
+
+def get_transcript(video_id: str) -> list[tuple[str, int, str]]:
+    cur = get_video_connection(video_id).cursor()
+    cur.execute("SELECT start_time, start_ms, text FROM subtitles WHERE video_id=?", (video_id,))
+    return cur.fetchall()
 
 
 def show_video_transcript(video_id: str) -> None:
-    con = sqlite3.connect(get_db_path())
-    cur = con.cursor()
-    cur.execute("SELECT * FROM subtitles WHERE video_id=?", (video_id,))
-    rows = cur.fetchall()
+    print_transcript(video_id, get_transcript(video_id), get_title_from_db(video_id))
+
 
+def print_transcript(video_id: str, rows: list[tuple[str, int, str]], video_title: str) -> None:
     console = Console()
     word_count = 0
     for row in rows:
-        timestamp = row[2]
-        time = time_to_secs(timestamp)
+        timestamp = row[0]
+        time = ms_to_secs(row[1])
         url = f"https://www.youtube.com/watch?v={video_id}&t={time}s"
-        text = row[4]
+        text = row[2]
         word_count += len(text.split())
         console.print(f"[link={url}]{timestamp[:-4]}[/link] - {text}")
 
-    video_length = get_time_delta(rows[0][2], rows[-1][2])
-    video_title = get_title_from_db(video_id)
+    video_length = str(datetime.timedelta(milliseconds=rows[-1][1] - rows[0][1])).split(".")[0]
     video_url = f"https://www.youtube.com/watch?v={video_id}"
 
     console.print(f"")
@@ -33,25 +37,28 @@ def show_video_transcript(video_id: str) -> None:
     console.print(f"Video Length: {video_length}")
     console.print(f"Word Count: {word_count}")
 
-    con.close()
+
+def get_video_list(channel_id: str) -> list[tuple[str, str]]:
+    cur = get_read_connection().cursor()
+    cur.execute("SELECT video_id, video_title FROM videos WHERE channel_id=?", (channel_id,))
+    return cur.fetchall()
 
 
 def show_video_list(channel_id: str) -> None:
-    con = sqlite3.connect(get_db_path())
-    cur = con.cursor()
-    cur.execute("SELECT * FROM videos WHERE channel_id=?", (channel_id,))
+    print_video_list(get_video_list(channel_id))
+
 
+def print_video_list(rows: list[tuple[str, str]]) -> None:
     table = Table(show_header=True, header_style="bold magenta")
     table.add_column("Link", style="cyan")
     table.add_column("Video ID")
     table.add_column("Title")
 
-    rows = cur.fetchall()
     for i, row in enumerate(rows):
         video_id = row[0]
         link = f"https://www.youtube.com/watch?v={video_id}"
         link_str = f"[link={link}]Link[/link]"
-        title = get_title_from_db(video_id)
+        title = row[1]
 
         table.add_row(link_str, video_id, title)
 
@@ -65,7 +72,7 @@ def show_video_list(channel_id: str) -> None:
 
 
 def list_channels(channel_id: str | None = None) -> None:
-    from yt_fts.db_utils import get_channels, get_num_vids, get_channel_list_by_id
+    from yt_fts.db_utils import get_num_vids, get_channel_list_by_id
 
     table = Table(header_style="bold")
     table.add_column("ID", style="cyan")
@@ -88,19 +95,35 @@ def list_channels(channel_id: str | None = None) -> None:
         console.print("")
         return
 
-    raw_channels = get_channels()
-    for i in raw_channels:
-        row_id = i[0]
-        channel_id = i[1]
-        channel_name = i[2]
+    print_channels(get_channel_rows())
 
+
+def get_channel_rows() -> list[tuple[int, str, int, str]]:
+    """
+    (rowid, name, number of videos, channel_id) of every channel, the names
+    of channels with semantic search end in (ss)
+    """
+    from yt_fts.db_utils import get_channels, get_num_vids
+
+    rows = []
+    for row_id, channel_id, channel_name, _ in get_channels():
         if check_ss_enabled(channel_id):
             channel_name += " (ss)"
+        rows.append((row_id, channel_name, get_num_vids(channel_id), channel_id))
+
+    return rows
+
 
+def print_channels(rows: list[tuple[int, str, int, str]]) -> None:
+    table = Table(header_style="bold")
+    table.add_column("ID", style="cyan")
+    table.add_column("Name", justify="left")
+    table.add_column("Count")
+    table.add_column("Channel ID", justify="left")
+
+    for row_id, channel_name, count, channel_id in rows:
         channel_url = f"https://youtube.com/channel/{channel_id}"
-        count = get_num_vids(channel_id)
         id_link = f"[link={channel_url}]{channel_id}[/link]"
-
         table.add_row(str(row_id), channel_name, str(count), id_link)
 
     console = Console()
@@ -111,11 +134,7 @@ def list_channels(channel_id: str | None = None) -> None:
 
 #  not dry but for some reason importing from get_embeddings.py causes slow down
 def check_ss_enabled(channel_id: str | None = None) -> bool:
-    from yt_fts.config import get_db_path
-
-    db_path = get_db_path()
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
+    cur = get_read_connection().cursor()
 
     if channel_id is None:
         cur.execute(""" 
@@ -14,8 +14,7 @@ from ..utils import get_model_config, time_to_secs
 from ..config import get_chroma_client
 from ..db_utils import (
     get_channel_id_from_input,
-    get_channel_name_from_video_id,
-    get_title_from_db
+    get_video_details
 )
 
 
@@ -149,15 +148,16 @@ class LLMHandler:
         distances = chroma_res["distances"][0]
 
         res = []
+        video_details = get_video_details(meta["video_id"] for meta in metadata)
         for i in range(len(documents)):
             text = documents[i]
             video_id = metadata[i]["video_id"]
             start_time = metadata[i]["start_time"]
             link = f"https://youtu.be/{video_id}?t={time_to_secs(start_time)}"
-            channel_name = get_channel_name_from_video_id(video_id)
+            channel_name = video_details[video_id]["channel_name"]
             channel_id = metadata[i]["channel_id"]
             date_posted = metadata[i]["video_date"]
-            title = get_title_from_db(video_id)
+            title = video_details[video_id]["video_title"]
 
             match = {
                 "date_posted": date_posted,
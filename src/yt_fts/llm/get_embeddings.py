@@ -5,10 +5,11 @@ from datetime import datetime
 from rich.progress import track
 from rich.console import Console
 from ..config import get_chroma_client
-from ..utils import Model, get_model_config, time_to_secs
+from ..profiling import phase, traced
+from ..utils import Model, get_model_config, ms_to_secs
 
 from ..db_utils import (
-    get_subs_by_video_id,
+    get_subs_by_time_range,
     get_metadata_from_db,
     get_vid_ids_by_channel_id,
     get_channel_name_from_id
@@ -31,7 +32,8 @@ class EmbeddingsHandler:
         for video_id in channel_video_ids:
 
             split_subs = self.split_subtitles(video_id)
-            video_meta_data = get_metadata_from_db(video_id)
+            with phase("embeddings.metadata"):
+                video_meta_data = get_metadata_from_db(video_id)
 
             if split_subs is None:
                 continue
@@ -66,7 +68,8 @@ class EmbeddingsHandler:
             client=OpenAI(api_key=model['api_key'], base_url=model['base_url'])
         )
 
-        embeddings = list(track(embedding_gen, description="Getting embeddings"))
+        with phase("embeddings.embed"):
+            embeddings = list(track(embedding_gen, description="Getting embeddings"))
         meta_data = []
         uuids = []
         documents = []
@@ -87,12 +90,13 @@ class EmbeddingsHandler:
         for i in range(0, len(embeddings), chroma_batch_size):
             j = i + chroma_batch_size
 
-            collection.add(
-                documents=documents[i:j],
-                embeddings=embeddings[i:j],
-                metadatas=meta_data[i:j],
-                ids=uuids[i:j]
-            )
+            with phase("embeddings.store"):
+                collection.add(
+                    documents=documents[i:j],
+                    embeddings=embeddings[i:j],
+                    metadatas=meta_data[i:j],
+                    ids=uuids[i:j]
+                )
 
     def add_meta_data_to_text(self,
                               channel_name: str,
@@ -112,26 +116,26 @@ class EmbeddingsHandler:
 
         return text_with_metadata
 
+    @traced("embeddings.split")
     def split_subtitles(self, video_id: str) -> list[dict[str, str]] | None:
 
-        raw_subtitles = get_subs_by_video_id(video_id)
+        raw_subtitles = get_subs_by_time_range(video_id)
 
         if len(raw_subtitles) == 0:
             print(f"Error: No subtitles found for video: {video_id}")
             return None
 
-        total_seconds = time_to_secs(raw_subtitles[-1][1])
+        total_seconds = ms_to_secs(raw_subtitles[-1][2])
 
         if total_seconds < self.interval:
             self.console.print(f"https://youtu.be/{video_id} is too short to split with the given interval.")
             return None
 
-        # Convert timestamps to seconds and store texts
         segments_with_seconds = []
-        for start_timestamp, stop_timestamp, text in raw_subtitles:
+        for start_timestamp, start_ms, stop_ms, text in raw_subtitles:
             segments_with_seconds.append({
                 'start_timestamp': start_timestamp,
-                'start_seconds': self.time_to_seconds(start_timestamp),
+                'start_seconds': start_ms / 1000,
                 'text': text
             })
 
@@ -176,11 +180,3 @@ class EmbeddingsHandler:
             response = client.embeddings.create(input=batch, model=model).data
             embeddings = [data.embedding for data in response]
             yield from embeddings
-
-    def time_to_seconds(self, time_str: str) -> float:
-        """ Convert time string to total seconds """
-        time_obj = datetime.strptime(time_str, '%H:%M:%S.%f').time()
-        return (time_obj.hour * 3600 +
-                time_obj.minute * 60 +
-                time_obj.second +
-                time_obj.microsecond / 1e6)
@@ -1,7 +1,6 @@
 import os
 import json
 import sys
-import sqlite3
 import tempfile
 import textwrap
 
@@ -11,9 +10,9 @@ from rich.markdown import Markdown
 from urllib.parse import urlparse, parse_qs
 from openai import NotGiven, OpenAI
 
-from ..config import get_db_path
+from ..connection import get_read_connection
 from ..utils import Model, parse_vtt
-from ..db_utils import get_title_from_db, get_channel_name_from_video_id
+from ..db_utils import get_title_from_db, get_channel_name_from_video_id, get_video_connection
 
 class SummarizeHandler:
     def __init__(self, openai_client: OpenAI, model: Model, input_video: str) -> None:
@@ -159,8 +158,7 @@ class SummarizeHandler:
 
         console = self.console
         try:
-            conn = sqlite3.connect(get_db_path())
-            curr = conn.cursor()
+            curr = get_video_connection(video_id).cursor()
             curr.execute(
                 """
                 SELECT 
@@ -179,19 +177,15 @@ class SummarizeHandler:
                 if len(text) == 0:
                     continue
                 transcript += f"{start_time[:-4]}: {text}\n"
-            conn.close()
             return transcript
         except Exception as e:
             console.print(f"[red]Error:[/red] {e}")
             sys.exit(1)
-        finally:
-            conn.close()
 
     def video_in_database(self, video_id: str) -> bool:
         console = self.console
         try:
-            conn = sqlite3.connect(get_db_path())
-            curr = conn.cursor()
+            curr = get_read_connection().cursor()
             curr.execute(
                 """
                 SELECT 
@@ -203,15 +197,12 @@ class SummarizeHandler:
                 """, (video_id,)
             )
             count = curr.fetchone()[0]
-            conn.close()
             if count > 0:
                 return True
             return False
         except Exception as e:
             console.print(f"[red]Error:[/red] {e}")
             sys.exit(1)
-        finally:
-            conn.close()
         
 
     def get_video_id_from_url(self, video_url: str) -> str:
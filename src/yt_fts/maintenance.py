@@ -0,0 +1,371 @@
+import os
+import time
+
+from rich.console import Console
+from rich.table import Table
+
+from .connection import (
+    bump_data_version,
+    close_connections,
+    connect_shard,
+    get_db_path,
+    get_read_connection,
+    get_shard_path,
+    get_subtitle_connection,
+    get_subtitle_databases,
+    get_write_connection,
+    is_sharded,
+    remove_shard,
+    write_transaction
+)
+from .db_utils import create_subtitle_tables, get_channel_name_from_id
+from .fts import (
+    build_trigram_index,
+    build_video_index,
+    build_window_index,
+    create_fts_triggers,
+    drop_trigram_index,
+    drop_video_index,
+    drop_window_index,
+    drop_fts_triggers,
+    get_index_profile,
+    get_sample_terms,
+    get_storage_profile,
+    get_table_sizes,
+    rebuild_fts,
+    set_index_profile,
+    set_storage_profile,
+    time_fts_query
+)
+from .ranking import RANKING_DEFAULTS, get_channel_boosts, get_ranking
+
+console = Console()
+
+
+def format_bytes(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 ** 2:
+        return f"{size / 1024:.1f} KB"
+    if size < 1024 ** 3:
+        return f"{size / 1024 ** 2:.1f} MB"
+    return f"{size / 1024 ** 3:.1f} GB"
+
+
+def get_database_files() -> list[str]:
+    files = [get_db_path()]
+    if is_sharded():
+        files += [get_shard_path(channel_id) for channel_id in get_subtitle_databases()]
+    return files
+
+
+def get_total_size() -> int:
+    return sum(os.path.getsize(path) for path in get_database_files())
+
+
+def get_index_size() -> int:
+    return sum(get_table_sizes(get_subtitle_connection(channel_id)).get("Subtitles_fts", 0)
+               for channel_id in get_subtitle_databases())
+
+
+def get_all_table_sizes() -> dict[str, int]:
+    """
+    Table sizes summed over the catalog and every shard
+    """
+    sizes = get_table_sizes(get_read_connection())
+    if not is_sharded():
+        return sizes
+
+    for channel_id in get_subtitle_databases():
+        for name, size in get_table_sizes(get_subtitle_connection(channel_id)).items():
+            sizes[name] = sizes.get(name, 0) + size
+
+    return sizes
+
+
+def vacuum_databases() -> None:
+    # freed pages are only returned to the filesystem by a vacuum
+    for channel_id in [None] + [key for key in get_subtitle_databases() if key is not None]:
+        with write_transaction(channel_id) as conn:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def show_storage_stats() -> None:
+    """
+    Prints the size of every table and the latency of sample searches
+    """
+    sizes = get_all_table_sizes()
+
+    table = Table(header_style="bold")
+    table.add_column("Table")
+    table.add_column("Size", justify="right")
+    table.add_column("Share", justify="right")
+
+    total = sum(sizes.values())
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        table.add_row(name, format_bytes(size), f"{size / total:.0%}")
+
+    console.print(table)
+
+    files = get_database_files()
+    layout = f"sharded ({len(files) - 1} shards)" if is_sharded() else "single"
+    console.print(f"Database files: {format_bytes(get_total_size())}")
+    console.print(f"Layout: [bold]{layout}[/bold]")
+    console.print(f"Storage profile: [bold]{get_storage_profile(get_read_connection())}[/bold]")
+    console.print(f"Index profile: [bold]{get_index_profile(get_read_connection())}[/bold]\n")
+
+    # sample the biggest index, in a sharded library that is the slowest shard
+    databases = get_subtitle_databases()
+    if len(databases) == 0:
+        return
+    conn = max((get_subtitle_connection(channel_id) for channel_id in databases),
+               key=lambda shard: get_table_sizes(shard).get("Subtitles_fts", 0))
+
+    terms = get_sample_terms(conn)
+    if len(terms) == 0:
+        return
+
+    table = Table(header_style="bold")
+    table.add_column("Term")
+    table.add_column("Matches", justify="right")
+    table.add_column("Top 100 (ms)", justify="right")
+
+    for term in terms:
+        matches, latency = time_fts_query(conn, term)
+        table.add_row(term, str(matches), f"{latency:.2f}")
+
+    console.print(table)
+
+
+def change_storage_profile(profile: str) -> None:
+    """
+    Rebuilds the search index with a storage profile and reclaims the freed space
+    """
+    size_before = get_total_size()
+    index_before = get_index_size()
+
+    console.print(f"Rebuilding search index with the [bold]{profile}[/bold] profile...")
+    set_storage_profile(profile)
+    vacuum_databases()
+
+    console.print(f"Search index: {format_bytes(index_before)} -> {format_bytes(get_index_size())}")
+    console.print(f"Database files: {format_bytes(size_before)} -> {format_bytes(get_total_size())}")
+
+
+def change_index_profile(profile: str | None) -> None:
+    """
+    Rebuilds the search index with an index profile, None keeps the current one
+    """
+    if profile is None:
+        profile = get_index_profile(get_read_connection())
+    index_before = get_index_size()
+
+    console.print(f"Rebuilding search index with the [bold]{profile}[/bold] index profile...")
+    start = time.perf_counter()
+    set_index_profile(profile)
+    vacuum_databases()
+
+    console.print(f"Rebuilt in {time.perf_counter() - start:.1f}s")
+    console.print(f"Search index: {format_bytes(index_before)} -> {format_bytes(get_index_size())}")
+
+
+def get_trigram_size() -> int:
+    return sum(get_table_sizes(get_subtitle_connection(channel_id)).get("Subtitles_trigram", 0)
+               for channel_id in get_subtitle_databases())
+
+
+def change_trigram_index(build: bool) -> None:
+    """
+    Builds or drops the trigram index of every database
+    """
+    if not build:
+        drop_trigram_index()
+        vacuum_databases()
+        console.print("Dropped the trigram index, search --substring now scans every subtitle")
+        return
+
+    console.print("Building trigram index...")
+    start = time.perf_counter()
+    build_trigram_index()
+
+    console.print(f"Built in {time.perf_counter() - start:.1f}s")
+    console.print(f"Trigram index: {format_bytes(get_trigram_size())}, "
+                  f"search index: {format_bytes(get_index_size())}")
+
+
+def get_window_index_size() -> int:
+    return sum(get_table_sizes(get_subtitle_connection(channel_id)).get("Subtitles_windows", 0)
+               for channel_id in get_subtitle_databases())
+
+
+def change_window_index(size: int | None) -> None:
+    """
+    Builds the phrase index with size cues per window, or drops it when size is None
+    """
+    if size is None:
+        drop_window_index()
+        vacuum_databases()
+        console.print("Dropped the phrase index, search --phrase now only matches inside single cues")
+        return
+
+    console.print(f"Building phrase index of {size} cue windows...")
+    start = time.perf_counter()
+    build_window_index(size)
+
+    console.print(f"Built in {time.perf_counter() - start:.1f}s")
+    console.print(f"Phrase index: {format_bytes(get_window_index_size())}, "
+                  f"search index: {format_bytes(get_index_size())}")
+
+
+def change_video_index(build: bool) -> None:
+    """
+    Builds or drops the video index of every database
+    """
+    if not build:
+        drop_video_index()
+        vacuum_databases()
+        console.print("Dropped the video index")
+        return
+
+    console.print("Building video index...")
+    start = time.perf_counter()
+    build_video_index()
+
+    size = sum(get_table_sizes(get_subtitle_connection(channel_id)).get("Videos_fts", 0)
+               for channel_id in get_subtitle_databases())
+    console.print(f"Built in {time.perf_counter() - start:.1f}s")
+    console.print(f"Video index: {format_bytes(size)}, search index: {format_bytes(get_index_size())}")
+
+
+def shard_database() -> None:
+    """
+    Moves the subtitles of every channel into its own shard. Rows keep their
+    subtitle_id, so an interrupted run can simply be started again.
+    """
+    channel_ids = [row[0] for row in get_read_connection().execute("SELECT channel_id FROM Channels")]
+
+    for channel_id in channel_ids:
+        console.print(f"Moving subtitles of {channel_id} to {get_shard_path(channel_id)}")
+
+        # main is the shard and catalog the library being split up
+        conn = connect_shard(channel_id)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            drop_fts_triggers(conn)
+            conn.execute("""
+                INSERT OR IGNORE INTO main.Subtitles
+                SELECT s.subtitle_id, s.video_id, s.start_time, s.stop_time, s.text, s.start_ms, s.stop_ms
+                FROM catalog.Subtitles s
+                JOIN catalog.Videos v ON v.video_id = s.video_id
+                WHERE v.channel_id = ?
+            """, [channel_id])
+            rebuild_fts(conn)
+            create_fts_triggers(conn)
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    with write_transaction() as conn:
+        drop_fts_triggers(conn)
+        conn.execute("DROP TABLE IF EXISTS Subtitles_fts")
+        conn.execute("DROP TABLE IF EXISTS Subtitles_trigram")
+        conn.execute("DROP TABLE IF EXISTS Subtitles_windows")
+        conn.execute("DROP TABLE IF EXISTS Videos_fts")
+        conn.execute("DROP TABLE IF EXISTS Subtitles")
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('layout', 'sharded')")
+        bump_data_version(conn)
+
+    close_connections()
+    vacuum_databases()
+
+
+def merge_shards() -> None:
+    """
+    Moves the subtitles of every shard back into the main database
+    """
+    channel_ids = get_subtitle_databases()
+
+    with write_transaction() as conn:
+        create_subtitle_tables(conn, get_storage_profile(conn), get_index_profile(conn))
+        drop_fts_triggers(conn)
+
+    for channel_id in channel_ids:
+        console.print(f"Moving subtitles of {channel_id} from {get_shard_path(channel_id)}")
+
+        # ATTACH and DETACH cannot run inside a transaction
+        conn = get_write_connection()
+        conn.execute("ATTACH DATABASE ? AS shard", [get_shard_path(channel_id)])
+        try:
+            # subtitle_ids are only unique within a shard, rows get new ones here
+            with write_transaction() as conn:
+                conn.execute("DELETE FROM main.Subtitles WHERE video_id IN (SELECT video_id FROM shard.Subtitles)")
+                conn.execute("""
+                    INSERT INTO main.Subtitles (video_id, start_time, stop_time, text, start_ms, stop_ms)
+                    SELECT video_id, start_time, stop_time, text, start_ms, stop_ms
+                    FROM shard.Subtitles
+                    ORDER BY subtitle_id
+                """)
+        finally:
+            conn.execute("DETACH DATABASE shard")
+
+    with write_transaction() as conn:
+        rebuild_fts(conn)
+        create_fts_triggers(conn)
+        conn.execute("DELETE FROM Settings WHERE key = 'layout'")
+        # subtitle ids changed, cached pages and cursors point at old rows
+        bump_data_version(conn)
+
+    for channel_id in channel_ids:
+        remove_shard(channel_id)
+
+    close_connections()
+    vacuum_databases()
+
+
+def change_layout(layout: str) -> None:
+    """
+    Switches between one database and a catalog with one shard per channel
+    """
+    if (layout == "sharded") == is_sharded():
+        console.print(f"The database already uses the {layout} layout")
+        return
+
+    size_before = get_total_size()
+
+    if layout == "sharded":
+        shard_database()
+    else:
+        merge_shards()
+
+    console.print(f"Switched to the [bold]{layout}[/bold] layout")
+    console.print(f"Database files: {format_bytes(size_before)} -> {format_bytes(get_total_size())}")
+
+
+def show_ranking() -> None:
+    """
+    Prints the ranking weights and channel boosts in use
+    """
+    table = Table(header_style="bold")
+    table.add_column("Weight")
+    table.add_column("Value", justify="right")
+    table.add_column("Default", justify="right")
+
+    for name, value in get_ranking().items():
+        table.add_row(name.replace("_", "-"), f"{value:g}", f"{RANKING_DEFAULTS[name]:g}")
+
+    console.print(table)
+
+    boosts = get_channel_boosts()
+    if len(boosts) == 0:
+        return
+
+    table = Table(header_style="bold")
+    table.add_column("Channel")
+    table.add_column("Boost", justify="right")
+
+    for channel_id, boost in sorted(boosts.items(), key=lambda item: item[1], reverse=True):
+        table.add_row(f"{get_channel_name_from_id(channel_id)} ({channel_id})", f"{boost:g}")
+
+    console.print(table)
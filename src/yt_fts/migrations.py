@@ -0,0 +1,149 @@
+"""
+Schema migrations keyed on PRAGMA user_version.
+
+make_db creates the original schema and then runs every migration, existing
+databases are upgraded in place the first time yt-fts opens them. To change
+the schema append a function to MIGRATIONS, never edit or reorder old ones.
+"""
+import sqlite3
+from typing import Callable
+
+
+def _add_join_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_subtitles_video_id ON Subtitles(video_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_channel_id ON Videos(channel_id)")
+
+
+def _add_time_ms_columns(conn: sqlite3.Connection) -> None:
+    from .fts import FTS_TRIGGERS
+    from .utils import time_to_ms
+
+    # only text changes need to reach the index, otherwise the backfill
+    # below would reindex every subtitle
+    had_trigger = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'Subtitles_au'").fetchone()
+    conn.execute("DROP TRIGGER IF EXISTS [Subtitles_au]")
+    if had_trigger:
+        conn.execute(FTS_TRIGGERS["Subtitles_au"])
+
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(Subtitles)")]
+    if "start_ms" not in columns:
+        conn.execute("ALTER TABLE Subtitles ADD COLUMN start_ms INTEGER")
+    if "stop_ms" not in columns:
+        conn.execute("ALTER TABLE Subtitles ADD COLUMN stop_ms INTEGER")
+
+    conn.create_function("time_to_ms", 1, lambda t: None if t is None else time_to_ms(t), deterministic=True)
+    conn.execute("""
+        UPDATE Subtitles
+        SET start_ms = time_to_ms(start_time), stop_ms = time_to_ms(stop_time)
+        WHERE start_ms IS NULL
+    """)
+
+    # (video_id, start_ms) serves every lookup the plain video_id index did
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_subtitles_video_start ON Subtitles(video_id, start_ms)")
+    conn.execute("DROP INDEX IF EXISTS idx_subtitles_video_id")
+
+
+def _add_settings_and_external_fts(conn: sqlite3.Connection) -> None:
+    from .fts import build_fts_table
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Settings (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+    # databases made before sqlite-utils switched to external content keep a
+    # second copy of every cue inside the index
+    fts_sql = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'Subtitles_fts'").fetchone()
+    if fts_sql is not None and "content=" not in fts_sql[0].replace(" ", ""):
+        build_fts_table(conn, "standard")
+
+
+def _add_channel_boosts(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ChannelBoosts (
+            channel_id TEXT PRIMARY KEY,
+            boost REAL NOT NULL
+        )
+    """)
+
+
+def _add_terms(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Terms (
+            term TEXT PRIMARY KEY,
+            docs INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def _add_runs(conn: sqlite3.Connection) -> None:
+    # metrics holds the whole JSON summary, the columns are what is worth querying over time
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Runs (
+            run_id INTEGER PRIMARY KEY,
+            command TEXT NOT NULL,
+            started TEXT NOT NULL,
+            seconds REAL NOT NULL,
+            attempted INTEGER NOT NULL,
+            succeeded INTEGER NOT NULL,
+            no_subtitles INTEGER NOT NULL,
+            failed INTEGER NOT NULL,
+            http_403 INTEGER NOT NULL,
+            http_429 INTEGER NOT NULL,
+            retries INTEGER NOT NULL,
+            bytes_fetched INTEGER NOT NULL,
+            videos_added INTEGER NOT NULL,
+            subtitles_added INTEGER NOT NULL,
+            metrics TEXT NOT NULL
+        )
+    """)
+
+
+# MIGRATIONS[n] upgrades a database from version n to n + 1
+MIGRATIONS: list[Callable[[sqlite3.Connection], None]] = [
+    _add_join_indexes,
+    _add_time_ms_columns,
+    _add_settings_and_external_fts,
+    _add_channel_boosts,
+    _add_terms,
+    _add_runs,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def needs_migration(conn: sqlite3.Connection) -> bool:
+    return get_schema_version(conn) < SCHEMA_VERSION
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Applies pending migrations, one transaction each. Returns the number applied.
+    """
+    applied = 0
+
+    for version, migration in enumerate(MIGRATIONS):
+        if get_schema_version(conn) > version:
+            continue
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated while we waited for the lock
+            if get_schema_version(conn) == version:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+                applied += 1
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    return applied
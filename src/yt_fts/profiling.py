@@ -0,0 +1,187 @@
+"""
+Phase timers for finding where a slow command spends its time.
+
+Handlers wrap their steps in phase("download.fetch"), phase("search.render")
+and so on. The timers cost one flag check until profiling is started by
+`yt-fts --profile` or YT_FTS_TRACE, then every phase is recorded with its
+thread and printed as a breakdown when the command exits:
+
+- calls and total time per phase, summed over threads, so phases running
+  on a download's worker threads can add up to more than the run took
+- self time, the total less the phases nested in it, e.g. download.vtt_to_db
+  without the download.parse and db.insert inside it
+
+With a dump directory the run is also written there as a cProfile .pstats
+file of the main thread (`python -m pstats`, snakeviz) and a .trace.json in
+the Chrome trace event format (chrome://tracing, ui.perfetto.dev), one
+track per thread.
+"""
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, NamedTuple, TypeVar
+
+from rich.console import Console
+from rich.table import Table
+
+F = TypeVar("F", bound=Callable)
+
+
+class PhaseEvent(NamedTuple):
+    name: str
+    thread: str
+    start: float
+    seconds: float
+
+
+_enabled = False
+_events: list[PhaseEvent] = []
+_started = 0.0
+_profiler: cProfile.Profile | None = None
+_dump_dir: str | None = None
+
+
+def profiling_enabled() -> bool:
+    return _enabled
+
+
+def start_profiling(dump_dir: str | None = None) -> None:
+    """
+    Starts recording phases, and profiling the main thread when dump_dir is given
+    """
+    global _enabled, _started, _profiler, _dump_dir
+
+    _events.clear()
+    _enabled = True
+    _started = time.perf_counter()
+    _dump_dir = dump_dir
+
+    if dump_dir is not None:
+        os.makedirs(dump_dir, exist_ok=True)
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    if not _enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # list.append is atomic, worker threads record without a lock
+        _events.append(PhaseEvent(name, threading.current_thread().name, start, time.perf_counter() - start))
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorator running the whole function as a phase
+    """
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def phase_summary(events: list[PhaseEvent]) -> dict[str, dict[str, float]]:
+    """
+    calls, total and self seconds per phase name, in order of first start
+    """
+    summary: dict[str, dict[str, float]] = {}
+    children = [0.0] * len(events)
+
+    # phases of a thread nest, the innermost open one a phase starts in is its parent
+    by_thread: dict[str, list[int]] = {}
+    for i, event in enumerate(events):
+        by_thread.setdefault(event.thread, []).append(i)
+
+    for indexes in by_thread.values():
+        indexes.sort(key=lambda i: (events[i].start, -events[i].seconds))
+        stack: list[int] = []
+        for i in indexes:
+            event = events[i]
+            while stack and events[stack[-1]].start + events[stack[-1]].seconds < event.start + event.seconds:
+                stack.pop()
+            if stack:
+                children[stack[-1]] += event.seconds
+            stack.append(i)
+
+    for i in sorted(range(len(events)), key=lambda i: events[i].start):
+        event = events[i]
+        entry = summary.setdefault(event.name, {"calls": 0, "total": 0.0, "self": 0.0})
+        entry["calls"] += 1
+        entry["total"] += event.seconds
+        entry["self"] += event.seconds - children[i]
+
+    return summary
+
+
+def print_breakdown(elapsed: float, summary: dict[str, dict[str, float]]) -> None:
+    table = Table(title=f"Phases ({elapsed * 1000:.0f} ms run)", header_style="bold")
+    table.add_column("Phase")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total ms", justify="right")
+    table.add_column("Self ms", justify="right")
+    table.add_column("Mean ms", justify="right")
+    table.add_column("% of run", justify="right")
+
+    for name, entry in summary.items():
+        table.add_row(name, str(entry["calls"]), f"{entry['total'] * 1000:.1f}", f"{entry['self'] * 1000:.1f}",
+                      f"{entry['total'] * 1000 / entry['calls']:.2f}", f"{entry['total'] / elapsed * 100:.1f}")
+
+    Console(stderr=True).print(table)
+
+
+def write_trace(path: str, events: list[PhaseEvent]) -> None:
+    pid = os.getpid()
+    threads = {name: tid for tid, name in enumerate(dict.fromkeys(event.thread for event in events), 1)}
+
+    trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+             for name, tid in threads.items()]
+    trace += [{
+        "name": event.name,
+        "cat": event.name.split(".")[0],
+        "ph": "X",
+        "ts": round((event.start - _started) * 1e6, 1),
+        "dur": round(event.seconds * 1e6, 1),
+        "pid": pid,
+        "tid": threads[event.thread],
+    } for event in events]
+
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+def finish_profiling(command: str | None = None) -> None:
+    """
+    Stops recording, prints the breakdown to stderr and writes the dumps
+    """
+    global _enabled, _profiler
+
+    if not _enabled:
+        return
+    _enabled = False
+    elapsed = time.perf_counter() - _started
+
+    if _profiler is not None:
+        _profiler.disable()
+
+    events = list(_events)
+    print_breakdown(elapsed, phase_summary(events))
+
+    if _dump_dir is not None:
+        base = os.path.join(_dump_dir, f"yt-fts-{command or 'run'}-{time.strftime('%Y%m%d_%H%M%S')}")
+        _profiler.dump_stats(f"{base}.pstats")
+        write_trace(f"{base}.trace.json", events)
+        Console(stderr=True).print(f"Profile written to {base}.pstats and {base}.trace.json")
+        _profiler = None
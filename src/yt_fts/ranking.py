@@ -0,0 +1,132 @@
+"""
+Ranking of full text search hits.
+
+The bm25 rank of a hit (negative, lower is better) is scaled in SQL by
+factors that make it better or worse, so the top k is still picked by the
+database:
+
+- recency: 1 + recency * half_life / (half_life + age of the video in days),
+  a video from today counts up to 1 + recency times as much as a very old one
+  and one half_life days old half as much more, the boost fades hyperbolically
+  rather than halving every half_life days
+- length: cues shorter than min_length characters lose up to length of their
+  score, otherwise one word cues like "yeah" float to the top
+- boost: a weight per channel from the ChannelBoosts table
+
+Videos found by search --videos are ranked by bm25 over their title and
+transcript, the title counting title times as much as the transcript, scaled
+by the same recency and channel boosts.
+
+The weights live in Settings, changing them bumps the data version so cached
+results are not reused. Weights of 0 and no boosts, the defaults, rank by
+bm25 alone, which skips joining every match with Subtitles and Videos.
+"""
+from .connection import bump_data_version, get_read_connection, write_transaction
+
+BM25_SQL = "fts.rank"
+
+RANKING_DEFAULTS = {
+    "recency": 0.0,
+    "half_life": 365.0,
+    "length": 0.0,
+    "min_length": 20.0,
+    "title": 2.0,
+}
+
+# video_date is YYYY-MM-DD, databases made by old versions have YYYYMMDD
+VIDEO_DAY_SQL = """
+    julianday(CASE WHEN v.video_date LIKE '____-__-__%' THEN v.video_date
+              ELSE substr(v.video_date, 1, 4) || '-' || substr(v.video_date, 5, 2) || '-' || substr(v.video_date, 7, 2)
+              END)
+"""
+
+
+def get_ranking() -> dict[str, float]:
+    ranking = dict(RANKING_DEFAULTS)
+
+    for key, value in get_read_connection().execute(
+            "SELECT key, value FROM Settings WHERE key LIKE 'rank\\_%' ESCAPE '\\'"):
+        name = key[len("rank_"):]
+        if name in ranking:
+            ranking[name] = float(value)
+
+    return ranking
+
+
+def set_ranking_weight(name: str, value: float) -> None:
+    if name not in RANKING_DEFAULTS:
+        raise ValueError(f"unknown ranking weight {name}")
+
+    with write_transaction() as conn:
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES (?, ?)", (f"rank_{name}", value))
+        bump_data_version(conn)
+
+
+def get_channel_boosts() -> dict[str, float]:
+    return dict(get_read_connection().execute("SELECT channel_id, boost FROM ChannelBoosts"))
+
+
+def set_channel_boost(channel_id: str, boost: float) -> None:
+    """
+    Scales the scores of a channel, 1 removes the boost
+    """
+    with write_transaction() as conn:
+        if boost == 1:
+            conn.execute("DELETE FROM ChannelBoosts WHERE channel_id = ?", [channel_id])
+        else:
+            conn.execute("INSERT OR REPLACE INTO ChannelBoosts (channel_id, boost) VALUES (?, ?)",
+                         [channel_id, boost])
+        bump_data_version(conn)
+
+
+def ranking_enabled(ranking: dict[str, float], boosts: dict[str, float]) -> bool:
+    return ranking["recency"] != 0 or ranking["length"] != 0 or len(boosts) > 0
+
+
+def score_sql(ranking: dict[str, float], boosts: dict[str, float]) -> str:
+    """
+    Score of a hit, BM25_SQL when ranking is off. Otherwise it expects
+    Subtitles_fts as fts, Subtitles as s, Videos as v and ChannelBoosts as b.
+    """
+    score = BM25_SQL
+
+    if not ranking_enabled(ranking, boosts):
+        return score
+
+    if ranking["recency"] != 0:
+        score += f" * {recency_sql(ranking)}"
+
+    if ranking["length"] != 0:
+        min_length = float(ranking["min_length"])
+        score += f" * (1 - {float(ranking['length'])!r} * (1 - min(length(s.text), {min_length!r}) / {min_length!r}))"
+
+    if len(boosts) > 0:
+        score += " * coalesce(b.boost, 1)"
+
+    return score
+
+
+def recency_sql(ranking: dict[str, float]) -> str:
+    half_life = float(ranking["half_life"])
+    age = f"max(julianday(date('now')) - {VIDEO_DAY_SQL}, 0)"
+    return f"coalesce(1 + {float(ranking['recency'])!r} * {half_life!r} / ({half_life!r} + {age}), 1)"
+
+
+def get_score_sql() -> str:
+    return score_sql(get_ranking(), get_channel_boosts())
+
+
+def video_score_sql(ranking: dict[str, float], boosts: dict[str, float]) -> str:
+    """
+    Score of a video, expects Videos_fts as d and, unless the recency weight
+    is 0 and there are no boosts, Videos as v and ChannelBoosts as b
+    """
+    score = f"bm25(Videos_fts, {float(ranking['title'])!r}, 1.0)"
+
+    if ranking["recency"] != 0:
+        score += f" * {recency_sql(ranking)}"
+
+    if len(boosts) > 0:
+        score += " * coalesce(b.boost, 1)"
+
+    return score
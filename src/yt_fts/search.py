@@ -1,23 +1,56 @@
+import copy
+import json
 import sys
 import textwrap
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from typing import IO, TYPE_CHECKING, Iterable, Iterator
 
 from rich.console import Console
-from openai import OpenAI
+from rich.markup import escape
 
-from .llm.get_embeddings import EmbeddingsHandler
 from .export import ExportHandler
+from .fts import get_index_profile, get_window_size, needs_positions, phrases_supported
+from .cache import cache_enabled, cache_hits, get_cached_hits, make_cache_key
 from .config import get_chroma_client
-from .utils import Model, time_to_secs, bold_query_matches
+from .client import ServerClient
+from .connection import get_data_version, get_read_connection, is_sharded
+from .profiling import phase, traced
+from .terms import suggest_query
+from .utils import Model, time_to_secs, ms_to_secs, bold_query_matches, get_date
 from .db_utils import (
+    HIGHLIGHT_END,
+    HIGHLIGHT_START,
+    SearchCursor,
+    SearchHit,
+    format_search_cursor,
     search_all,
     get_channel_id_from_input,
+    get_channel_id_from_video_id,
+    parse_query,
+    phrase_query,
     search_channel,
     search_video,
-    get_channel_name_from_video_id,
-    get_metadata_from_db,
-    get_title_from_db,
+    search_phrase,
+    search_substring,
+    search_videos,
+    get_video_details,
 )
 
+# openai is imported by vector_search, full text searches do without it
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+def highlight_markup(highlighted: str) -> str:
+    """
+    Rich markup for the text of a hit with its matches in bold
+    """
+    return (escape(highlighted)
+            .replace(HIGHLIGHT_START, "[bold][bright_magenta]")
+            .replace(HIGHLIGHT_END, "[/bright_magenta][/bold]"))
+
 
 class SearchHandler:
     def __init__(self,
@@ -26,7 +59,18 @@ class SearchHandler:
                  video_id: str | None = None,
                  export: bool = False,
                  limit: int | None = None,
-                 openai_client: OpenAI | None = None
+                 openai_client: "OpenAI | None" = None,
+                 start_ms: int | None = None,
+                 stop_ms: int | None = None,
+                 format: str = "text",
+                 page: int = 1,
+                 after: SearchCursor | None = None,
+                 cache: bool = True,
+                 substring: bool = False,
+                 phrase: bool = False,
+                 near: int | None = None,
+                 videos: bool = False,
+                 server: ServerClient | None = None
                  ) -> None:
 
         self.console = Console()
@@ -35,28 +79,164 @@ class SearchHandler:
         self.video_id = video_id
         self.export = export
         self.limit = limit
+        self.start_ms = start_ms
+        self.stop_ms = stop_ms
+        self.format = format
+        self.page = page
+        self.after = after
+        self.cache = cache
+        self.substring = substring
+        self.phrase = phrase
+        self.near = near
+        self.videos = videos
+        self.server = server
         self.channel_id: str | None = None
         self.query = ''
         self.response = []
         self.openai_client = openai_client
         self.max_width = 80
 
-    def full_text_search(self, query: str) -> None:
+    def search_hits(self, unlimited: bool = False) -> Iterator[SearchHit]:
+        """
+        Lazily runs the search for the requested page, pages of a limited
+        search come from the result cache when the database is unchanged.
+        unlimited reads every match from the start of the page on.
+        """
+        offset = (self.page - 1) * self.limit if self.limit is not None else 0
+        limit = None if unlimited else self.limit
 
-        console = self.console
-        self.query = query
+        # a running yt-fts serve searches with warm connections and caches of its own
+        if self.server is not None and not unlimited:
+            return self.server.search(self.query, self.search_options())
+
+        if self.scope == 'channel':
+            with phase("search.metadata"):
+                self.channel_id = get_channel_id_from_input(self.channel)
+
+        self.check_positions()
+
+        # unlimited searches are streamed, holding them for the cache would defeat that
+        if limit is None or not self.cache or not cache_enabled():
+            return self.run_search(limit, offset)
+
+        # the hit layout is part of the key, pages cached by older versions are never misread
+        if self.substring:
+            query = self.query
+        elif self.phrase:
+            query = phrase_query(self.query, self.near)
+        else:
+            query = parse_query(self.query)
+        key = make_cache_key(SearchHit._fields, query, self.substring, self.phrase, self.videos, self.scope,
+                             self.channel_id, self.video_id, self.start_ms, self.stop_ms, self.limit, offset,
+                             self.after)
+
+        # read before searching, a write in between only makes this entry stale
+        data_version = get_data_version()
+
+        cached = get_cached_hits(key, data_version)
+        if cached is not None:
+            return map(SearchHit._make, cached)
+
+        hits = list(self.run_search(limit, offset))
+        cache_hits(key, data_version, hits)
+        return iter(hits)
+
+    def check_positions(self) -> None:
+        """
+        Exits with an error for phrase and NEAR queries the minimal storage
+        profile cannot answer, instead of the fts5 error they would fail with
+        """
+        conn = get_read_connection()
+        if self.substring or phrases_supported(conn):
+            return
+
+        # the phrase index keeps positions whatever the storage profile
+        if self.phrase:
+            if get_window_size(conn) is not None:
+                return
+        elif not needs_positions(parse_query(self.query), get_index_profile(conn)):
+            return
+
+        fix = "rebuild the index with [bold]yt-fts maintenance storage standard[/bold]"
+        if self.phrase:
+            fix = f"build the phrase index with [bold]yt-fts maintenance phrases build[/bold] or {fix}"
+        Console(stderr=True).print("[red]Error:[/red] the minimal storage profile keeps no word positions, "
+                                   f"phrases and NEAR cannot be searched, {fix}")
+        sys.exit(1)
+
+    def search_options(self) -> dict:
+        """
+        The options of this search as keyword arguments of SearchHandler
+        """
+        return {
+            "scope": self.scope, "channel": self.channel, "video_id": self.video_id, "limit": self.limit,
+            "start_ms": self.start_ms, "stop_ms": self.stop_ms, "page": self.page, "after": self.after,
+            "cache": self.cache, "substring": self.substring, "phrase": self.phrase, "near": self.near,
+            "videos": self.videos,
+        }
+
+    def run_search(self, limit: int | None, offset: int) -> Iterator[SearchHit]:
+        if self.substring:
+            return search_substring(self.query, self.channel_id, self.video_id if self.scope == 'video' else None,
+                                    self.start_ms, self.stop_ms, limit, self.after, offset)
+
+        if self.videos:
+            return search_videos(self.query, self.channel_id, limit, self.after, offset)
+
+        if self.phrase:
+            return search_phrase(self.query, self.near, self.channel_id,
+                                 self.video_id if self.scope == 'video' else None,
+                                 self.start_ms, self.stop_ms, limit, self.after, offset)
 
         if self.scope == 'all':
-            self.res = search_all(query, self.limit)
+            return search_all(self.query, limit, self.after, offset)
 
         if self.scope == 'channel':
-            self.channel_id = get_channel_id_from_input(self.channel)
-            self.res = search_channel(self.channel_id, self.query, self.limit)
+            return search_channel(self.channel_id, self.query, limit, self.after, offset)
 
+        return search_video(self.video_id, self.query, limit, self.start_ms, self.stop_ms,
+                            self.after, offset)
+
+    @traced("search.suggest")
+    def suggestion(self) -> str | None:
+        """
+        The query with misspelled words corrected, for searches that found nothing
+        """
+        if self.substring or self.after is not None or self.page > 1:
+            return None
+        return suggest_query(self.query)
+
+    def next_page_cursor(self, last_hit: SearchHit) -> str:
         if self.scope == 'video':
-            self.res = search_video(self.video_id, self.query, self.limit)
+            return format_search_cursor((last_hit.start_ms, last_hit.rowid))
+        # hits of every shard are merged by (rank, channel_id, rowid), substring hits rank by shard
+        if self.scope == 'all' and not self.substring and is_sharded():
+            return format_search_cursor((last_hit.rank, last_hit.rowid,
+                                         get_channel_id_from_video_id(last_hit.video_id)))
+        return format_search_cursor((last_hit.rank, last_hit.rowid))
+
+    def full_text_search(self, query: str) -> None:
+
+        console = self.console
+        self.query = query
+
+        if self.format != "text":
+            self.stream_fts_res()
+            return
+
+        exported = None
+        if self.export:
+            with phase("search.export"):
+                exported, self.res = self.export_fts_res()
+        else:
+            with phase("search.query"):
+                self.res = list(self.search_hits())
 
         if len(self.res) == 0:
+            suggestion = self.suggestion()
+            if suggestion is not None:
+                console.print(f"[yellow]No matches found[/yellow], did you mean [bold]{escape(suggestion)}[/bold]?")
+                sys.exit(1)
             console.print(f"[yellow]No matches found[/yellow]\n"
                           "- Try shortening the search to specific words\n"
                           "- Try using the wildcard operator [bold]*[/bold] to search for partial words\n"
@@ -64,17 +244,156 @@ class SearchHandler:
                           "   - EX: \"foo OR bar\"")
             sys.exit(1)
 
-        self.print_fts_res()
-        if self.export:
-            export_handler = ExportHandler()
-            export_handler.export_fts(self.query, self.scope, self.channel, self.video_id)
+        if self.videos:
+            self.print_video_res()
+        else:
+            self.print_fts_res()
+
+        if self.limit is not None and len(self.res) == self.limit:
+            # page numbers count from the cursor, after one only the next cursor is right
+            hint = f"Next page: [bold]--after {self.next_page_cursor(self.res[-1])}[/bold]"
+            if self.after is None:
+                hint += f" or [bold]--page {self.page + 1}[/bold]"
+            console.print(hint)
+
+        if exported is not None:
+            file_name, count = exported
+            console.print(f"[bold]{count}[/bold] matches found for text: \"[italic]{self.query}[/italic]\"")
+            console.print(f"Exported to [green][bold]{file_name}[/bold][/green]")
 
         console.print(f"Query '{self.query}' ")
         console.print(f"Scope: {self.scope}")
 
-    def vector_search(self, query: str, model: Model) -> None:
+    def export_fts_res(self) -> tuple[tuple[str, int] | None, list[SearchHit]]:
+        """
+        Writes every match to a csv file in one pass over the search and keeps
+        the page of them to print, returns what export_fts did and the page
+        """
+        page: list[SearchHit] = []
+
+        def keep_page(hits: Iterator[SearchHit]) -> Iterator[SearchHit]:
+            for hit in hits:
+                if self.limit is None or len(page) < self.limit:
+                    page.append(hit)
+                yield hit
+
+        hits = keep_page(self.search_hits(unlimited=True))
+        exported = ExportHandler().export_fts(hits, self.scope, self.channel_id,
+                                              self.video_id if self.scope == 'video' else None)
+        return exported, page
+
+    @traced("search.stream")
+    def stream_fts_res(self) -> None:
+        """
+        Writes hits to stdout as csv or JSON lines while they are read from the
+        database, messages go to stderr so the output stays machine readable
+        """
+        err_console = Console(stderr=True)
+        export_handler = ExportHandler()
+
+        last_hit = None
+
+        def track(hits: Iterator[SearchHit]) -> Iterator[SearchHit]:
+            nonlocal last_hit
+            for hit in hits:
+                last_hit = hit
+                yield hit
+
+        if self.format == "csv":
+            count = export_handler.write_fts_csv(track(self.search_hits()), sys.stdout)
+        else:
+            count = export_handler.write_fts_json(track(self.search_hits()), sys.stdout)
+
+        if count == 0:
+            suggestion = self.suggestion()
+            if suggestion is not None:
+                err_console.print(f"[yellow]No matches found[/yellow], did you mean {escape(suggestion)}?")
+                sys.exit(1)
+            err_console.print("[yellow]No matches found[/yellow]")
+            sys.exit(1)
+
+        if self.limit is not None and count == self.limit:
+            err_console.print(f"Next page: --after {self.next_page_cursor(last_hit)}")
+
+    def batch_search(self, queries: Iterable[str], threads: int = 1, file: IO[str] | None = None) -> int:
+        """
+        Runs every query with the options of this handler and writes one JSON
+        object per query, in order, with its hits and timing. Each thread
+        keeps its read connection for all its queries. Returns the number of
+        queries that failed. Writes to stdout unless file is given.
+        """
+        file = file or sys.stdout
+        err_console = Console(stderr=True)
+        export_handler = ExportHandler()
+
+        if self.scope == 'channel':
+            self.channel_id = get_channel_id_from_input(self.channel)
+
+        def run(query: str) -> dict:
+            handler = copy.copy(self)
+            handler.query = query
+            result = {"query": query, "ms": 0.0}
+            start = time.perf_counter()
+
+            if len(query) > 40:
+                result["error"] = "search text must be less than 40 characters"
+            else:
+                try:
+                    with phase("search.query"):
+                        hits = list(handler.search_hits())
+                    result["matches"] = len(hits)
+                    result["hits"] = list(export_handler.fts_rows(iter(hits)))
+                except SystemExit:
+                    # the search functions print the error and exit on it
+                    result["error"] = "search failed"
+
+            result["ms"] = round((time.perf_counter() - start) * 1000, 3)
+            return result
+
+        count = 0
+        failed = 0
+        start = time.perf_counter()
+
+        # error messages of the search functions would end up between the JSON lines
+        with redirect_stdout(sys.stderr), ThreadPoolExecutor(threads, thread_name_prefix="yt-fts-batch") as pool:
+            for result in pool.map(run, queries):
+                file.write(json.dumps(result) + "\n")
+                count += 1
+                failed += "error" in result
+
+        elapsed = time.perf_counter() - start
+        err_console.print(f"{count} queries in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.0f} queries/s), "
+                          f"{failed} failed")
+        return failed
+
+    def vector_search(self, query: str, model: Model | None) -> None:
         console = self.console
         self.query = query
+
+        res = None
+        if self.server is not None:
+            res = self.server.vector_search(self.query, self.scope, self.channel, self.video_id, self.limit)
+        if res is None:
+            if model is None:
+                console.print("[red]Error:[/red] neither the server nor this shell has "
+                              "OPENAI_API_KEY or GEMINI_API_KEY set")
+                sys.exit(1)
+            res = self.vector_matches(query, model)
+
+        self.res = res
+
+        self.print_vector_search_results()
+        if self.export:
+            export_handler = ExportHandler()
+            export_handler.export_vector_search(self.res, self.query, self.scope)
+
+        console.print(f"Query '{self.query}' ")
+        console.print(f"Scope: {self.scope}")
+
+    def vector_matches(self, query: str, model: Model) -> list[dict]:
+        """
+        The limit cues closest in meaning to query, with their video and channel
+        """
         scope_options = None
         if self.scope == "all":
             scope_options = None
@@ -83,34 +402,41 @@ class SearchHandler:
         if self.scope == "video":
             scope_options = {"video_id": self.video_id}
 
+        from openai import OpenAI
+        from .llm.get_embeddings import EmbeddingsHandler
+
         chroma_client = get_chroma_client()
         collection = chroma_client.get_collection(name="subEmbeddings")
 
         embeddings_handler = EmbeddingsHandler()
         openai_client = OpenAI(api_key=model['api_key'], base_url=model['base_url'])
-        search_embedding = next(embeddings_handler.get_embedding(
-            [query], model['embedding_model'], openai_client)
-        )
-        chroma_res = collection.query(
-            query_embeddings=[search_embedding],
-            n_results=self.limit,
-            where=scope_options,
-        )
+        with phase("vsearch.embed"):
+            search_embedding = next(embeddings_handler.get_embedding(
+                [query], model['embedding_model'], openai_client)
+            )
+        with phase("vsearch.query"):
+            chroma_res = collection.query(
+                query_embeddings=[search_embedding],
+                n_results=self.limit,
+                where=scope_options,
+            )
 
         documents = chroma_res["documents"][0]
         metadata = chroma_res["metadatas"][0]
         distances = chroma_res["distances"][0]
 
         res = []
+        with phase("vsearch.metadata"):
+            video_details = get_video_details(meta["video_id"] for meta in metadata)
 
         for i in range(len(documents)):
             text = documents[i]
             video_id = metadata[i]["video_id"]
             start_time = metadata[i]["start_time"]
             link = f"https://youtu.be/{video_id}?t={time_to_secs(start_time)}"
-            channel_name = get_channel_name_from_video_id(video_id)
+            channel_name = video_details[video_id]["channel_name"]
             channel_id = metadata[i]["channel_id"]
-            title = get_title_from_db(video_id)
+            title = video_details[video_id]["video_title"]
 
             match = {
                 "distance": distances[i],
@@ -124,36 +450,31 @@ class SearchHandler:
             }
             res.append(match)
 
-        self.res = res
-
-        self.print_vector_search_results()
-        if self.export:
-            export_handler = ExportHandler()
-            export_handler.export_vector_search(self.res, self.query, self.scope)
-
-        console.print(f"Query '{self.query}' ")
-        console.print(f"Scope: {self.scope}")
+        return res
 
+    @traced("search.render")
     def print_fts_res(self) -> None:
         console = Console()
 
-        query = self.query
         res = self.res
         fts_res = []
         channel_names = []
 
         for quote in res:
             quote_match = {}
-            video_id = quote["video_id"]
-            time_stamp = quote["start_time"]
-            time = time_to_secs(time_stamp)
+            video_id = quote.video_id
+            time_stamp = quote.start_time
+            time = ms_to_secs(quote.start_ms)
             link = f"https://youtu.be/{video_id}?t={time}"
 
-            quote_match["channel_name"] = get_channel_name_from_video_id(video_id)
+            quote_match["channel_name"] = quote.channel_name
             channel_names.append(quote_match["channel_name"])
 
-            quote_match["metadata"] = get_metadata_from_db(video_id)
-            quote_match["subs"] = bold_query_matches(quote["text"].strip(), query)
+            quote_match["metadata"] = {
+                "video_title": quote.video_title,
+                "video_date": get_date(quote.video_date),
+            }
+            quote_match["subs"] = highlight_markup(quote.highlighted.strip())
             quote_match["time_stamp"] = time_stamp
             quote_match["video_id"] = video_id
             quote_match["link"] = link
@@ -174,7 +495,7 @@ class SearchHandler:
             }
             if channel_name not in fts_dict:
                 fts_dict[channel_name] = {}
-            if (video_name, video_date) not in fts_dict[channel_name]:
+            if (video_name, video_date, video_id) not in fts_dict[channel_name]:
                 fts_dict[channel_name][(video_name, video_date, video_id)] = []
             fts_dict[channel_name][(video_name, video_date, video_id)].append(quote_data)
 
@@ -207,7 +528,7 @@ class SearchHandler:
 
         num_matches = len(res)
         num_channels = len(set(channel_names))
-        num_videos = len(set([quote["video_id"] for quote in res]))
+        num_videos = len(set([quote.video_id for quote in res]))
 
         summary_str = f"Found [bold]{num_matches}[/bold] matches in [bold]{num_videos}[/bold] "
         summary_str += f"videos from [bold]{num_channels}[/bold] channel"
@@ -217,6 +538,35 @@ class SearchHandler:
 
         console.print(summary_str)
 
+    @traced("search.render")
+    def print_video_res(self) -> None:
+        """
+        Prints videos best first with the cue that matches best
+        """
+        console = Console()
+
+        for position, video in enumerate(self.res, start=1):
+            console.print(f"{position}. [spring_green2][bold]{video.channel_name}[/bold][/spring_green2] "
+                          f"{video.video_id} ({get_date(video.video_date)}) "
+                          f"\"[bold][blue]{escape(video.video_title)}[/blue][/bold]\"")
+
+            if video.highlighted is None:
+                console.print("       [grey62]matches the whole transcript or title, not a single cue[/grey62]")
+            else:
+                link = f"https://youtu.be/{video.video_id}?t={ms_to_secs(video.start_ms)}"
+                console.print(f"       [grey62][link={link}]{video.start_time}[/link][/grey62] -> "
+                              f"[italic][white]\"{highlight_markup(video.highlighted.strip())}\"[/white][/italic]")
+            console.print("")
+
+        num_channels = len(set(video.channel_name for video in self.res))
+        summary_str = f"Found [bold]{len(self.res)}[/bold] videos from [bold]{num_channels}[/bold] channel"
+
+        if num_channels > 1:
+            summary_str += "s"
+
+        console.print(summary_str)
+
+    @traced("vsearch.render")
     def print_vector_search_results(self) -> None:
         console = Console()
 
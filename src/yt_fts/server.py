@@ -0,0 +1,357 @@
+"""
+yt-fts serve: a long running process answering queries over HTTP.
+
+It listens on a Unix socket next to the database, or on a localhost port,
+and keeps what every CLI call would otherwise pay for warm: imports, read
+connections with their page caches, the Chroma client and the result cache.
+Requests are handled concurrently by a fixed pool of worker threads, each
+keeping its read connections between requests.
+
+Endpoints, all GET with query string parameters, answer JSON:
+
+- /health: version, database and pid of the server
+- /search: q plus the options of yt-fts search (channel, video_id, limit,
+  page, after, substring, phrase, near, videos...), one JSON object per hit
+  and line, streamed as they are read
+- /vsearch: q, channel, video_id and limit, {"matches": [...]}, 501 when the
+  server has no API key for embeddings
+- /transcript: video_id, {"title": ..., "cues": [[start_time, start_ms, text]...]}
+- /list: {"channels": [[id, name, videos, channel_id]...]}, with channel
+  {"videos": [[video_id, title]...]}
+
+Errors answer {"error": message} with a 4xx status. The address is written
+to server.json next to the database while the server runs, see client.py.
+"""
+import io
+import ipaddress
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Iterator
+from urllib.parse import parse_qs, urlsplit
+
+from rich.console import Console
+
+from . import __version__
+from .client import get_server_file
+from .connection import get_data_version, get_db_path, get_read_connection, reset_connections
+from .db_utils import get_channel_id_from_input, get_title_from_db, parse_search_cursor
+from .list import get_channel_rows, get_transcript, get_video_list
+from .search import SearchHandler
+
+console = Console()
+
+# options of /search and how to read them from the query string
+SEARCH_OPTIONS: dict[str, Callable[[str], Any]] = {
+    "channel": str,
+    "video_id": str,
+    "limit": int,
+    "start_ms": int,
+    "stop_ms": int,
+    "page": int,
+    "after": parse_search_cursor,
+    "cache": lambda value: value == "1",
+    "substring": lambda value: value == "1",
+    "phrase": lambda value: value == "1",
+    "near": int,
+    "videos": lambda value: value == "1",
+}
+
+
+class RequestFailed(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ThreadOutput(io.TextIOBase):
+    """
+    Stands in for sys.stdout so what the search functions print before they
+    exit on an error is captured per request instead of going to the log
+    """
+
+    def __init__(self, stream: io.TextIOBase) -> None:
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer or self.stream).write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def capture(self) -> io.StringIO:
+        self.local.buffer = io.StringIO()
+        return self.local.buffer
+
+    def release(self) -> None:
+        self.local.buffer = None
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "PooledServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        routes = {
+            "/health": self.health,
+            "/search": self.search,
+            "/vsearch": self.vector_search,
+            "/transcript": self.transcript,
+            "/list": self.list,
+        }
+        if url.path not in routes:
+            self.send_json(404, {"error": f"no endpoint {url.path}"})
+            return
+
+        self.server.check_data_version()
+        output = self.server.capture_output()
+        try:
+            routes[url.path](params)
+        except RequestFailed as e:
+            self.send_json(e.status, {"error": str(e)})
+        except (ValueError, KeyError) as e:
+            self.send_json(400, {"error": f"bad parameter {e}"})
+        except SystemExit:
+            # the search functions print what went wrong and exit
+            message = output.getvalue().strip() or "request failed"
+            self.send_json(400, {"error": message})
+        finally:
+            self.server.output.release()
+
+    def send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_lines(self, rows: Iterator[dict]) -> None:
+        """
+        Streams rows as JSON lines, the first row is read before the
+        status is sent so errors of the query still get one
+        """
+        first = next(rows, None)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        if first is None:
+            return
+        self.wfile.write((json.dumps(first) + "\n").encode())
+        for row in rows:
+            self.wfile.write((json.dumps(row) + "\n").encode())
+
+    def health(self, params: dict[str, str]) -> None:
+        self.send_json(200, {"version": __version__, "db_path": get_db_path(), "pid": os.getpid()})
+
+    def search(self, params: dict[str, str]) -> None:
+        options = {key: parse(params[key]) for key, parse in SEARCH_OPTIONS.items() if key in params}
+        options["limit"] = options.get("limit", 10) or None
+        options["phrase"] = options.get("phrase", False) or options.get("near") is not None
+
+        if "channel" in options:
+            options["scope"] = "channel"
+        elif "video_id" in options:
+            options["scope"] = "video"
+
+        handler = SearchHandler(**options)
+        handler.query = params["q"]
+        self.send_lines(hit._asdict() for hit in handler.search_hits())
+
+    def vector_search(self, params: dict[str, str]) -> None:
+        if self.server.model is None:
+            self.send_json(501, {"error": "the server has no OPENAI_API_KEY or GEMINI_API_KEY"})
+            return
+
+        handler = SearchHandler(scope=params.get("scope", "all"), channel=params.get("channel"),
+                                video_id=params.get("video_id"), limit=int(params.get("limit", 10)))
+        self.send_json(200, {"matches": handler.vector_matches(params["q"], self.server.model)})
+
+    def transcript(self, params: dict[str, str]) -> None:
+        video_id = params["video_id"]
+        cues = get_transcript(video_id)
+        if len(cues) == 0:
+            raise RequestFailed(404, f"no transcript for video {video_id}")
+        self.send_json(200, {"video_id": video_id, "title": get_title_from_db(video_id), "cues": cues})
+
+    def list(self, params: dict[str, str]) -> None:
+        if "channel" in params:
+            self.send_json(200, {"videos": get_video_list(get_channel_id_from_input(params["channel"]))})
+        else:
+            self.send_json(200, {"channels": get_channel_rows()})
+
+
+class PooledServer(HTTPServer):
+    """
+    HTTP server handing requests to a fixed pool of threads, so read
+    connections, which belong to a thread, stay open between requests
+    """
+    daemon_threads = True
+
+    def __init__(self, address: Any, workers: int, model: dict | None) -> None:
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="yt-fts-serve")
+        self.model = model
+        self.output = ThreadOutput(sys.stdout)
+        self.data_version = get_data_version()
+        self.version_lock = threading.Lock()
+        super().__init__(address, Handler)
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request: Any, client_address: Any) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except ConnectionError:
+            # the client went away before reading everything
+            pass
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def check_data_version(self) -> None:
+        """
+        Another process wrote to the database, it may have changed the
+        layout or removed shards the workers have open
+        """
+        with self.version_lock:
+            data_version = get_data_version()
+            if data_version != self.data_version:
+                self.data_version = data_version
+                reset_connections()
+
+    def capture_output(self) -> io.StringIO:
+        """
+        Starts capturing what this thread prints, putting the proxy in front of
+        sys.stdout if something replaced it since the last request
+        """
+        with self.version_lock:
+            if sys.stdout is not self.output:
+                self.output.stream = sys.stdout
+                sys.stdout = self.output
+        return self.output.capture()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class UnixPooledServer(PooledServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self) -> None:
+        # HTTPServer.server_bind expects a host and port
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+    def get_request(self) -> tuple[socket.socket, Any]:
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler wants a (host, port) client address
+        return request, ("local", 0)
+
+
+def get_socket_path() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(get_db_path())), "yt-fts.sock")
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def make_server(socket_path: str | None = None, host: str = "127.0.0.1", port: int | None = None,
+                workers: int = 8) -> tuple[PooledServer, str]:
+    """
+    Binds the server and returns it with its address, a Unix socket unless
+    port is given. The server has no authentication, it only listens on
+    loopback addresses.
+    """
+    from .utils import get_model_config
+
+    if port is not None and not is_loopback(host):
+        raise ValueError(f"{host} is not a loopback address, the server has no authentication "
+                         "and only listens on this machine")
+
+    try:
+        model = get_model_config()
+    except ValueError:
+        model = None
+
+    # warm up what the first requests would otherwise load
+    get_read_connection()
+    if model is not None:
+        from .config import get_chroma_client
+        get_chroma_client()
+
+    if port is not None:
+        server = PooledServer((host, port), workers, model)
+        return server, f"http://{host}:{server.server_port}"
+
+    socket_path = socket_path or get_socket_path()
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            # left behind by a server that did not shut down
+            os.remove(socket_path)
+        else:
+            raise RuntimeError(f"another server is listening on {socket_path}")
+        finally:
+            probe.close()
+
+    return UnixPooledServer(socket_path, workers, model), f"unix:{socket_path}"
+
+
+def serve(socket_path: str | None = None, host: str = "127.0.0.1", port: int | None = None,
+          workers: int = 8) -> None:
+    """
+    Runs the server until interrupted, announcing it in server.json
+    """
+    server, address = make_server(socket_path, host, port, workers)
+    server_file = get_server_file()
+
+    with open(server_file + ".tmp", "w") as f:
+        json.dump({"address": address, "pid": os.getpid()}, f)
+    os.replace(server_file + ".tmp", server_file)
+
+    # stopped by a service manager, clean up as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    stdout = sys.stdout
+    console.print(f"Serving {get_db_path()} on [bold]{address}[/bold] with {workers} workers")
+    if server.model is None:
+        console.print("[yellow]No OPENAI_API_KEY or GEMINI_API_KEY set, vsearch runs in the client[/yellow]")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout = stdout
+        server.server_close()
+        os.remove(server_file)
+        if address.startswith("unix:"):
+            os.remove(address[len("unix:"):])
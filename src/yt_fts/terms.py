@@ -0,0 +1,192 @@
+"""
+Vocabulary of the search index, for autocomplete and "did you mean".
+
+The Terms table in the main database holds every term of Subtitles_fts with
+the number of cues containing it. Counting that with fts5vocab reads the
+doclist of every term in the index, too slow to run per keystroke, so Terms
+is counted from fts5vocab once and then kept up to date as cues come and go:
+
+- ingest tokenizes the new cues in a temporary contentless FTS5 table with
+  the tokenizer of the index and adds up its fts5vocab
+- delete_channel subtracts the cues of the channel the same way, or the
+  fts5vocab of its shard
+- deferred loads rebuild the index without the triggers, the fts5vocab of
+  each rebuilt database is subtracted before and added after the rebuild
+- index profile changes count Terms from fts5vocab again afterwards
+
+Settings terms = 1 marks the counts complete. Until the first lookup nothing
+is counted, databases that never use it pay nothing at ingest. Terms are what
+the tokenizer made of the text: lower case, without the diacritics the index
+profile folds and porter stems with a stemmed profile.
+"""
+import difflib
+import re
+import sqlite3
+from typing import Iterable
+
+from .connection import get_read_connection, get_subtitle_connection, get_subtitle_databases, write_transaction
+from .fts import INDEX_PROFILES, get_index_profile
+
+# upper bound of the terms compared with an unknown word
+SUGGESTION_CANDIDATES = 5000
+# difflib similarity a term needs to be suggested, "teh" and "the" score 0.67
+SUGGESTION_CUTOFF = 0.6
+
+FTS5_OPERATORS = {"AND", "OR", "NOT", "NEAR"}
+
+
+def terms_counted(conn: sqlite3.Connection) -> bool:
+    return conn.execute("SELECT 1 FROM Settings WHERE key = 'terms' AND value = '1'").fetchone() is not None
+
+
+def read_vocabulary(conn: sqlite3.Connection) -> list[tuple[str, int]]:
+    """
+    (term, cues) of every term in the Subtitles_fts of the main database of conn
+    """
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.Subtitles_fts_vocab "
+                 "USING fts5vocab(main, 'Subtitles_fts', 'row')")
+    rows = conn.execute("SELECT term, doc FROM temp.Subtitles_fts_vocab").fetchall()
+    conn.execute("DROP TABLE temp.Subtitles_fts_vocab")
+    return rows
+
+
+def count_terms(conn: sqlite3.Connection, texts: Iterable[str]) -> list[tuple[str, int]]:
+    """
+    (term, cues) of texts as the index would tokenize them, without touching it
+    """
+    tokenize = INDEX_PROFILES[get_index_profile(conn)]["tokenize"]
+    conn.execute("DROP TABLE IF EXISTS temp.Terms_batch")
+    conn.execute(f"CREATE VIRTUAL TABLE temp.Terms_batch USING fts5 "
+                 f"(text, content='', detail=none, tokenize='{tokenize}')")
+    conn.executemany("INSERT INTO temp.Terms_batch (text) VALUES (?)", ((text,) for text in texts))
+
+    conn.execute("CREATE VIRTUAL TABLE temp.Terms_batch_vocab USING fts5vocab(temp, 'Terms_batch', 'row')")
+    rows = conn.execute("SELECT term, doc FROM temp.Terms_batch_vocab").fetchall()
+    conn.execute("DROP TABLE temp.Terms_batch_vocab")
+    conn.execute("DROP TABLE temp.Terms_batch")
+    return rows
+
+
+def add_terms(conn: sqlite3.Connection, counts: list[tuple[str, int]]) -> None:
+    conn.executemany("""
+        INSERT INTO Terms (term, docs) VALUES (?, ?)
+        ON CONFLICT (term) DO UPDATE SET docs = docs + excluded.docs
+    """, counts)
+
+
+def subtract_terms(conn: sqlite3.Connection, counts: list[tuple[str, int]]) -> None:
+    conn.executemany("UPDATE Terms SET docs = docs - ? WHERE term = ?", [(docs, term) for term, docs in counts])
+    conn.execute("DELETE FROM Terms WHERE docs <= 0")
+
+
+def refresh_terms() -> None:
+    """
+    Counts Terms from scratch from the index of every database
+    """
+    # read before the catalog is locked, opening a shard for the first time
+    # prepares it in a transaction that needs the attached catalog
+    vocabularies = [read_vocabulary(get_subtitle_connection(channel_id))
+                    for channel_id in get_subtitle_databases()]
+
+    with write_transaction() as conn:
+        conn.execute("DELETE FROM Terms")
+        for vocabulary in vocabularies:
+            add_terms(conn, vocabulary)
+        conn.execute("INSERT OR REPLACE INTO Settings (key, value) VALUES ('terms', '1')")
+
+
+def recount_terms() -> None:
+    """
+    Counts Terms again after the index was rebuilt, if they are in use
+    """
+    if terms_counted(get_read_connection()):
+        refresh_terms()
+
+
+def ensure_terms() -> sqlite3.Connection:
+    """
+    Read connection to a database whose Terms are counted
+    """
+    if not terms_counted(get_read_connection()):
+        refresh_terms()
+    return get_read_connection()
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    """
+    Smallest string greater than every string starting with prefix
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def complete_terms(prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+    """
+    The limit terms starting with prefix found in the most cues, as (term, cues)
+    """
+    conn = ensure_terms()
+    prefix = prefix.strip().lower()
+
+    if prefix == "":
+        return conn.execute("SELECT term, docs FROM Terms ORDER BY docs DESC, term LIMIT ?", [limit]).fetchall()
+
+    return conn.execute("""
+        SELECT term, docs FROM Terms
+        WHERE term >= ? AND term < ?
+        ORDER BY docs DESC, term
+        LIMIT ?
+    """, [prefix, prefix_upper_bound(prefix), limit]).fetchall()
+
+
+def suggest_term(word: str) -> str | None:
+    """
+    The known term closest in spelling to word, None if word is known or nothing is close
+    """
+    conn = ensure_terms()
+    word = word.lower()
+
+    if conn.execute("SELECT 1 FROM Terms WHERE term = ?", [word]).fetchone() is not None:
+        return None
+
+    # typos rarely change the first letter, that keeps the lookup a range scan
+    candidates = conn.execute("""
+        SELECT term, docs FROM Terms
+        WHERE term >= ? AND term < ? AND length(term) BETWEEN ? AND ?
+        ORDER BY docs DESC
+        LIMIT ?
+    """, [word[0], prefix_upper_bound(word[0]), len(word) - 2, len(word) + 2, SUGGESTION_CANDIDATES]).fetchall()
+
+    # candidates come most common first, equally close terms go to the first
+    best, best_score = None, 0.0
+    matcher = difflib.SequenceMatcher(b=word)
+    for term, _ in candidates:
+        matcher.set_seq1(term)
+        # the quick ratios are upper bounds of ratio()
+        bound = min(matcher.real_quick_ratio(), matcher.quick_ratio())
+        if bound < SUGGESTION_CUTOFF or bound <= best_score:
+            continue
+        score = matcher.ratio()
+        if score >= SUGGESTION_CUTOFF and score > best_score:
+            best, best_score = term, score
+
+    return best
+
+
+def suggest_query(query: str) -> str | None:
+    """
+    query with every unknown word replaced by its closest known term, None
+    if no word has a suggestion
+    """
+    changed = False
+    words = []
+
+    for word in re.findall(r'"[^"]*"|\S+', query):
+        suggestion = None
+        if word not in FTS5_OPERATORS and re.fullmatch(r"\w{3,}", word):
+            suggestion = suggest_term(word)
+        if suggestion is not None:
+            changed = True
+        words.append(suggestion or word)
+
+    if not changed:
+        return None
+    return " ".join(words)
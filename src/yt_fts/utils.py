@@ -3,7 +3,6 @@ This is where I'm putting all the functions that don't belong anywhere else
 """
 import datetime
 import re
-import sqlite3
 from typing import TypedDict
 import webvtt
 
@@ -35,6 +34,25 @@ def time_to_secs(time_str: str) -> int:
     return total_secs - 3
 
 
+def time_to_ms(time_str: str) -> int:
+    """
+    converts a vtt timestamp like 00:01:02.500 or 01:02.500 to milliseconds
+    """
+    parts = time_str.strip().split(":")
+    secs = float(parts[-1])
+    mins = int(parts[-2]) if len(parts) > 1 else 0
+    hours = int(parts[-3]) if len(parts) > 2 else 0
+
+    return (hours * 3600 + mins * 60) * 1000 + round(secs * 1000)
+
+
+def ms_to_secs(ms: int) -> int:
+    """
+    converts milliseconds to seconds for youtube urls. Subtracts 3 seconds to give a buffer. 
+    """
+    return ms // 1000 - 3
+
+
 def parse_vtt(vtt_path: str) -> list[dict[str, str]]:
 
     result = word_level_vtt_parser(vtt_path)
@@ -160,10 +178,9 @@ def get_date(date_string: str) -> datetime.date:
 
 # check if semantic search has been enabled for channel
 def check_ss_enabled(channel_id: str | None = None) -> bool:
-    from yt_fts.config import get_db_path
+    from yt_fts.connection import get_read_connection
 
-    con = sqlite3.connect(get_db_path())
-    cur = con.cursor()
+    cur = get_read_connection().cursor()
 
     if channel_id is None:
         cur.execute(""" 
@@ -185,17 +202,13 @@ def check_ss_enabled(channel_id: str | None = None) -> bool:
 
 
 def enable_ss(channel_id: str) -> None:
-    from yt_fts.config import get_db_path
+    from yt_fts.connection import write_transaction
 
-    con = sqlite3.connect(get_db_path())
-    cur = con.cursor()
-
-    cur.execute(""" 
-        INSERT INTO SemanticSearchEnabled (channel_id)
-        VALUES (?)
-        """, [channel_id])
-    con.commit()
-    con.close()
+    with write_transaction() as con:
+        con.execute(""" 
+            INSERT INTO SemanticSearchEnabled (channel_id)
+            VALUES (?)
+            """, [channel_id])
 
 
 def bold_query_matches(text: str, query: str) -> str:
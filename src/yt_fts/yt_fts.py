@@ -1,35 +1,104 @@
 import os
 import sys
+import json
 import click
+from typing import IO, TYPE_CHECKING
 
-from openai import OpenAI
 from rich.console import Console
 
-from .download.download_handler import DownloadHandler
-from .llm.summarize import SummarizeHandler
-from .export import ExportHandler 
-from .search import SearchHandler
-
-from .list import list_channels
-from .utils import get_model_config, show_message
+# handlers are imported by the commands using them, yt-fts search does not
+# load yt_dlp, openai or chromadb, see benchmarks/bench_startup.py
+from .client import ServerError, find_server
+from .utils import get_model_config, show_message, time_to_ms
 from .config import (
     get_config_path,
     get_db_path,
-    get_or_make_chroma_path
+    get_or_make_chroma_path,
+    get_trace_setting
 )
+from .connection import get_read_connection, set_db_path, writer_lock
+from .profiling import finish_profiling, start_profiling
+from .fts import INDEX_PROFILES, STORAGE_PROFILES, video_index_enabled
 from .db_utils import (
+    SearchCursor,
+    parse_search_cursor,
     get_channel_id_from_input,
     get_channel_name_from_id,
-    delete_channel
+    delete_channel,
+    add_run
 )
 from . import __version__ as YT_FTS_VERSION
 
+if TYPE_CHECKING:
+    from .download.download_handler import DownloadHandler
+
 console = Console()
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
 @click.version_option(YT_FTS_VERSION, message='yt_fts version: %(version)s')
-def cli() -> None:
-    pass
+@click.option("--profile", is_flag=True, default=False,
+              help="Print the time spent in each phase of the command when it exits")
+@click.option("--profile-dir", default=None, type=click.Path(file_okay=False),
+              help="Also write a cProfile .pstats and a Chrome trace .trace.json of the command here")
+@click.pass_context
+def cli(ctx: click.Context, profile: bool, profile_dir: str | None) -> None:
+    # resolve the db again in case a previous invocation in this process moved it
+    set_db_path(None)
+
+    trace, trace_dir = get_trace_setting()
+    profile_dir = profile_dir or trace_dir
+    if profile or profile_dir or trace:
+        start_profiling(profile_dir)
+        # runs on sys.exit too, the breakdown of a failed command is printed as well
+        ctx.call_on_close(lambda: finish_profiling(ctx.invoked_subcommand))
+
+
+def report_run(download_handler: "DownloadHandler", metrics_path: str | None, log_run: bool) -> None:
+    """
+    Writes the metrics of the download or update when the command finishes,
+    failed runs included
+    """
+    ctx = click.get_current_context()
+
+    def report() -> None:
+        summary = download_handler.metrics.summary(ctx.info_name)
+        if metrics_path is not None:
+            with open(metrics_path, "w") as f:
+                json.dump(summary, f, indent=2)
+        if log_run:
+            add_run(summary)
+
+    if metrics_path is not None or log_run:
+        ctx.call_on_close(report)
+
+
+def parse_timestamp(ctx: click.Context, param: click.Parameter, value: str | None) -> int | None:
+    if value is None:
+        return None
+    try:
+        return time_to_ms(value)
+    except ValueError:
+        raise click.BadParameter(f"expected seconds, MM:SS or HH:MM:SS, got \"{value}\"")
+
+
+def parse_cursor(ctx: click.Context, param: click.Parameter, value: str | None) -> SearchCursor | None:
+    if value is None:
+        return None
+    try:
+        return parse_search_cursor(value)
+    except ValueError:
+        raise click.BadParameter(f"expected the value printed after \"Next page:\", got \"{value}\"")
+
+
+def hold_writer_lock() -> None:
+    """
+    Keeps other download/update processes out until the command finishes
+    """
+    locked = click.get_current_context().with_resource(writer_lock())
+    if not locked:
+        console.print("[red]Error:[/red] Another download or update is already writing to the database. "
+                      "Wait for it to finish and try again.")
+        sys.exit(1)
 
 
 @cli.command(
@@ -50,12 +119,25 @@ def cli() -> None:
               help="Number of parallel download jobs (default: 8, recommended: 4-16 for most users)")
 @click.option("--cookies-from-browser", default=None,
               help="Browser to extract cookies from. Ex: chrome, firefox")
-def download(url: str, playlist: bool, language: str, jobs: int, cookies_from_browser: str | None) -> None:
+@click.option("--bulk", is_flag=True,
+              help="Rebuild the search index once at the end instead of per subtitle. Faster for large imports.")
+@click.option("--metrics", "metrics_path", default=None, type=click.Path(dir_okay=False),
+              help="Write counts, errors and latencies of the run to this file as JSON")
+@click.option("--log-run", is_flag=True,
+              help="Append the metrics of the run to the Runs table of the database")
+def download(url: str, playlist: bool, language: str, jobs: int, cookies_from_browser: str | None,
+             bulk: bool, metrics_path: str | None, log_run: bool) -> None:
+    from .download.download_handler import DownloadHandler
+
+    hold_writer_lock()
+
     download_handler = DownloadHandler(
         number_of_jobs=jobs,
         language=language,
-        cookies_from_browser=cookies_from_browser
+        cookies_from_browser=cookies_from_browser,
+        bulk=bulk
     )
+    report_run(download_handler, metrics_path, log_run)
 
     if playlist:
         if "playlist?" not in url:
@@ -106,7 +188,23 @@ def diagnose(test_url: str, cookies_from_browser: str | None, jobs: int) -> None
 @click.option("-c", "--channel", default=None, help="Show list of videos for a channel")
 @click.option("-l", "--library", is_flag=True, help="Show list of channels in library")
 def list(transcript: str | None, channel: str | None, library: bool) -> None:
-    from .list import show_video_list, show_video_transcript
+    from .list import (list_channels, show_video_list, show_video_transcript, print_channels, print_transcript,
+                       print_video_list)
+
+    server = find_server()
+    if server is not None:
+        try:
+            if transcript:
+                title, cues = server.transcript(transcript)
+                print_transcript(transcript, cues, title)
+            elif channel:
+                print_video_list(server.videos(channel))
+            else:
+                print_channels(server.channels())
+        except ServerError as e:
+            console.print(f"[red]Error:[/red] {e}")
+            sys.exit(1)
+        sys.exit(0)
 
     if transcript:
         show_video_transcript(transcript)
@@ -139,12 +237,25 @@ def list(transcript: str | None, channel: str | None, library: bool) -> None:
 @click.option("--cookies-from-browser",
               default=None,
               help="Browser to extract cookies from. Ex: chrome, firefox")
-def update(channel: str | None, language: str, jobs: int, cookies_from_browser: str | None) -> None:
+@click.option("--bulk", is_flag=True,
+              help="Rebuild the search index once at the end instead of per subtitle. Faster for large imports.")
+@click.option("--metrics", "metrics_path", default=None, type=click.Path(dir_okay=False),
+              help="Write counts, errors and latencies of the run to this file as JSON")
+@click.option("--log-run", is_flag=True,
+              help="Append the metrics of the run to the Runs table of the database")
+def update(channel: str | None, language: str, jobs: int, cookies_from_browser: str | None, bulk: bool,
+           metrics_path: str | None, log_run: bool) -> None:
+    from .download.download_handler import DownloadHandler
+
+    hold_writer_lock()
+
     update_handler = DownloadHandler(
         language=language,
         number_of_jobs=jobs,
-        cookies_from_browser=cookies_from_browser
+        cookies_from_browser=cookies_from_browser,
+        bulk=bulk
     )
+    report_run(update_handler, metrics_path, log_run)
 
     if channel is not None:
         update_handler.update_channel(channel)
@@ -194,6 +305,7 @@ def delete(channel: str) -> None:
 @click.option("-f", "--format", default="txt",
               help="The format to export transcripts to. Supported formats: txt, vtt")
 def export(channel: str, format: str) -> None:
+    from .export import ExportHandler
 
     export_handler = ExportHandler(
         scope = "channel",
@@ -209,19 +321,92 @@ def export(channel: str, format: str) -> None:
     name="search",
     help="""
         Search for a specified text within a channel, a specific video, or across all channels.
+
+        With --batch the queries are read from a file instead, one per line, and
+        the results written as one JSON object per query.
         """
 )
-@click.argument("text", required=True)
+@click.argument("text", required=False)
 @click.option("-c", "--channel", default=None, help="The name or id of the channel to search in.")
 @click.option("-v", "--video-id", default=None, help="The id of the video to search in.")
-@click.option("-l", "--limit", default=10, type=int, help="Number of results to return")
+@click.option("-l", "--limit", default=10, type=click.IntRange(min=0),
+              help="Number of results to return, 0 returns every match")
 @click.option("-e", "--export", is_flag=True, help="Export search results to a CSV file.")
-def search(text: str, channel: str | None, video_id: str | None, export: bool, limit: int) -> None:
+@click.option("--from", "start_ms", default=None, callback=parse_timestamp,
+              help="Only match cues of --video-id starting at or after this time. Ex: 90, 1:30, 01:01:30")
+@click.option("--to", "stop_ms", default=None, callback=parse_timestamp,
+              help="Only match cues of --video-id starting before this time.")
+@click.option("-f", "--format", "output_format", default="text", type=click.Choice(("text", "csv", "json")),
+              help="Print results as text, csv or one JSON object per line. csv and json are streamed.")
+@click.option("--page", default=1, type=click.IntRange(min=1),
+              help="Page of --limit results to show")
+@click.option("--after", default=None, callback=parse_cursor,
+              help="Continue after the last result of a previous page, use the value it printed")
+@click.option("--no-cache", is_flag=True, help="Run the search even if its results are cached")
+@click.option("-s", "--substring", is_flag=True,
+              help="Match TEXT anywhere inside words, * and ? match any characters and one character. "
+                   "Fast once the trigram index is built with `yt-fts maintenance trigram build`.")
+@click.option("-p", "--phrase", is_flag=True,
+              help="Match TEXT as one phrase, also across cue boundaries once the phrase index is built "
+                   "with `yt-fts maintenance phrases build`.")
+@click.option("--near", default=None, type=click.IntRange(min=0),
+              help="Match the words of TEXT in any order with at most this many words between them, "
+                   "across cue boundaries like --phrase.")
+@click.option("--videos", is_flag=True,
+              help="Rank whole videos by their title and transcript and show the best matching cue of each. "
+                   "Needs the video index built with `yt-fts maintenance videos build`.")
+@click.option("--batch", default=None, type=click.File("r"),
+              help="Run every query in this file, one per line, - reads stdin. Blank lines and lines "
+                   "starting with # are skipped. Prints one JSON object per query with its hits and timing.")
+@click.option("--threads", default=1, type=click.IntRange(min=1),
+              help="Number of queries of --batch to run at once")
+def search(text: str | None, channel: str | None, video_id: str | None, export: bool, limit: int,
+           start_ms: int | None, stop_ms: int | None, output_format: str, page: int,
+           after: SearchCursor | None, no_cache: bool, substring: bool, phrase: bool, near: int | None,
+           videos: bool, batch: IO[str] | None, threads: int) -> None:
+    from .search import SearchHandler
+
+    if (text is None) == (batch is None):
+        console.print("[red]Error:[/red] give either TEXT or --batch")
+        sys.exit(1)
 
-    if len(text) > 40:
+    if batch is not None and (export or output_format == "csv"):
+        console.print("[red]Error:[/red] --batch writes JSON lines, it cannot be combined with --export or --format csv")
+        sys.exit(1)
+
+    if text is not None and len(text) > 40:
         show_message("search_too_long")
         sys.exit(1)
 
+    if (start_ms is not None or stop_ms is not None) and video_id is None:
+        console.print("[red]Error:[/red] --from and --to require --video-id")
+        sys.exit(1)
+
+    if page > 1 and after is not None:
+        console.print("[red]Error:[/red] use either --page or --after")
+        sys.exit(1)
+
+    if export and (page > 1 or after is not None):
+        console.print("[red]Error:[/red] --export writes every match, it cannot be combined with --page or --after")
+        sys.exit(1)
+
+    if substring and (phrase or near is not None):
+        console.print("[red]Error:[/red] use either --substring or --phrase and --near")
+        sys.exit(1)
+
+    if videos and (video_id is not None or substring or phrase or near is not None):
+        console.print("[red]Error:[/red] --videos cannot be combined with --video-id, --substring, --phrase or --near")
+        sys.exit(1)
+
+    if videos and not video_index_enabled(get_read_connection()):
+        console.print("[red]Error:[/red] search --videos needs the video index, "
+                      "build it with [bold]yt-fts maintenance videos build[/bold]")
+        sys.exit(1)
+
+    if (page > 1 or after is not None) and limit == 0:
+        console.print("[red]Error:[/red] --page and --after need a --limit")
+        sys.exit(1)
+
     if channel:
         scope = "channel"
     elif video_id:
@@ -234,10 +419,32 @@ def search(text: str, channel: str | None, video_id: str | None, export: bool, l
         video_id=video_id,
         channel=channel,
         export=export,
-        limit=limit
+        limit=limit if limit > 0 else None,
+        start_ms=start_ms,
+        stop_ms=stop_ms,
+        format=output_format,
+        page=page,
+        after=after,
+        cache=not no_cache,
+        substring=substring,
+        phrase=phrase or near is not None,
+        near=near,
+        videos=videos,
+        # batches and exports read every hit, they stay in this process
+        server=find_server() if batch is None and not export else None
     )
 
-    search_handler.full_text_search(text)
+    if batch is not None:
+        queries = (line.strip() for line in batch)
+        failed = search_handler.batch_search((query for query in queries if query and not query.startswith("#")),
+                                             threads)
+        sys.exit(1 if failed else 0)
+
+    try:
+        search_handler.full_text_search(text)
+    except ServerError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
     sys.exit(0)
 
 
@@ -257,16 +464,24 @@ def search(text: str, channel: str | None, video_id: str | None, export: bool, l
               help="OpenAI or Gemini API key. If not provided, the script will attempt to read it from the OPENAI_API_KEY or GEMINI_API_KEY"
                    "environment variables.")
 def vsearch(text: str, channel: str | None, video_id: str | None, limit: int, export: bool, api_key: str | None) -> None:
-  
+    from openai import OpenAI
+    from .search import SearchHandler
+
+    # a running yt-fts serve embeds the query with its own key
+    server = find_server() if api_key is None else None
+
+    model = None
+    openai_client = None
     try:
         model = get_model_config(api_key)
-        api_key = model['api_key']
+        openai_client = OpenAI(api_key=model['api_key'], base_url=model['base_url'])
     except ValueError:
-        console.print("[red]Error:[/red] OPENAI_API_KEY and GEMINI_API_KEY environment variables not set\n"
-                      "To set the key run: export \"OPENAI_API_KEY=<your_key>\" or "
-                      "export \"GEMINI_API_KEY=<your_key>\" or pass "
-                      "one in with --api-key")
-        sys.exit(1)
+        if server is None:
+            console.print("[red]Error:[/red] OPENAI_API_KEY and GEMINI_API_KEY environment variables not set\n"
+                          "To set the key run: export \"OPENAI_API_KEY=<your_key>\" or "
+                          "export \"GEMINI_API_KEY=<your_key>\" or pass "
+                          "one in with --api-key")
+            sys.exit(1)
 
     if channel:
         scope = "channel"
@@ -275,18 +490,21 @@ def vsearch(text: str, channel: str | None, video_id: str | None, limit: int, ex
     else:
         scope = "all"
 
-    openai_client = OpenAI(api_key=api_key, base_url=model['base_url'])
-
     vsearch_handler = SearchHandler(
         scope=scope,
         channel=channel,
         video_id=video_id,
         export=export,
         limit=limit,
-        openai_client=openai_client
+        openai_client=openai_client,
+        server=server
     )
 
-    vsearch_handler.vector_search(query=text, model=model)
+    try:
+        vsearch_handler.vector_search(query=text, model=model)
+    except ServerError as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
 
     sys.exit(0)
 
@@ -383,6 +601,9 @@ def llm(prompt: str, channel: str, api_key: str | None = None) -> None:
               help="OpenAI or Gemini API key. If not provided, the script will attempt to read it from"
                    " the OPENAI_API_KEY or GEMINI_API_KEY environment variable.")
 def summarize(video: str, model: str | None, api_key: str | None) -> None:
+    from openai import OpenAI
+    from .llm.summarize import SummarizeHandler
+
     try:
         model_config = get_model_config(api_key)
         api_key = model_config['api_key']
@@ -405,6 +626,240 @@ def summarize(video: str, model: str | None, api_key: str | None) -> None:
     summarize_handler.summarize_video()
 
 
+@cli.group(
+    name="maintenance",
+    help="""
+    Inspect and tune the database.
+    """
+)
+def maintenance() -> None:
+    pass
+
+
+@maintenance.command(
+    name="stats",
+    help="""
+    Show the size of each table and the latency of sample searches.
+    """
+)
+def maintenance_stats() -> None:
+    from .maintenance import show_storage_stats
+
+    show_storage_stats()
+    sys.exit(0)
+
+
+@maintenance.command(
+    name="storage",
+    help="""
+    Rebuild the search index with a storage profile.
+
+    standard keeps everything. compact drops per row token counts, which makes
+    the index smaller and ranking slightly slower. minimal also drops token
+    positions, so "quoted phrases" of more than one word no longer match.
+    """
+)
+@click.option("-p", "--profile", required=True, type=click.Choice(tuple(STORAGE_PROFILES)),
+              help="The storage profile to rebuild the index with")
+def maintenance_storage(profile: str) -> None:
+    from .maintenance import change_storage_profile
+
+    hold_writer_lock()
+    change_storage_profile(profile)
+    sys.exit(0)
+
+
+@maintenance.command(
+    name="layout",
+    help="""
+    Switch between one database and one database per channel.
+
+    sharded keeps channels and videos in the main database and the subtitles
+    and search index of every channel in its own file, so deleting, vacuuming
+    or backing up a channel only touches that file. single moves everything
+    back into the main database.
+    """
+)
+@click.argument("layout", required=True, type=click.Choice(("single", "sharded")))
+def maintenance_layout(layout: str) -> None:
+    from .maintenance import change_layout
+
+    hold_writer_lock()
+    change_layout(layout)
+    sys.exit(0)
+
+
+@maintenance.command(
+    name="trigram",
+    help="""
+    Build or drop the trigram index used by search --substring.
+
+    The index makes substring searches fast at the cost of a second search
+    index, stats shows how large it is next to the main one.
+    """
+)
+@click.argument("action", required=True, type=click.Choice(("build", "drop")))
+def maintenance_trigram(action: str) -> None:
+    from .maintenance import change_trigram_index
+
+    hold_writer_lock()
+    change_trigram_index(action == "build")
+    sys.exit(0)
+
+
+@maintenance.command(
+    name="phrases",
+    help="""
+    Build or drop the phrase index used by search --phrase and --near.
+
+    Auto generated captions split sentences over short cues. The phrase index
+    holds every run of --cues consecutive cues, so phrases spanning up to that
+    many cues match. It takes about --cues times the space of the search index.
+    """
+)
+@click.argument("action", required=True, type=click.Choice(("build", "drop")))
+@click.option("--cues", default=2, type=click.IntRange(2, 5), help="Consecutive cues per window")
+def maintenance_phrases(action: str, cues: int) -> None:
+    from .maintenance import change_window_index
+
+    hold_writer_lock()
+    change_window_index(cues if action == "build" else None)
+    sys.exit(0)
+
+
+@maintenance.command(
+    name="videos",
+    help="""
+    Build or drop the video index used by search --videos.
+
+    The index holds one document per video with its title and transcript, so
+    whole videos can be ranked by how much they are about the search. It
+    stores no text, only the index, about as large as the main search index.
+    """
+)
+@click.argument("action", required=True, type=click.Choice(("build", "drop")))
+def maintenance_videos(action: str) -> None:
+    from .maintenance import change_video_index
+
+    hold_writer_lock()
+    change_video_index(action == "build")
+    sys.exit(0)
+
+
+@maintenance.command(
+    name="ranking",
+    help="""
+    Show or change how full text search ranks results.
+
+    The bm25 score of a match is scaled up for recent videos (--recency, a
+    video --half-life days old gets half the boost of one from today), scaled
+    down for cues shorter than --min-length characters (--length, 0 to 1) and
+    scaled by the boost of its channel. Every signal is off (0) until set
+    here; with every signal off, searches of very common words are faster.
+    search --videos weighs titles --title times as much as transcripts.
+    """
+)
+@click.option("--recency", type=click.FloatRange(min=0), help="Weight of video recency")
+@click.option("--half-life", type=click.FloatRange(min=1), help="Age in days at which a video gets half the recency boost")
+@click.option("--length", type=click.FloatRange(0, 1), help="Weight of the short cue penalty")
+@click.option("--min-length", type=click.IntRange(min=1), help="Cues shorter than this many characters are penalized")
+@click.option("--title", type=click.FloatRange(min=0), help="Weight of video titles against transcripts in search --videos")
+@click.option("-b", "--boost", nargs=2, multiple=True, type=(str, click.FloatRange(min=0, min_open=True)),
+              help="Channel name or id and its boost, 1 removes the boost. Can be repeated.")
+def maintenance_ranking(recency: float | None, half_life: float | None, length: float | None,
+                        min_length: int | None, title: float | None, boost: tuple[tuple[str, float], ...]) -> None:
+    from .maintenance import show_ranking
+    from .ranking import set_channel_boost, set_ranking_weight
+
+    weights = {"recency": recency, "half_life": half_life, "length": length, "min_length": min_length,
+               "title": title}
+    for name, value in weights.items():
+        if value is not None:
+            set_ranking_weight(name, value)
+
+    for channel, weight in boost:
+        set_channel_boost(get_channel_id_from_input(channel), weight)
+
+    show_ranking()
+    sys.exit(0)
+
+
+@cli.command(
+    help="""
+    Rebuild the search index, optionally with another index profile.
+
+    default matches words as written. prefix folds every diacritic and also
+    indexes the first 2 and 3 characters of every word, which helps short
+    prefix searches like "ru*" that match many different words but doubles the
+    size of the index. stemmed matches other forms of a word, "running" finds
+    "run" and "runs". stemmed_prefix combines both.
+
+    The new index is built next to the old one, searches keep working until
+    it is swapped in.
+    """
+)
+@click.option("-p", "--profile", type=click.Choice(tuple(INDEX_PROFILES)),
+              help="The index profile to rebuild with, the current one by default")
+def reindex(profile: str | None) -> None:
+    from .maintenance import change_index_profile
+
+    hold_writer_lock()
+    change_index_profile(profile)
+    sys.exit(0)
+
+
+@cli.command(
+    help="""
+    List the indexed terms starting with PREFIX, most common first.
+
+    Prints one term and the number of cues containing it per line, for shell
+    completion or to check how a word was indexed. Terms are lower case and
+    stemmed with a stemmed index profile. The first run counts the terms of
+    the whole index, later ones are a lookup.
+    """
+)
+@click.argument("prefix", required=False, default="")
+@click.option("-l", "--limit", default=10, type=click.IntRange(min=1), help="Number of terms to list")
+def terms(prefix: str, limit: int) -> None:
+    from .terms import complete_terms
+
+    for term, docs in complete_terms(prefix, limit):
+        click.echo(f"{term}\t{docs}")
+    sys.exit(0)
+
+
+@cli.command(
+    help="""
+    Answer search, vsearch and list from a long running process.
+
+    Keeps read connections, caches and the Chroma client warm and handles
+    requests concurrently. While it runs, yt-fts search, vsearch and list
+    forward to it instead of opening the database themselves; set
+    YT_FTS_NO_SERVER=1 to bypass it. Listens on a Unix socket next to the
+    database unless --port is given. Stop it with Ctrl+C.
+    """
+)
+@click.option("--socket", "socket_path", default=None, help="Path of the Unix socket to listen on")
+@click.option("--port", default=None, type=click.IntRange(0, 65535),
+              help="Listen on a localhost TCP port instead of a Unix socket, 0 picks a free one")
+@click.option("--host", default="127.0.0.1",
+              help="Loopback address to listen on with --port, like 127.0.0.1 or ::1")
+@click.option("-w", "--workers", default=8, type=click.IntRange(min=1), help="Requests handled at the same time")
+def serve(socket_path: str | None, port: int | None, host: str, workers: int) -> None:
+    from .server import serve as run_server
+
+    if find_server() is not None:
+        console.print("[red]Error:[/red] a server is already running on this database")
+        sys.exit(1)
+
+    try:
+        run_server(socket_path, host, port, workers)
+    except (OSError, RuntimeError, ValueError) as e:
+        console.print(f"[red]Error:[/red] {e}")
+        sys.exit(1)
+    sys.exit(0)
+
+
 @cli.command(
     help="""
     Show config settings
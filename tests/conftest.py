@@ -0,0 +1,18 @@
+import pytest
+from yt_fts.connection import set_db_path
+from yt_fts.db_utils import make_db, add_channel_info
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    A new database the process uses, with the channels UC1 and UC2. Test
+    modules add their videos by overriding it.
+    """
+    path = str(tmp_path / "subtitles.db")
+    make_db(path)
+    set_db_path(path)
+    add_channel_info("UC1", "one", "https://youtube.com/channel/UC1")
+    add_channel_info("UC2", "two", "https://youtube.com/channel/UC2")
+    yield path
+    set_db_path(None)
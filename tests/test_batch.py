@@ -0,0 +1,57 @@
+import io
+import json
+import pytest
+from yt_fts.db_utils import add_videos_bulk
+from yt_fts.search import SearchHandler
+from testing_utils import make_synthetic_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_synthetic_video("a", 3, channel_id="UC1", text="machine learning"),
+        make_synthetic_video("b", 2, channel_id="UC2", text="deep learning"),
+    ])
+    return db_path
+
+
+def run_batch(handler, queries, threads=1):
+    out = io.StringIO()
+    failed = handler.batch_search(queries, threads, out)
+    return failed, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_one_result_per_query_in_order(db_path, threads):
+    queries = ["learning", "machine", "deep", "nothing"] * 5
+    failed, results = run_batch(SearchHandler(scope="all", limit=10), queries, threads)
+
+    assert failed == 0
+    assert [result["query"] for result in results] == queries
+    assert [result["matches"] for result in results[:4]] == [5, 3, 2, 0]
+    assert all(result["ms"] >= 0 for result in results)
+
+    hit = results[2]["hits"][0]
+    assert (hit["channel_name"], hit["video_title"], hit["quote"]) == ("two", "title b", "deep learning 0")
+
+
+def test_options_apply_to_every_query(db_path):
+    _, results = run_batch(SearchHandler(scope="channel", channel="one", limit=2), ["learning", "deep"])
+    assert [result["matches"] for result in results] == [2, 0]
+
+    _, results = run_batch(SearchHandler(scope="all", limit=10, substring=True), ["earn"])
+    assert results[0]["matches"] == 5
+
+
+def test_failed_queries_do_not_stop_the_batch(db_path, capsys):
+    failed, results = run_batch(SearchHandler(scope="all", limit=10), ["AND", "learning", "x" * 41])
+
+    assert failed == 2
+    assert results[0]["error"] == "search failed"
+    assert results[1]["matches"] == 5
+    assert "error" in results[2]
+
+    # the error of the search goes to stderr, stdout only carries the results
+    captured = capsys.readouterr()
+    assert "syntax error" in captured.err
+    assert captured.out == ""
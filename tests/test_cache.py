@@ -0,0 +1,81 @@
+import json
+import os
+from contextlib import closing
+
+import pytest
+from yt_fts import cache
+from yt_fts.cache import get_cache_path
+from yt_fts.connection import get_data_version
+from yt_fts.db_utils import add_videos_bulk, delete_channel
+from yt_fts.search import SearchHandler
+from testing_utils import make_synthetic_video as make_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([make_video("a", 20, channel_id="UC1", text="machine learning")])
+    return db_path
+
+
+def search(query, limit=10, **kwargs):
+    handler = SearchHandler(limit=limit, **kwargs)
+    handler.query = query
+    return list(handler.search_hits())
+
+
+def test_repeat_search_is_served_from_cache(db_path, monkeypatch):
+    first = search("learning")
+    assert os.path.exists(get_cache_path())
+
+    # a second run must not touch the index
+    monkeypatch.setattr(SearchHandler, "run_search", lambda self, limit, offset: pytest.fail("cache miss"))
+    assert search("learning") == first
+
+
+def test_cache_key_covers_scope_and_page(db_path):
+    assert len(search("learning", limit=5)) == 5
+    assert len(search("learning", limit=5, page=4)) == 5
+    assert len(search("learning", limit=5, page=5)) == 0
+    assert search("learning", scope="video", video_id="a", limit=3)[0].start_ms == 0
+
+
+def test_ingest_and_delete_invalidate_the_cache(db_path):
+    version = get_data_version()
+    assert len(search("learning", limit=50)) == 20
+
+    add_videos_bulk([make_video("b", 5, channel_id="UC1", text="machine learning")])
+    assert get_data_version() > version
+    assert len(search("learning", limit=50)) == 25
+
+    delete_channel("UC1")
+    assert search("learning", limit=50) == []
+
+
+def cached_queries():
+    with closing(cache._connect_cache()) as conn:
+        return {json.loads(row[0])[1]: row[1] for row in conn.execute("SELECT key, size FROM SearchCache")}
+
+
+def test_least_recently_used_pages_are_evicted(db_path, monkeypatch):
+    search("machine")
+    search("learning")
+    search("machine")
+    sizes = cached_queries()
+
+    # room for two pages, the page read least recently goes first
+    cap = sizes['"machine"'] + sizes['"learning"'] + min(sizes.values()) // 2
+    monkeypatch.setattr(cache, "get_cache_size", lambda: cap / 1024 ** 2)
+    search("machine learning")
+
+    assert set(cached_queries()) == {'"machine"', '"machine" "learning"'}
+
+
+def test_no_cache_runs_the_search(db_path, monkeypatch):
+    search("learning")
+
+    calls = []
+    run_search = SearchHandler.run_search
+    monkeypatch.setattr(SearchHandler, "run_search",
+                        lambda self, limit, offset: calls.append(offset) or run_search(self, limit, offset))
+    search("learning", cache=False)
+    assert calls == [0]
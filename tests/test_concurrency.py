@@ -0,0 +1,53 @@
+import multiprocessing
+import time
+import pytest
+from yt_fts.connection import set_db_path, get_read_connection, writer_lock
+from yt_fts.db_utils import add_videos_bulk, search_all
+from testing_utils import make_synthetic_video
+
+
+def ingest_worker(db_path, num_batches):
+    set_db_path(db_path)
+    for batch in range(num_batches):
+        add_videos_bulk([make_synthetic_video(f"{batch}-{i}", 200) for i in range(5)])
+
+
+def search_worker(db_path, deadline):
+    set_db_path(db_path)
+    while time.time() < deadline:
+        # search_all exits the process with status 1 on "database is locked"
+        list(search_all("cue", 50))
+
+
+def test_searches_run_during_ingest(db_path):
+    ctx = multiprocessing.get_context("spawn")
+    deadline = time.time() + 3
+
+    writer = ctx.Process(target=ingest_worker, args=(db_path, 40))
+    readers = [ctx.Process(target=search_worker, args=(db_path, deadline)) for _ in range(4)]
+
+    for process in [writer] + readers:
+        process.start()
+    for process in [writer] + readers:
+        process.join(60)
+
+    assert writer.exitcode == 0
+    assert [reader.exitcode for reader in readers] == [0, 0, 0, 0]
+
+    conn = get_read_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("SELECT COUNT(*) FROM Subtitles").fetchone()[0] == 40 * 5 * 200
+
+
+def test_writer_lock_is_exclusive(db_path):
+    with writer_lock() as first:
+        with writer_lock() as second:
+            assert first
+            assert not second
+
+    with writer_lock() as again:
+        assert again
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
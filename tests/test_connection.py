@@ -0,0 +1,38 @@
+import threading
+import pytest
+from yt_fts.connection import (
+    get_read_connection,
+    get_write_connection,
+    write_transaction,
+)
+from yt_fts.db_utils import add_channel_info, get_channels
+
+
+def test_read_connection_is_reused(db_path):
+    assert get_read_connection() is get_read_connection()
+
+
+def test_read_connection_is_thread_local(db_path):
+    conns = []
+    thread = threading.Thread(target=lambda: conns.append(get_read_connection()))
+    thread.start()
+    thread.join()
+
+    assert conns[0] is not get_read_connection()
+    assert conns[0] is not get_write_connection()
+
+
+def test_nested_write_transaction_rolls_back_together(db_path):
+    with pytest.raises(RuntimeError):
+        with write_transaction():
+            add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+            raise RuntimeError("abort")
+
+    assert len(get_channels()) == 2
+
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    assert len(get_channels()) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,62 @@
+import pytest
+from yt_fts.connection import set_db_path, get_read_connection, write_transaction
+from yt_fts.db_utils import add_videos_bulk, search_video, get_subs_by_time_range
+from yt_fts.fts import deferred_fts, drop_fts_triggers, fts_triggers_missing
+from testing_utils import make_synthetic_video as make_video
+
+
+def test_bulk_ingest_skips_existing_videos(db_path):
+    stats = add_videos_bulk([make_video("a", 3), make_video("b", 2)], batch_size=1)
+    assert stats["videos"] == 2
+    assert stats["subtitles"] == 5
+
+    stats = add_videos_bulk([make_video("a", 3), make_video("c", 4), make_video("c", 4)])
+    assert stats["videos"] == 1
+    assert stats["skipped_videos"] == 2
+    assert stats["subtitles"] == 4
+
+    conn = get_read_connection()
+    assert conn.execute("SELECT COUNT(*) FROM Subtitles").fetchone()[0] == 9
+    assert conn.execute("SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH 'cue'").fetchone()[0] == 9
+
+
+
+def count_matches(query):
+    conn = get_read_connection()
+    return conn.execute("SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH ?", [query]).fetchone()[0]
+
+
+def test_deferred_fts_rebuilds_index(db_path):
+    with deferred_fts():
+        add_videos_bulk([make_video("a", 3)])
+        assert count_matches("cue") == 0
+
+    assert count_matches("cue") == 3
+    assert not fts_triggers_missing(get_read_connection())
+
+
+def test_interrupted_deferred_load_recovers_on_startup(db_path):
+    with write_transaction() as conn:
+        drop_fts_triggers(conn)
+    add_videos_bulk([make_video("a", 3)])
+    assert count_matches("cue") == 0
+
+    set_db_path(db_path)
+
+    assert count_matches("cue") == 3
+    assert not fts_triggers_missing(get_read_connection())
+
+
+
+def test_time_window_queries(db_path):
+    add_videos_bulk([make_video("a", 30)])
+
+    window = get_subs_by_time_range("a", 10_000, 13_000)
+    assert [row[1] for row in window] == [10_000, 11_000, 12_000]
+
+    hits = search_video("a", "cue", start_ms=20_000, stop_ms=25_000)
+    assert [hit.start_ms for hit in hits] == [20_000, 21_000, 22_000, 23_000, 24_000]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
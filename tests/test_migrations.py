@@ -0,0 +1,68 @@
+import sqlite3
+import pytest
+from yt_fts.connection import set_db_path, get_read_connection
+from yt_fts.db_utils import make_db
+from yt_fts.migrations import SCHEMA_VERSION, get_schema_version
+
+
+def get_indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_new_db_is_at_latest_version(tmp_path):
+    db_path = str(tmp_path / "subtitles.db")
+    make_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    assert get_schema_version(conn) == SCHEMA_VERSION
+    assert {"idx_subtitles_video_start", "idx_videos_channel_id"} <= get_indexes(conn)
+
+
+def test_old_db_is_upgraded_on_startup(tmp_path, capsys):
+    db_path = str(tmp_path / "subtitles.db")
+    make_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX idx_subtitles_video_start")
+    conn.execute("DROP INDEX idx_videos_channel_id")
+    conn.execute("PRAGMA user_version = 0")
+    conn.close()
+
+    set_db_path(db_path)
+    try:
+        conn = get_read_connection()
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        assert {"idx_subtitles_video_start", "idx_videos_channel_id"} <= get_indexes(conn)
+    finally:
+        set_db_path(None)
+
+    # the first command after an upgrade may be streaming csv or JSON to stdout
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert f"upgraded database schema to version {SCHEMA_VERSION}" in captured.err
+
+
+
+def test_time_columns_are_backfilled(tmp_path):
+    db_path = str(tmp_path / "subtitles.db")
+    make_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO Channels VALUES ('UC1', 'channel', '')")
+    conn.execute("INSERT INTO Videos VALUES ('a', 'title', '', 'UC1', '2024-01-01')")
+    conn.execute("INSERT INTO Subtitles (video_id, start_time, stop_time, text) "
+                 "VALUES ('a', '01:02:03.450', '01:02:05.000', 'hello there')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+
+    set_db_path(db_path)
+    try:
+        conn = get_read_connection()
+        assert conn.execute("SELECT start_ms, stop_ms FROM Subtitles").fetchone() == (3723450, 3725000)
+        assert conn.execute("SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH 'hello'").fetchone()[0] == 1
+    finally:
+        set_db_path(None)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
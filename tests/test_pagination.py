@@ -0,0 +1,97 @@
+import pytest
+from yt_fts.db_utils import (
+    add_channel_info,
+    add_videos_bulk,
+    parse_search_cursor,
+    search_all,
+    search_channel,
+    search_video
+)
+from yt_fts.maintenance import change_layout
+from yt_fts.search import SearchHandler
+from testing_utils import make_synthetic_video as make_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_video("a", 30, channel_id="UC1", text="machine learning"),
+        make_video("b", 20, channel_id="UC2", text="deep learning machine learning"),
+        make_video("c", 10, channel_id="UC2", text="learning"),
+    ])
+    return db_path
+
+
+def walk_pages(search, page_size, key):
+    """
+    Follows the cursor of every page until the search runs dry
+    """
+    hits = []
+    after = None
+    while True:
+        page = list(search(limit=page_size, after=after))
+        hits += page
+        if len(page) < page_size:
+            return hits
+        after = (key(page[-1]), page[-1].rowid)
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_keyset_pages_cover_every_hit_once(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+
+    everything = list(search_all("learning"))
+    assert len(everything) == 60
+
+    paged = walk_pages(lambda **kwargs: search_all("learning", **kwargs), 7, lambda hit: hit.rank)
+    assert paged == everything
+
+    paged = walk_pages(lambda **kwargs: search_channel("UC2", "learning", **kwargs), 7, lambda hit: hit.rank)
+    assert paged == list(search_channel("UC2", "learning"))
+    assert len(paged) == 30
+
+
+def test_video_pages_follow_time(db_path):
+    paged = walk_pages(lambda **kwargs: search_video("a", "machine", **kwargs), 4, lambda hit: hit.start_ms)
+    assert [hit.start_ms for hit in paged] == [i * 1000 for i in range(30)]
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_offset_pages_match_keyset_pages(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+
+    everything = list(search_all("learning"))
+    assert list(search_all("learning", limit=10, offset=20)) == everything[20:30]
+
+
+def test_search_is_lazy(db_path):
+    hits = search_all("learning")
+    assert not isinstance(hits, list)
+    assert next(hits).video_id == "b"
+
+
+def test_pages_of_shards_keep_tied_hits(db_path):
+    change_layout("sharded")
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    add_channel_info("UC4", "four", "https://youtube.com/channel/UC4")
+    # new shards number their cues from 1, the same text ties on (rank, rowid)
+    add_videos_bulk([
+        make_video("x", 3, channel_id="UC3", text="tied words"),
+        make_video("y", 3, channel_id="UC4", text="tied words"),
+    ])
+    everything = list(search_all("tied"))
+    assert len({(hit.rank, hit.rowid) for hit in everything}) == 3
+
+    handler = SearchHandler(limit=1)
+    paged = []
+    after = None
+    while True:
+        page = list(search_all("tied", limit=1, after=after))
+        paged += page
+        if not page:
+            break
+        after = parse_search_cursor(handler.next_page_cursor(page[-1]))
+
+    assert paged == everything
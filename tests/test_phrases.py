@@ -0,0 +1,98 @@
+import pytest
+from yt_fts.connection import get_subtitle_connection
+from yt_fts.db_utils import add_channel_info, add_videos_bulk, delete_channel, search_phrase
+from yt_fts.fts import build_window_index, deferred_fts, drop_window_index, fts_triggers_missing, set_index_profile
+from yt_fts.maintenance import change_layout
+from testing_utils import make_synthetic_video
+
+
+def make_video(video_id, texts, channel_id="UC1"):
+    video, subs = make_synthetic_video(video_id, len(texts), channel_id=channel_id)
+    for sub, text in zip(subs, texts):
+        sub["text"] = text
+    return video, subs
+
+
+LECTURE = ["we trained a machine", "learning model today", "and the machine learning model", "was better"]
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_video("a", LECTURE, channel_id="UC1"),
+        make_video("b", ["machine", "learning", "model"], channel_id="UC2"),
+    ])
+    return db_path
+
+
+def starts(hits):
+    return sorted((hit.video_id, hit.start_ms) for hit in hits)
+
+
+def test_without_the_index_phrases_stay_inside_cues(db_path):
+    assert starts(search_phrase("machine learning model")) == [("a", 2000)]
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_phrases_match_across_cues(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+    build_window_index(2)
+
+    # every occurrence once, at the cue it starts in
+    assert starts(search_phrase("machine learning model")) == [("a", 0), ("a", 2000)]
+    assert starts(search_phrase("machine learning model", channel_id="UC1")) == [("a", 0), ("a", 2000)]
+    assert starts(search_phrase("machine learning model", video_id="a", start_ms=1000)) == [("a", 2000)]
+
+    hit = next(search_phrase("machine learning model", video_id="a"))
+    assert hit.rowid == get_subtitle_connection("UC1").execute(
+        "SELECT subtitle_id FROM Subtitles WHERE video_id = 'a' AND start_ms = 0").fetchone()[0]
+    assert hit.start_time == "00:00:00.000"
+    assert hit.text == "we trained a machine learning model today"
+    assert hit.highlighted == "we trained a \x02machine learning model\x03 today"
+
+    # b spreads the phrase over three cues
+    build_window_index(3)
+    assert starts(search_phrase("machine learning model")) == [("a", 0), ("a", 2000), ("b", 0)]
+
+
+def test_near_matches_words_in_any_order(db_path):
+    build_window_index(2)
+
+    assert starts(search_phrase("model trained", near=3)) == [("a", 0)]
+    assert starts(search_phrase("model trained", near=2)) == []
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_window_index_follows_ingest_and_delete(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+    build_window_index(2)
+
+    add_videos_bulk([make_video("c", ["a machine", "learning model"], channel_id="UC2")])
+    with deferred_fts():
+        add_videos_bulk([make_video("d", ["one machine", "learning model"], channel_id="UC2")])
+
+    assert not fts_triggers_missing(get_subtitle_connection("UC2"))
+    assert starts(search_phrase("machine learning model", channel_id="UC2")) == [("c", 0), ("d", 0)]
+
+    delete_channel("UC1")
+    assert starts(search_phrase("machine learning model")) == [("c", 0), ("d", 0)]
+
+
+def test_window_index_follows_layout_and_profile(db_path):
+    build_window_index(2)
+    change_layout("sharded")
+
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    add_videos_bulk([make_video("c", ["machine", "learning models"], channel_id="UC3")])
+    assert starts(search_phrase("machine learning model")) == [("a", 0), ("a", 2000)]
+
+    set_index_profile("stemmed")
+    assert starts(search_phrase("machine learning model")) == [("a", 0), ("a", 2000), ("c", 0)]
+
+    change_layout("single")
+    assert starts(search_phrase("machine learning model")) == [("a", 0), ("a", 2000), ("c", 0)]
+
+    drop_window_index()
+    assert starts(search_phrase("machine learning model")) == [("a", 2000)]
@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+import pytest
+from click.testing import CliRunner
+from yt_fts import profiling
+from yt_fts.connection import set_db_path
+from yt_fts.db_utils import make_db, add_channel_info, add_videos_bulk
+from yt_fts.profiling import PhaseEvent, phase, phase_summary, start_profiling, finish_profiling
+from yt_fts.yt_fts import cli
+from testing_utils import make_synthetic_video
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    config_path = tmp_path / ".config" / "yt-fts"
+    os.makedirs(config_path)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("YT_FTS_NO_SERVER", "1")
+    monkeypatch.delenv("YT_FTS_TRACE", raising=False)
+
+    path = str(config_path / "subtitles.db")
+    make_db(path)
+    set_db_path(path)
+    add_channel_info("UC1", "one", "https://youtube.com/channel/UC1")
+    add_videos_bulk([make_synthetic_video("a", 3, channel_id="UC1", text="machine learning")])
+    yield tmp_path
+    set_db_path(None)
+
+
+def test_phases_are_not_recorded_unless_profiling():
+    with phase("search.query"):
+        pass
+    assert not profiling.profiling_enabled()
+    assert profiling._events == []
+
+
+def test_self_time_excludes_nested_phases():
+    events = [
+        PhaseEvent("download.vtt_to_db", "MainThread", 0.0, 10.0),
+        PhaseEvent("download.parse", "MainThread", 1.0, 2.0),
+        PhaseEvent("db.insert", "MainThread", 4.0, 3.0),
+        PhaseEvent("download.parse", "MainThread", 7.5, 1.0),
+        # same time on another thread is not nested
+        PhaseEvent("download.fetch", "worker", 1.0, 5.0),
+    ]
+    summary = phase_summary(events)
+
+    assert list(summary) == ["download.vtt_to_db", "download.parse", "download.fetch", "db.insert"]
+    assert summary["download.vtt_to_db"] == {"calls": 1, "total": 10.0, "self": 4.0}
+    assert summary["download.parse"] == {"calls": 2, "total": 3.0, "self": 3.0}
+    assert summary["download.fetch"]["self"] == 5.0
+
+
+def test_dump_writes_pstats_and_trace(tmp_path, capsys):
+    start_profiling(str(tmp_path))
+    with phase("download.vtt_to_db"):
+        with phase("db.insert"):
+            pass
+
+    def fetch():
+        with phase("download.fetch"):
+            pass
+
+    fetch()
+    worker = threading.Thread(target=fetch, name="worker")
+    worker.start()
+    worker.join()
+    finish_profiling("download")
+
+    assert "download.vtt_to_db" in capsys.readouterr().err
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2
+    assert files[0].startswith("yt-fts-download-") and files[0].endswith(".pstats")
+    assert files[1].endswith(".trace.json")
+
+    with open(tmp_path / files[1]) as f:
+        trace = json.load(f)["traceEvents"]
+    spans = [event for event in trace if event["ph"] == "X"]
+    assert [span["name"] for span in spans] == ["db.insert", "download.vtt_to_db", "download.fetch", "download.fetch"]
+    assert all(span["dur"] >= 0 and span["ts"] >= 0 for span in spans)
+    assert spans[2]["tid"] != spans[3]["tid"]
+    assert [event["args"]["name"] for event in trace if event["ph"] == "M"] == ["MainThread", "worker"]
+
+
+def test_profile_flag_prints_the_breakdown(home):
+    result = CliRunner(mix_stderr=False).invoke(cli, ["--profile", "search", "learning"])
+
+    assert result.exit_code == 0
+    assert "Found 3 matches" in result.stdout
+    for name in ("search.query", "search.render"):
+        assert name in result.stderr
+    assert not profiling.profiling_enabled()
+
+
+def test_trace_variable_writes_profile_files(home, monkeypatch):
+    trace_dir = home / "profiles"
+    monkeypatch.setenv("YT_FTS_TRACE", str(trace_dir))
+
+    # the breakdown of a failed search is printed too
+    result = CliRunner(mix_stderr=False).invoke(cli, ["search", "nothingmatches"])
+
+    assert result.exit_code == 1
+    assert "search.query" in result.stderr
+    assert len(os.listdir(trace_dir)) == 2
@@ -0,0 +1,84 @@
+import datetime
+
+import pytest
+from yt_fts.connection import get_data_version
+from yt_fts.db_utils import add_videos_bulk, search_all, search_channel
+from yt_fts.maintenance import change_layout
+from yt_fts.ranking import BM25_SQL, get_score_sql, set_channel_boost, set_ranking_weight
+from testing_utils import make_synthetic_video as make_video
+
+
+def dated_video(video_id, video_date, channel_id="UC1", text="machine learning"):
+    video, subs = make_video(video_id, 1, channel_id=channel_id, text=text)
+    video["video_date"] = video_date
+    return video, subs
+
+
+def test_recent_videos_rank_first(db_path):
+    today = datetime.date.today()
+    add_videos_bulk([
+        dated_video("old", "2001-01-01"),
+        # old databases store dates as YYYYMMDD
+        dated_video("new", today.strftime("%Y%m%d")),
+    ])
+
+    # boosts are opt in, by default bm25 alone ranks
+    assert get_score_sql() == BM25_SQL
+    ranks = [hit.rank for hit in search_all("learning")]
+    assert ranks[0] == ranks[1]
+
+    set_ranking_weight("recency", 0.5)
+    assert [hit.video_id for hit in search_all("learning")] == ["new", "old"]
+
+
+def test_short_cues_are_penalized(db_path):
+    add_videos_bulk([
+        dated_video("short", "2024-01-01", text="learning"),
+        dated_video("long", "2024-01-01", text="what they were learning about in the lecture"),
+    ])
+
+    # bm25 alone prefers the short cue
+    set_ranking_weight("length", 0)
+    assert next(search_all("learning")).video_id == "short"
+
+    set_ranking_weight("length", 1)
+    assert next(search_all("learning")).video_id == "long"
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_channel_boost(db_path, layout):
+    add_videos_bulk([
+        dated_video("a", "2024-01-01", channel_id="UC1"),
+        dated_video("b", "2024-01-01", channel_id="UC2"),
+    ])
+    if layout == "sharded":
+        change_layout("sharded")
+
+    version = get_data_version()
+    set_channel_boost("UC2", 2)
+    assert get_data_version() > version
+    assert [hit.video_id for hit in search_all("learning")] == ["b", "a"]
+
+    set_channel_boost("UC2", 0.5)
+    set_channel_boost("UC1", 1)
+    assert [hit.video_id for hit in search_all("learning")] == ["a", "b"]
+    assert [hit.video_id for hit in search_channel("UC2", "learning")] == ["b"]
+
+
+def test_ranked_pages_follow_the_cursor(db_path):
+    add_videos_bulk([dated_video(f"v{i}", f"20{10 + i}-01-01") for i in range(10)])
+    set_ranking_weight("recency", 0.5)
+    set_channel_boost("UC1", 3)
+
+    everything = list(search_all("learning"))
+    pages = []
+    after = None
+    while True:
+        page = list(search_all("learning", limit=3, after=after))
+        pages += page
+        if len(page) < 3:
+            break
+        after = (page[-1].rank, page[-1].rowid)
+
+    assert pages == everything
+    assert [hit.video_id for hit in everything] == [f"v{i}" for i in reversed(range(10))]
@@ -0,0 +1,143 @@
+import json
+import os
+from click.testing import CliRunner
+from yt_fts.connection import set_db_path, get_read_connection
+from yt_fts.db_utils import make_db, add_run
+from yt_fts.download import download_handler as download_module
+from yt_fts.download.download_handler import DownloadHandler
+from yt_fts.download.metrics import RunMetrics, histogram
+from yt_fts.yt_fts import cli
+
+
+class FakeYoutubeDL:
+    """
+    Answers per video id like YoutubeDL: "ok", "none" for no subtitles,
+    or an error message raised once per entry of the list
+    """
+    script: dict[str, list[str]] = {}
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def extract_info(self, url, download=False):
+        outcome = self.script[url.split("=")[-1]].pop(0)
+        if outcome == "none":
+            return {"subtitles": {}, "automatic_captions": {}}
+        if outcome != "ok":
+            raise Exception(outcome)
+        return {"subtitles": {"en": []}, "automatic_captions": {}}
+
+    def download(self, urls):
+        for hook in self.opts["progress_hooks"]:
+            hook({"status": "finished", "filename": "video.en.vtt", "downloaded_bytes": 1000})
+
+
+def test_histogram_buckets_and_percentiles():
+    result = histogram([0.005, 0.02, 0.02, 0.3, 90.0])
+
+    assert result["count"] == 5
+    assert result["buckets"]["10"] == 1
+    assert result["buckets"]["25"] == 2
+    assert result["buckets"]["500"] == 1
+    assert result["buckets"]["+Inf"] == 1
+    assert result["p50"] == 20.0
+    assert result["max"] == 90000.0
+    assert result["p90"] == 90000.0
+
+    empty = histogram([])
+    assert empty["count"] == 0 and "p50" not in empty
+    assert set(empty["buckets"].values()) == {0}
+
+
+def test_get_vtt_counts_outcomes(monkeypatch):
+    monkeypatch.setattr(download_module.yt_dlp, "YoutubeDL", FakeYoutubeDL)
+    monkeypatch.setattr(download_module.time, "sleep", lambda seconds: None)
+    FakeYoutubeDL.script = {
+        "a": ["ok"],
+        "b": ["HTTP Error 429: Too Many Requests", "ok"],
+        "c": ["none"],
+        "d": ["HTTP Error 403: Forbidden"] * 3,
+    }
+
+    handler = DownloadHandler(number_of_jobs=2)
+    handler.tmp_dir = "unused"
+    handler.video_ids = ["a", "b", "c", "d"]
+    handler.download_vtts()
+
+    summary = handler.metrics.summary("download")
+    assert summary["attempted"] == 4
+    assert summary["succeeded"] == 2
+    assert summary["no_subtitles"] == 1
+    assert summary["failed"] == 1
+    assert (summary["http_403"], summary["http_429"], summary["other_errors"]) == (3, 1, 0)
+    assert summary["retries"] == 3
+    assert summary["bytes_fetched"] == 2000
+    assert summary["latency_ms"]["fetch"]["count"] == 4
+
+
+def write_video(tmp_dir, video_id, cues):
+    with open(tmp_dir / f"{video_id}.en.vtt", "w") as f:
+        f.write("WEBVTT\n\n")
+        for i in range(cues):
+            f.write(f"00:00:{i:02d}.000 --> 00:00:{i + 1:02d}.000\ncue {i} of {video_id}\n\n")
+    with open(tmp_dir / f"{video_id}.info.json", "w") as f:
+        json.dump({"title": f"title {video_id}", "upload_date": "20240101", "channel_id": "UC1"}, f)
+
+
+def test_vtt_to_db_times_parse_and_insert(db_path, tmp_path):
+    tmp_dir = tmp_path / "vtts"
+    tmp_dir.mkdir()
+    for video_id, cues in [("a", 3), ("b", 2), ("c", 4)]:
+        write_video(tmp_dir, video_id, cues)
+
+    handler = DownloadHandler()
+    handler.tmp_dir = str(tmp_dir)
+    handler.vtt_to_db()
+
+    summary = handler.metrics.summary("update")
+    assert (summary["videos_added"], summary["subtitles_added"]) == (3, 9)
+    assert summary["latency_ms"]["parse"]["count"] == 3
+    assert summary["latency_ms"]["insert"]["count"] == 3
+
+    add_run(summary)
+    conn = get_read_connection()
+    row = conn.execute("SELECT command, videos_added, subtitles_added, metrics FROM Runs").fetchone()
+    assert row[:3] == ("update", 3, 9)
+    assert json.loads(row[3]) == summary
+
+
+def test_metrics_of_an_empty_run(db_path):
+    summary = RunMetrics().summary("update")
+    assert summary["attempted"] == 0
+    assert summary["latency_ms"]["fetch"]["count"] == 0
+
+    add_run(summary)
+    add_run(summary)
+    assert get_read_connection().execute("SELECT COUNT(*) FROM Runs").fetchone()[0] == 2
+
+
+def test_failed_update_still_reports(tmp_path, monkeypatch):
+    config_path = tmp_path / ".config" / "yt-fts"
+    os.makedirs(config_path)
+    make_db(str(config_path / "subtitles.db"))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    metrics_path = tmp_path / "metrics.json"
+
+    result = CliRunner().invoke(cli, ["update", "-c", "missing", "--metrics", str(metrics_path), "--log-run"])
+
+    assert result.exit_code == 1
+    with open(metrics_path) as f:
+        summary = json.load(f)
+    assert (summary["command"], summary["attempted"]) == ("update", 0)
+
+    set_db_path(str(config_path / "subtitles.db"))
+    try:
+        assert get_read_connection().execute("SELECT command FROM Runs").fetchall() == [("update",)]
+    finally:
+        set_db_path(None)
@@ -0,0 +1,95 @@
+import csv
+import os
+import pytest
+from click.testing import CliRunner
+from yt_fts.db_utils import make_db, add_videos_bulk, search_all, search_channel, search_video
+from yt_fts.maintenance import change_layout
+from yt_fts.search import SearchHandler, highlight_markup
+from yt_fts.yt_fts import cli
+from testing_utils import make_synthetic_video as make_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([make_video("a", 3, channel_id="UC1", text="machine learning")])
+    return db_path
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_hits_carry_video_and_channel(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+
+    for hits in [search_all("learning"), search_channel("UC1", "learning"), search_video("a", "learning")]:
+        hit = next(hits)
+        assert (hit.video_title, hit.video_date, hit.channel_name) == ("title a", "2024-01-01", "one")
+
+
+def test_every_quote_of_a_video_is_printed(db_path, capsys):
+    SearchHandler(scope="all", limit=10).full_text_search("learning")
+
+    out = capsys.readouterr().out
+    assert "Found 3 matches in 1 videos from 1 channel" in out
+    for i in range(3):
+        assert f"00:00:0{i}.000" in out
+
+
+def test_next_page_hint(db_path, capsys):
+    SearchHandler(scope="all", limit=1).full_text_search("learning")
+    assert "or --page 2" in capsys.readouterr().out
+
+    first = next(search_all("learning"))
+    SearchHandler(scope="all", limit=1, after=(first.rank, first.rowid)).full_text_search("learning")
+    out = capsys.readouterr().out
+    assert "Next page: --after" in out
+    assert "--page" not in out
+
+
+def test_export_writes_every_match_and_prints_the_page(db_path, tmp_path, monkeypatch, capsys):
+    add_videos_bulk([make_video("b", 2, channel_id="UC1", text="deep learning")])
+    monkeypatch.chdir(tmp_path)
+
+    SearchHandler(scope="channel", channel="one", limit=2, export=True).full_text_search("learning")
+
+    out = capsys.readouterr().out
+    assert "Found 2 matches" in out
+    assert "5 matches found" in out
+
+    [file_name] = tmp_path.glob("channel_UC1_*.csv")
+    with open(file_name, newline="") as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 6
+    assert {row[1] for row in rows[1:]} == {"title a", "title b"}
+
+    # the export follows the kind of search
+    SearchHandler(scope="channel", channel="one", export=True, substring=True).full_text_search("earn")
+    assert "5 matches found" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("args", [["--page", "2"], ["--after", "-1.0:5"]])
+def test_export_rejects_pages(tmp_path, monkeypatch, args):
+    os.makedirs(tmp_path / ".config" / "yt-fts")
+    make_db(str(tmp_path / ".config" / "yt-fts" / "subtitles.db"))
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+    result = CliRunner().invoke(cli, ["search", "learning", "--export"] + args)
+
+    assert result.exit_code == 1
+    assert "cannot be combined with --page or --after" in result.output
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_matches_are_highlighted_by_the_index(db_path, layout):
+    add_videos_bulk([make_video("b", 1, channel_id="UC1", text="[music] Learning, learned")])
+    if layout == "sharded":
+        change_layout("sharded")
+
+    # prefix and punctuated matches that splitting on spaces missed
+    for hits in [search_all("learn*"), search_channel("UC1", "learn*"), search_video("b", "learn*")]:
+        hit = next(hit for hit in hits if hit.video_id == "b")
+        assert hit.highlighted == "[music] \x02Learning\x03, \x02learned\x03 0"
+
+
+def test_highlight_markup_escapes_the_text():
+    markup = highlight_markup("[music] \x02Learning\x03")
+    assert markup == "\\[music] [bold][bright_magenta]Learning[/bright_magenta][/bold]"
@@ -0,0 +1,110 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from yt_fts.client import ServerClient, ServerError, find_server, get_server_file
+from yt_fts.db_utils import add_videos_bulk, search_all
+from yt_fts.search import SearchHandler
+from yt_fts.server import make_server
+from testing_utils import make_synthetic_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_synthetic_video("a", 3, channel_id="UC1", text="machine learning"),
+        make_synthetic_video("b", 2, channel_id="UC2", text="deep learning"),
+    ])
+    return db_path
+
+
+@pytest.fixture
+def client(db_path, tmp_path):
+    server, address = make_server(socket_path=str(tmp_path / "yt-fts.sock"), workers=4)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield ServerClient(address)
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def search_options(**options):
+    handler = SearchHandler(**options)
+    return handler.search_options()
+
+
+def test_search_matches_the_local_search(client):
+    hits = list(client.search("learning", search_options(scope="all", limit=10)))
+    assert hits == list(search_all("learning", limit=10))
+
+    hits = list(client.search("learning", search_options(scope="channel", channel="two", limit=10)))
+    assert [hit.video_id for hit in hits] == ["b", "b"]
+
+    hits = list(client.search("earn", search_options(scope="all", limit=2, substring=True)))
+    assert len(hits) == 2
+
+
+def test_concurrent_requests(client):
+    with ThreadPoolExecutor(8) as pool:
+        counts = list(pool.map(lambda query: len(list(client.search(query, search_options(scope="all", limit=10)))),
+                               ["learning", "machine", "deep"] * 10))
+    assert counts == [5, 3, 2] * 10
+
+
+def test_list_and_transcript(client):
+    assert client.channels() == [(1, "one", 1, "UC1"), (2, "two", 1, "UC2")]
+    assert client.videos("one") == [("a", "title a")]
+
+    title, cues = client.transcript("a")
+    assert title == "title a"
+    assert [cue[2] for cue in cues] == ["machine learning 0", "machine learning 1", "machine learning 2"]
+
+    with pytest.raises(ServerError, match="no transcript"):
+        client.transcript("missing")
+
+
+def test_errors_reach_the_client(client):
+    with pytest.raises(ServerError, match="syntax error"):
+        list(client.search("AND", search_options(scope="all", limit=10)))
+
+    # the server keeps answering
+    assert client.alive()
+
+
+def test_writes_of_other_processes_are_seen(client):
+    assert len(list(client.search("quantum", search_options(scope="all", limit=10)))) == 0
+
+    add_videos_bulk([make_synthetic_video("c", 2, channel_id="UC1", text="quantum computing")])
+    assert len(list(client.search("quantum", search_options(scope="all", limit=10)))) == 2
+
+
+def test_find_server(client, db_path, monkeypatch):
+    assert find_server() is None
+
+    with open(get_server_file(), "w") as f:
+        json.dump({"address": client.address, "pid": 0}, f)
+    assert find_server().address == client.address
+
+    monkeypatch.setenv("YT_FTS_NO_SERVER", "1")
+    assert find_server() is None
+
+
+def test_search_handler_forwards_to_the_server(client, capsys):
+    SearchHandler(scope="all", limit=10).full_text_search("learning")
+    local = capsys.readouterr().out
+
+    SearchHandler(scope="all", limit=10, server=client).full_text_search("learning")
+    assert capsys.readouterr().out == local
+
+
+@pytest.mark.parametrize("host", ["0.0.0.0", "192.168.1.10", "::", "example.com"])
+def test_only_loopback_hosts(db_path, host):
+    with pytest.raises(ValueError):
+        make_server(host=host, port=0)
+
+
+def test_tcp_port_on_loopback(db_path):
+    server, address = make_server(host="localhost", port=0)
+    server.server_close()
+    assert address.startswith("http://localhost:")
@@ -0,0 +1,104 @@
+import os
+import pytest
+from yt_fts.connection import (
+    get_read_connection,
+    get_shard_path,
+    get_shard_ids,
+    get_subtitle_connection,
+    is_sharded
+)
+from yt_fts.db_utils import (
+    add_channel_info,
+    add_videos_bulk,
+    delete_channel,
+    search_all,
+    search_channel,
+    search_video,
+    get_subs_by_time_range
+)
+from yt_fts.fts import deferred_fts, fts_triggers_missing
+from yt_fts.maintenance import change_layout
+from testing_utils import make_synthetic_video as make_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_video("a", 5, channel_id="UC1", text="machine learning"),
+        make_video("b", 3, channel_id="UC2", text="machine learning"),
+        make_video("c", 4, channel_id="UC2", text="deep learning machine learning"),
+    ])
+    return db_path
+
+
+def catalog_tables():
+    return {row[0] for row in get_read_connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_sharding_keeps_search_results(db_path):
+    before = sorted((quote.video_id, quote.start_time) for quote in search_all("learning"))
+
+    change_layout("sharded")
+
+    assert is_sharded()
+    assert sorted(get_shard_ids()) == ["UC1", "UC2"]
+    assert "Subtitles" not in catalog_tables()
+    assert sorted((quote.video_id, quote.start_time) for quote in search_all("learning")) == before
+
+    assert {quote.video_id for quote in search_channel("UC2", "learning")} == {"b", "c"}
+    assert len(list(search_video("a", "machine"))) == 5
+    assert len(get_subs_by_time_range("c", 1000, 3000)) == 2
+
+
+def test_search_all_merges_shards_by_rank(db_path):
+    change_layout("sharded")
+
+    res = list(search_all("learning", limit=6))
+    assert len(res) == 6
+    assert [quote.rank for quote in res] == sorted(quote.rank for quote in res)
+    # "deep learning machine learning" matches twice and ranks first
+    assert res[0].video_id == "c"
+
+
+def test_ingest_and_delete_in_sharded_layout(db_path):
+    change_layout("sharded")
+
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    with deferred_fts():
+        stats = add_videos_bulk([make_video("d", 2, channel_id="UC3"), make_video("e", 2, channel_id="UC1")])
+    assert stats["videos"] == 2
+
+    assert os.path.exists(get_shard_path("UC3"))
+    assert len(list(search_channel("UC3", "cue"))) == 2
+    assert len(list(search_channel("UC1", "cue"))) == 2
+
+    delete_channel("UC3")
+    assert not os.path.exists(get_shard_path("UC3"))
+    assert len(list(search_all("cue"))) == 2
+
+
+def test_merging_shards_restores_single_database(db_path):
+    change_layout("sharded")
+    add_videos_bulk([make_video("d", 2, channel_id="UC1")])
+
+    change_layout("single")
+
+    assert not is_sharded()
+    assert "Subtitles" in catalog_tables()
+    assert not os.path.exists(get_shard_path("UC1"))
+    assert len(list(search_all("learning"))) == 12
+    assert len(list(search_channel("UC1", "cue"))) == 2
+
+
+def test_deferred_load_only_suspends_written_shards(db_path):
+    change_layout("sharded")
+
+    with deferred_fts(["UC1"]):
+        assert fts_triggers_missing(get_subtitle_connection("UC1"))
+        assert not fts_triggers_missing(get_subtitle_connection("UC2"))
+        add_videos_bulk([make_video("d", 2, channel_id="UC1")])
+        # a shard the load was not scoped to still indexes as it goes
+        add_videos_bulk([make_video("e", 2, channel_id="UC2")])
+
+    assert not fts_triggers_missing(get_subtitle_connection("UC1"))
+    assert {quote.video_id for quote in search_all("cue")} == {"d", "e"}
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# total -X importtime of a cold `yt-fts search` against that of the packages it
+# cannot do without, measured in the same run so slow machines scale both.
+# About 1.3 times now and 10 when every command imported its handlers up
+# front, openai or yt_dlp alone would take it over the budget.
+BASELINE_IMPORTS = "import click, rich.console, sqlite3"
+IMPORT_BUDGET = 2
+
+# packages only downloads, embeddings and the chat commands need
+HEAVY_PACKAGES = ["chromadb", "openai", "yt_dlp", "bs4"]
+
+
+@pytest.fixture
+def env(tmp_path):
+    os.makedirs(tmp_path / ".config" / "yt-fts")
+    return dict(os.environ, HOME=str(tmp_path), YT_FTS_NO_SERVER="1")
+
+
+def cold_start(args, env):
+    """
+    Modules imported by a cold run of yt-fts args with their self time in microseconds
+    """
+    return import_times(f"import sys; sys.argv = ['yt-fts'] + {args!r}; from yt_fts.yt_fts import cli; cli()", env)
+
+
+def import_times(code, env):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, _, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = int(self_us)
+    return modules
+
+
+def test_search_does_not_import_heavy_packages(env):
+    modules = cold_start(["search", "police"], env)
+
+    assert "yt_fts.search" in modules
+    for package in HEAVY_PACKAGES:
+        assert package not in modules
+
+
+def test_search_stays_within_the_import_budget(env):
+    cold_start(["list"], env)  # creates the database
+
+    baseline = sum(import_times(BASELINE_IMPORTS, env).values())
+    modules = cold_start(["search", "police"], env)
+    assert sum(modules.values()) < IMPORT_BUDGET * baseline
@@ -0,0 +1,134 @@
+import sqlite3
+import pytest
+from yt_fts.connection import set_db_path, get_data_version, get_read_connection, get_subtitle_connection, write_transaction
+from yt_fts.db_utils import add_channel_info, add_videos_bulk, delete_channel, get_setting
+from yt_fts.fts import build_window_index, set_storage_profile, get_storage_profile, set_index_profile, get_index_profile, fts_triggers_missing
+from yt_fts.maintenance import change_layout
+from yt_fts.migrations import get_schema_version, SCHEMA_VERSION
+from yt_fts.search import SearchHandler
+from testing_utils import make_synthetic_video as make_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([make_video("a", 5, text="machine learning")])
+    return db_path
+
+
+def count_matches(query):
+    conn = get_read_connection()
+    return conn.execute("SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH ?", [query]).fetchone()[0]
+
+
+def get_fts_sql():
+    return get_read_connection().execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'Subtitles_fts'").fetchone()[0]
+
+
+@pytest.mark.parametrize("profile", ["standard", "compact", "minimal"])
+def test_storage_profile_keeps_index_in_sync(db_path, profile):
+    set_storage_profile(profile)
+
+    assert get_storage_profile(get_read_connection()) == profile
+    assert get_setting("storage_profile") == profile
+    assert not fts_triggers_missing(get_read_connection())
+    assert "content=[Subtitles]" in get_fts_sql()
+    assert count_matches("learning") == 5
+
+    add_videos_bulk([make_video("b", 3, text="machine learning")])
+    assert count_matches("learning") == 8
+
+    delete_channel("UC1")
+    assert count_matches("learning") == 0
+
+
+def test_phrases_need_full_detail(db_path):
+    set_storage_profile("compact")
+    assert count_matches('"machine learning"') == 5
+
+    set_storage_profile("minimal")
+    with pytest.raises(sqlite3.OperationalError):
+        count_matches('"machine learning"')
+
+
+@pytest.mark.parametrize("query,options", [
+    ('"machine learning"', {}),
+    ("machine learning", {"phrase": True}),
+    ("machine learning", {"near": 2, "phrase": True}),
+])
+def test_minimal_profile_rejects_phrases(db_path, capsys, query, options):
+    set_storage_profile("minimal")
+    handler = SearchHandler(limit=10, **options)
+    handler.query = query
+
+    with pytest.raises(SystemExit):
+        list(handler.search_hits())
+    assert "minimal storage profile" in capsys.readouterr().err
+
+    handler.query = "machine learning"
+    handler.phrase = handler.near = None
+    assert len(list(handler.search_hits())) == 5
+
+
+def test_minimal_profile_searches_phrases_in_the_phrase_index(db_path):
+    set_storage_profile("minimal")
+    build_window_index(2)
+    handler = SearchHandler(limit=10, phrase=True)
+    handler.query = "machine learning"
+
+    assert len(list(handler.search_hits())) == 5
+
+
+def test_inline_content_index_is_migrated(db_path):
+    with write_transaction() as conn:
+        conn.execute("DROP TABLE Subtitles_fts")
+        conn.execute("CREATE VIRTUAL TABLE Subtitles_fts USING FTS5 (text)")
+        conn.execute("INSERT INTO Subtitles_fts (rowid, text) SELECT rowid, text FROM Subtitles")
+        conn.execute("PRAGMA user_version = 2")
+
+    set_db_path(db_path)
+    assert get_schema_version(get_read_connection()) == SCHEMA_VERSION
+    assert "content=[Subtitles]" in get_fts_sql()
+    assert count_matches("learning") == 5
+
+
+def test_stemmed_profile_matches_word_forms(db_path):
+    add_videos_bulk([make_video("b", 2, text="Nguyễn runs")])
+    assert count_matches("running") == 0
+    assert count_matches("nguyen") == 0
+
+    version = get_data_version()
+    set_index_profile("stemmed")
+    assert get_data_version() > version
+    assert get_index_profile(get_read_connection()) == "stemmed"
+    assert get_setting("index_profile") == "stemmed"
+
+    assert count_matches("running") == 2
+    assert count_matches("nguyen") == 2
+    assert count_matches("learn") == 5
+
+    add_videos_bulk([make_video("c", 3, text="ran and running")])
+    assert count_matches("run") == 5
+
+
+def test_profiles_are_independent(db_path):
+    set_storage_profile("compact")
+    set_index_profile("prefix")
+    set_storage_profile("minimal")
+
+    assert "prefix='2 3'" in get_fts_sql()
+    assert "columnsize=0" in get_fts_sql()
+    assert count_matches("le*") == 5
+    assert count_matches("learning") == 5
+
+
+def test_new_shards_get_the_index_profile(db_path):
+    set_index_profile("stemmed_prefix")
+    change_layout("sharded")
+
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    add_videos_bulk([make_video("b", 3, channel_id="UC3", text="machine learns")])
+
+    conn = get_subtitle_connection("UC3")
+    assert "porter" in conn.execute("SELECT sql FROM sqlite_master WHERE name = 'Subtitles_fts'").fetchone()[0]
+    assert conn.execute("SELECT COUNT(*) FROM Subtitles_fts WHERE Subtitles_fts MATCH 'learning'").fetchone()[0] == 3
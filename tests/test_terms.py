@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+import pytest
+from yt_fts.connection import get_read_connection, get_subtitle_connection, get_subtitle_databases, set_db_path
+from yt_fts.db_utils import make_db, add_channel_info, add_videos_bulk, delete_channel
+from yt_fts.fts import deferred_fts, set_index_profile
+from yt_fts.maintenance import change_layout
+from yt_fts.terms import complete_terms, read_vocabulary, suggest_query, suggest_term
+from testing_utils import make_synthetic_video
+
+
+def make_video(video_id, texts, channel_id="UC1"):
+    video, subs = make_synthetic_video(video_id, len(texts), channel_id=channel_id)
+    for sub, text in zip(subs, texts):
+        sub["text"] = text
+    return video, subs
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_video("a", ["Police arrived", "the police left", "a polite man"]),
+        make_video("b", ["policy changes", "police police"], channel_id="UC2"),
+    ])
+    return db_path
+
+
+def vocabulary():
+    """
+    Terms as fts5vocab counts them from scratch
+    """
+    counts = {}
+    for channel_id in get_subtitle_databases():
+        for term, docs in read_vocabulary(get_subtitle_connection(channel_id)):
+            counts[term] = counts.get(term, 0) + docs
+    return counts
+
+
+def stored_terms():
+    return dict(get_read_connection().execute("SELECT term, docs FROM Terms"))
+
+
+def test_complete_terms(db_path):
+    assert complete_terms("pol") == [("police", 3), ("policy", 1), ("polite", 1)]
+    assert complete_terms("POL", limit=1) == [("police", 3)]
+    assert complete_terms("xyz") == []
+    assert complete_terms("")[0] == ("police", 3)
+
+
+def test_prefix_lookup_is_a_range_scan(db_path):
+    complete_terms("pol")
+    plan = " ".join(row[3] for row in get_read_connection().execute(
+        "EXPLAIN QUERY PLAN SELECT term, docs FROM Terms WHERE term >= ? AND term < ? ORDER BY docs DESC LIMIT 10",
+        ["pol", "pom"]))
+    assert "USING PRIMARY KEY (term>? AND term<?)" in plan
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_terms_follow_ingest_and_delete(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+    complete_terms("")
+
+    add_videos_bulk([make_video("c", ["police again", "new words"], channel_id="UC1")])
+    with deferred_fts():
+        add_videos_bulk([make_video("d", ["deferred police"], channel_id="UC2")])
+    assert stored_terms() == vocabulary()
+    assert stored_terms()["police"] == 5
+
+    with deferred_fts(["UC2"]):
+        add_videos_bulk([make_video("e", ["scoped police"], channel_id="UC2")])
+    assert stored_terms() == vocabulary()
+    assert stored_terms()["police"] == 6
+
+    delete_channel("UC1")
+    assert stored_terms() == {"policy": 1, "changes": 1, "police": 3, "deferred": 1, "scoped": 1}
+
+
+def test_terms_follow_index_profile(db_path):
+    complete_terms("")
+    set_index_profile("stemmed")
+
+    assert stored_terms() == vocabulary()
+    assert complete_terms("pol") == [("polic", 3), ("polici", 1), ("polit", 1)]
+
+
+def test_suggestions(db_path):
+    assert suggest_term("police") is None
+    assert suggest_term("polcie") == "police"
+    assert suggest_term("zebra") is None
+
+    assert suggest_query("police arrived") is None
+    assert suggest_query("polcie arived") == "police arrived"
+    assert suggest_query("polcie AND zebra") == "police AND zebra"
+    assert suggest_query('"the police" OR polcie') == '"the police" OR police'
+
+
+def run_cli(args, env, input=None):
+    code = f"import sys; sys.argv = ['yt-fts'] + {args!r}; from yt_fts.yt_fts import cli; cli()"
+    return subprocess.run([sys.executable, "-c", code], env=env, input=input, capture_output=True, text=True)
+
+
+def test_cold_processes_count_terms_of_shards(tmp_path):
+    # shards opened for the first time are prepared in a write transaction of
+    # their own, the in process tests above have them prepared already
+    config_path = tmp_path / ".config" / "yt-fts"
+    os.makedirs(config_path)
+    set_db_path(str(config_path / "subtitles.db"))
+    make_db(str(config_path / "subtitles.db"))
+    add_channel_info("UC1", "one", "https://youtube.com/channel/UC1")
+    add_channel_info("UC2", "two", "https://youtube.com/channel/UC2")
+    add_videos_bulk([
+        make_video("a", ["Police arrived"]),
+        make_video("b", ["policy changes"], channel_id="UC2"),
+    ])
+    change_layout("sharded")
+    set_db_path(None)
+    env = dict(os.environ, HOME=str(tmp_path), YT_FTS_NO_SERVER="1", YT_FTS_BUSY_TIMEOUT="2000")
+
+    result = run_cli(["terms", "pol"], env)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["police", "1", "policy", "1"]
+
+    result = run_cli(["delete", "-c", "one"], env, input="y\n")
+    assert result.returncode == 0, result.stderr
+    assert run_cli(["terms", "pol"], env).stdout.split() == ["policy", "1"]
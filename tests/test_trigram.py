@@ -0,0 +1,114 @@
+import pytest
+from yt_fts.connection import get_subtitle_connection
+from yt_fts.db_utils import (
+    HIGHLIGHT_END,
+    HIGHLIGHT_START,
+    add_channel_info,
+    add_videos_bulk,
+    delete_channel,
+    search_substring
+)
+from yt_fts.fts import build_trigram_index, deferred_fts, drop_trigram_index, fts_triggers_missing, table_exists
+from yt_fts.maintenance import change_layout
+from testing_utils import make_synthetic_video as make_video
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_video("a", 10, channel_id="UC1", text="machine learning"),
+        make_video("b", 10, channel_id="UC2", text="unlearned lessons"),
+    ])
+    return db_path
+
+
+def video_ids(hits):
+    return [hit.video_id for hit in hits]
+
+
+@pytest.mark.parametrize("trigram", [False, True])
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_substring_search(db_path, layout, trigram):
+    if layout == "sharded":
+        change_layout("sharded")
+    if trigram:
+        build_trigram_index()
+
+    assert video_ids(search_substring("EARN")) == ["a"] * 10 + ["b"] * 10
+    assert video_ids(search_substring("earn", channel_id="UC2")) == ["b"] * 10
+    assert video_ids(search_substring("ne*rn")) == ["a"] * 10
+    assert video_ids(search_substring("earn", video_id="a", start_ms=2000, stop_ms=4000)) == ["a"] * 2
+    assert list(search_substring("learnt")) == []
+
+    hit = next(search_substring("earn"))
+    assert hit.highlighted == "machine l\x02earn\x03ing 0"
+
+
+@pytest.mark.parametrize("trigram", [False, True])
+def test_like_wildcards_are_literal(db_path, trigram):
+    add_videos_bulk([
+        make_video("c", 2, channel_id="UC1", text="my_var is 100% set"),
+        make_video("d", 2, channel_id="UC1", text="myXvar is 1000 set"),
+    ])
+    if trigram:
+        build_trigram_index()
+
+    hits = list(search_substring("my_var"))
+    assert video_ids(hits) == ["c"] * 2
+    assert hits[0].highlighted == f"{HIGHLIGHT_START}my_var{HIGHLIGHT_END} is 100% set 0"
+    assert video_ids(search_substring("100%")) == ["c"] * 2
+    assert video_ids(search_substring("my?var")) == ["c"] * 2 + ["d"] * 2
+    assert video_ids(search_substring("my_var", video_id="d")) == []
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_substring_pages_follow_the_cursor(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+    build_trigram_index()
+
+    everything = list(search_substring("earn"))
+    pages = []
+    after = None
+    while True:
+        page = list(search_substring("earn", limit=3, after=after))
+        pages += page
+        if len(page) < 3:
+            break
+        after = (page[-1].rank, page[-1].rowid)
+
+    assert pages == everything
+    assert list(search_substring("earn", limit=3, offset=9)) == everything[9:12]
+
+
+def test_trigram_index_follows_ingest_and_delete(db_path):
+    build_trigram_index()
+
+    with deferred_fts():
+        add_videos_bulk([make_video("c", 5, channel_id="UC1", text="yearning")])
+    add_videos_bulk([make_video("d", 5, channel_id="UC1", text="earnest")])
+
+    assert not fts_triggers_missing(get_subtitle_connection())
+    assert video_ids(search_substring("earn")).count("c") == 5
+    assert video_ids(search_substring("earn")).count("d") == 5
+
+    delete_channel("UC1")
+    assert set(video_ids(search_substring("earn"))) == {"b"}
+
+
+def test_new_shards_get_the_trigram_index(db_path):
+    build_trigram_index()
+    change_layout("sharded")
+
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    add_videos_bulk([make_video("c", 5, channel_id="UC3", text="yearning")])
+
+    assert table_exists(get_subtitle_connection("UC3"), "Subtitles_trigram")
+    assert video_ids(search_substring("earn", channel_id="UC3")) == ["c"] * 5
+
+    change_layout("single")
+    assert table_exists(get_subtitle_connection(), "Subtitles_trigram")
+
+    drop_trigram_index()
+    assert not table_exists(get_subtitle_connection(), "Subtitles_trigram")
+    assert len(list(search_substring("earn"))) == 25
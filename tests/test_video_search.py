@@ -0,0 +1,112 @@
+import pytest
+from yt_fts.connection import get_subtitle_connection
+from yt_fts.db_utils import add_channel_info, add_videos_bulk, delete_channel, search_videos
+from yt_fts.fts import build_video_index, deferred_fts, drop_video_index, set_index_profile, table_exists
+from yt_fts.maintenance import change_layout
+from yt_fts.ranking import set_ranking_weight
+from testing_utils import make_synthetic_video
+
+
+def make_video(video_id, texts, channel_id="UC1", title=None):
+    video, subs = make_synthetic_video(video_id, len(texts), channel_id=channel_id)
+    for sub, text in zip(subs, texts):
+        sub["text"] = text
+    if title is not None:
+        video["video_title"] = title
+    return video, subs
+
+
+@pytest.fixture
+def db_path(db_path):
+    add_videos_bulk([
+        make_video("mostly", ["gradient descent", "more gradient steps", "the gradient vanishes"]),
+        make_video("once", ["we cook pasta", "a gradient of flavour", "and eat it", "then sleep"],
+                   channel_id="UC2"),
+        make_video("never", ["nothing to see", "here at all"], channel_id="UC2"),
+    ])
+    return db_path
+
+
+def video_ids(hits):
+    return [hit.video_id for hit in hits]
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_videos_rank_by_transcript(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+    build_video_index()
+
+    hits = list(search_videos("gradient"))
+    assert video_ids(hits) == ["mostly", "once"]
+
+    assert hits[1].start_time == "00:00:01.000"
+    assert hits[1].text == "a gradient of flavour"
+    assert hits[1].highlighted == "a \x02gradient\x03 of flavour"
+
+    assert video_ids(search_videos("gradient", channel_id="UC2")) == ["once"]
+    assert video_ids(search_videos("gradient", limit=1, offset=1)) == ["once"]
+    assert video_ids(search_videos("gradient", limit=1, after=(hits[0].rank, hits[0].rowid))) == ["once"]
+
+
+def test_title_only_matches_have_no_cue(db_path):
+    add_videos_bulk([make_video("titled", ["unrelated words"], title="All about gradients and descent")])
+    build_video_index()
+
+    hit = next(search_videos("gradients"))
+    assert hit.video_id == "titled"
+    assert hit.start_ms is None and hit.highlighted is None
+
+    # both words are in the video, never in one cue
+    hit = next(search_videos("pasta AND flavour"))
+    assert hit.video_id == "once" and hit.highlighted is None
+
+
+def test_title_weight(db_path):
+    add_videos_bulk([make_video("titled", ["unrelated words"], title="gradient")])
+    build_video_index()
+
+    set_ranking_weight("title", 0.1)
+    assert video_ids(search_videos("gradient"))[0] == "mostly"
+
+    set_ranking_weight("title", 10)
+    assert video_ids(search_videos("gradient"))[0] == "titled"
+
+
+@pytest.mark.parametrize("layout", ["single", "sharded"])
+def test_video_index_follows_ingest_and_delete(db_path, layout):
+    if layout == "sharded":
+        change_layout("sharded")
+    build_video_index()
+
+    add_videos_bulk([make_video("new", ["gradient gradient gradient gradient"], channel_id="UC1")])
+    with deferred_fts():
+        add_videos_bulk([make_video("deferred", ["one gradient"], channel_id="UC2")])
+
+    assert set(video_ids(search_videos("gradient"))) == {"mostly", "once", "new", "deferred"}
+
+    delete_channel("UC1")
+    assert set(video_ids(search_videos("gradient"))) == {"once", "deferred"}
+
+    # search_videos skips documents of missing cues, the index itself must be clean
+    conn = get_subtitle_connection("UC2")
+    assert conn.execute("SELECT COUNT(*) FROM Videos_fts WHERE Videos_fts MATCH 'gradient'").fetchone()[0] == 2
+
+
+def test_video_index_follows_layout_and_profile(db_path):
+    build_video_index()
+    change_layout("sharded")
+    assert not table_exists(get_subtitle_connection(), "Videos_fts")
+
+    add_channel_info("UC3", "three", "https://youtube.com/channel/UC3")
+    add_videos_bulk([make_video("third", ["gradients everywhere"], channel_id="UC3")])
+    assert video_ids(search_videos("gradient")) == ["mostly", "once"]
+
+    set_index_profile("stemmed")
+    assert set(video_ids(search_videos("gradient"))) == {"mostly", "once", "third"}
+
+    change_layout("single")
+    assert set(video_ids(search_videos("gradient"))) == {"mostly", "once", "third"}
+
+    drop_video_index()
+    assert not table_exists(get_subtitle_connection(), "Videos_fts")
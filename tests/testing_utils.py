@@ -50,3 +50,22 @@ def get_test_db():
     conn = sqlite3.connect(f"{CONFIG_DIR}/subtitles.db")
     curr = conn.cursor()
     return curr
+
+
+def make_synthetic_video(video_id, num_subs, channel_id="UC1", text="cue number"):
+    """
+    (video, subtitles) pair in the shape db_utils.add_videos_bulk takes
+    """
+    video = {
+        "video_id": video_id,
+        "video_title": f"title {video_id}",
+        "video_url": f"https://youtu.be/{video_id}",
+        "video_date": "2024-01-01",
+        "channel_id": channel_id,
+    }
+    subs = [{
+        "start_time": f"00:{i // 60:02d}:{i % 60:02d}.000",
+        "stop_time": f"00:{(i + 1) // 60:02d}:{(i + 1) % 60:02d}.000",
+        "text": f"{text} {i}",
+    } for i in range(num_subs)]
+    return video, subs